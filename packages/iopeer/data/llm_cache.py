@@ -0,0 +1,184 @@
+"""
+llm_cache.py — Caché en disco de respuestas LLM direccionada por contenido.
+
+La clave es sha256(modelo, temperatura, prompt normalizado): el mismo log de
+build repetido por un CI inestable devuelve la respuesta guardada en
+milisegundos y sin llamar a la API. Las entradas expiran por TTL y se desalojan
+por LRU cuando se superan ``max_entries`` o ``max_bytes``. La caché es
+compartida por todos los agentes del proceso (``get_default_cache``).
+
+Se desactiva con ``IOPEER_LLM_CACHE=0``.
+"""
+
+import os
+import re
+import time
+import hashlib
+import textwrap
+import threading
+from pathlib import Path
+from iopeer.data.memory.connection_pool import get_connection
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / "memory" / "llm_cache.db"
+DEFAULT_TTL = int(os.getenv("IOPEER_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+SCHEMA = ["""
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        model TEXT,
+        response TEXT,
+        size INTEGER,
+        created_at REAL,
+        last_access REAL
+    )
+""", "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)"]
+
+ANSI_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Quita ANSI, espacios finales, indentación común y líneas en blanco repetidas."""
+    text = ANSI_RE.sub("", prompt or "").replace("\r\n", "\n")
+    lines = [line.rstrip() for line in textwrap.dedent(text).split("\n")]
+    normalized = []
+    for line in lines:
+        if not line and normalized and not normalized[-1]:
+            continue
+        normalized.append(line)
+    return "\n".join(normalized).strip()
+
+
+def cache_key(model: str, temperature: float, prompt: str) -> str:
+    payload = f"{model}\x00{float(temperature):.3f}\x00{normalize_prompt(prompt)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Caché LRU acotada por tamaño y con TTL sobre SQLite."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries: int = 2000,
+                 max_bytes: int = 50 * 1024 * 1024, ttl: int = DEFAULT_TTL):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _conn(self):
+        return get_connection(self.path, SCHEMA)
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def get(self, model: str, temperature: float, prompt: str):
+        key = cache_key(model, temperature, prompt)
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl and now - row[1] > self.ttl):
+            self._count("misses")
+            return None
+        with conn:
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return row[0]
+
+    def set(self, model: str, temperature: float, prompt: str, response: str):
+        key = cache_key(model, temperature, prompt)
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode("utf-8")), now, now),
+            )
+        self._count("stores")
+        self._evict(now)
+
+    def invalidate(self, model: str, temperature: float, prompt: str):
+        """Descarta una respuesta (por ejemplo, un patch que resultó inválido)."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (cache_key(model, temperature, prompt),))
+
+    def _evict(self, now: float):
+        conn = self._conn()
+        evicted = 0
+        with conn:
+            if self.ttl:
+                evicted += conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access").fetchall():
+                    if count <= self.max_entries and total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    count -= 1
+                    total -= size
+                    evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    def get_or_create(self, model: str, temperature: float, prompt: str, create):
+        """Devuelve la respuesta cacheada o llama a ``create()`` y guarda su resultado."""
+        cached = self.get(model, temperature, prompt)
+        if cached is not None:
+            return cached
+        response = create()
+        if response:
+            self.set(model, temperature, prompt, response)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM llm_cache")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Caché compartida por todos los agentes; ``None`` si está desactivada."""
+    global _default_cache
+    if os.getenv("IOPEER_LLM_CACHE", "1") == "0":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+
+def invalidate_response(model: str, temperature: float, prompt: str, cache=None):
+    """Descarta de la caché compartida una respuesta que resultó inválida (sin diff, ``NO_PATCH``)."""
+    cache = cache or get_default_cache()
+    if cache is not None:
+        cache.invalidate(model, temperature, prompt)
+
+
+def cached_response_text(client, model: str, prompt: str, temperature: float = 0, cache=None) -> str:
+    """``client.responses.create(...).output_text`` con caché por contenido.
+
+    ``client`` puede ser cualquier objeto con la interfaz ``responses.create``
+    (por ejemplo un stub offline).
+    """
+    cache = cache or get_default_cache()
+
+    def create():
+        response = client.responses.create(model=model, input=prompt, temperature=temperature)
+        return response.output_text
+
+    if cache is None:
+        return create()
+    return cache.get_or_create(model, temperature, prompt, create)
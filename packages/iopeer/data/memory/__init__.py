@@ -2,5 +2,7 @@ from iopeer.data.memory.base_memory import BaseMemory
 from iopeer.data.memory.tiny_memory import TinyMemory
 from iopeer.data.memory.sqlite_memory import SQLiteMemory
 from iopeer.data.memory.supabase_memory import SupabaseMemory
+from iopeer.data.memory.connection_pool import SQLiteConnectionPool
+from iopeer.data.memory.timeseries import TimeSeriesStore
 
-__all__ = ["BaseMemory", "TinyMemory", "SQLiteMemory", "SupabaseMemory"]
+__all__ = ["BaseMemory", "TinyMemory", "SQLiteMemory", "SupabaseMemory", "SQLiteConnectionPool", "TimeSeriesStore"]
@@ -19,3 +19,9 @@ class BaseMemory(ABC):
     @abstractmethod
     def get_recent_logs(self, agent: str, limit: int = 5):
         pass
+
+    @abstractmethod
+    def tail(self, agent: str, limit: int = 5, since: str = None):
+        """Últimos ``limit`` logs del agente (posteriores a ``since`` si se indica),
+        en orden cronológico y como dicts. Debe costar O(limit), no O(historial)."""
+        pass
@@ -0,0 +1,136 @@
+"""
+connection_pool.py — Conexiones SQLite persistentes y compartidas por proceso.
+
+Cada hilo obtiene su propia conexión por base de datos y la reutiliza en
+llamadas sucesivas. Las conexiones de hilos que ya terminaron (workers de
+``asyncio.to_thread``, hilos por repo del modo fleet) se cierran al abrir una
+conexión nueva o con ``prune()``. El esquema registrado para una base se aplica una sola vez
+por proceso, y las sentencias se reutilizan desde la caché de sentencias
+preparadas de cada conexión (``cached_statements``), siempre que el SQL sea el
+mismo texto constante.
+
+Además de sentencias DDL, el esquema acepta migraciones invocables que
+reciben la conexión (por ejemplo ``ensure_columns``).
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SQLiteConnectionPool:
+    """Administrador thread-safe de conexiones SQLite (una por hilo y base)."""
+
+    def __init__(self, cached_statements: int = 256):
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._schemas = {}
+        self._initialized = set()
+        # (conexión, hilo dueño): el thread-local muere con el hilo, la conexión no
+        self._connections = []
+        self._opened = 0
+        self._reused = 0
+        self._released = 0
+
+    def register_schema(self, db_path, statements):
+        """Registra las sentencias DDL (o migraciones invocables) que deben correr antes de usar la base."""
+        key = str(Path(db_path).resolve())
+        with self._lock:
+            known = self._schemas.setdefault(key, [])
+            for statement in statements:
+                if statement not in known:
+                    known.append(statement)
+                    self._initialized.discard(key)
+
+    def connection(self, db_path) -> sqlite3.Connection:
+        """Devuelve la conexión del hilo actual para ``db_path``, abriéndola si hace falta."""
+        key = str(Path(db_path).resolve())
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+
+        conn = conns.get(key)
+        if conn is not None:
+            with self._lock:
+                self._reused += 1
+            self._ensure_schema(key, conn)
+            return conn
+
+        self.prune()
+        Path(key).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(key, cached_statements=self.cached_statements, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conns[key] = conn
+        with self._lock:
+            self._opened += 1
+            self._connections.append((conn, threading.current_thread()))
+        self._ensure_schema(key, conn)
+        return conn
+
+    def prune(self) -> int:
+        """Cierra las conexiones de hilos que ya terminaron; devuelve cuántas cerró."""
+        with self._lock:
+            dead = [conn for conn, thread in self._connections if not thread.is_alive()]
+            if not dead:
+                return 0
+            self._connections = [(conn, thread) for conn, thread in self._connections if thread.is_alive()]
+            self._released += len(dead)
+        for conn in dead:
+            conn.close()
+        return len(dead)
+
+    def _ensure_schema(self, key, conn):
+        if key in self._initialized:
+            return
+        with self._lock:
+            if key in self._initialized:
+                return
+            with conn:
+                for statement in self._schemas.get(key, []):
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+            self._initialized.add(key)
+
+    def stats(self) -> dict:
+        """Contadores de conexiones abiertas, reutilizadas y cerradas por fin de su hilo."""
+        with self._lock:
+            return {
+                "opened": self._opened,
+                "reused": self._reused,
+                "released": self._released,
+                "open_connections": len(self._connections),
+                "schemas_initialized": len(self._initialized),
+            }
+
+    def close_all(self):
+        """Cierra todas las conexiones abiertas por cualquier hilo."""
+        with self._lock:
+            for conn, _ in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._initialized.clear()
+        self._local = threading.local()
+
+
+def ensure_columns(table: str, columns):
+    """Migración idempotente: agrega con ``ALTER TABLE`` las ``(columna, tipo)`` que falten en ``table``."""
+    def migrate(conn):
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, sql_type in columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+    return migrate
+
+
+# Pool compartido por todo el proceso
+pool = SQLiteConnectionPool()
+
+
+def get_connection(db_path, schema=()) -> sqlite3.Connection:
+    """Atajo sobre el pool compartido: registra ``schema`` y devuelve la conexión del hilo."""
+    if schema:
+        pool.register_schema(db_path, schema)
+    return pool.connection(db_path)
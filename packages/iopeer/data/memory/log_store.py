@@ -0,0 +1,227 @@
+"""
+log_store.py — Almacenamiento append-only en segmentos JSON-lines.
+
+Cada registro es una línea JSON añadida al segmento activo; insertar cuesta
+O(1) sin importar el tamaño del historial. Cuando el segmento activo supera
+``max_segment_bytes`` se sella y se abre uno nuevo. Cuando hay más de
+``max_segments`` segmentos sellados se compactan en uno solo, aplicando la
+retención ``max_records`` si está configurada.
+
+Para ``tail`` filtrado por agente se mantiene en memoria un índice
+``{agente: [(segmento, offset), ...]}``: se arma una vez (recorriendo el
+historial) en la primera consulta por agente, se actualiza en cada ``append`` y
+se descarta al compactar. Con el índice, un agente poco frecuente cuesta
+``limit`` lecturas en vez de recorrer todo lo que escribieron los demás.
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+
+BLOCK_SIZE = 64 * 1024
+
+
+def read_lines_reverse(path, block_size: int = BLOCK_SIZE):
+    """Itera las líneas de un archivo desde el final, leyendo por bloques."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            chunk = f.read(step) + remainder
+            lines = chunk.split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line.decode("utf-8", "replace")
+        if remainder:
+            yield remainder.decode("utf-8", "replace")
+
+
+def tail_records(records, limit: int, agent: str = None, since: str = None):
+    """Selecciona los últimos ``limit`` registros de un iterable ordenado del más
+    nuevo al más antiguo, filtrando por agente y por timestamp estrictamente
+    posterior a ``since``. Corta la lectura apenas alcanza ``limit`` o cruza ``since``:
+    sin filtro de agente cuesta O(limit); con filtro, lo que haya que recorrer hasta
+    juntar ``limit`` registros del agente (para eso ``AppendOnlyLogStore`` usa su índice)."""
+    selected = []
+    if limit <= 0:
+        return selected
+    for record in records:
+        if since is not None and str(record.get("timestamp", "")) <= since:
+            break
+        if agent is not None and record.get("agent") != agent:
+            continue
+        selected.append(record)
+        if len(selected) >= limit:
+            break
+    selected.reverse()
+    return selected
+
+
+class AppendOnlyLogStore:
+    """Log append-only rotado por tamaño, con compactación periódica."""
+
+    def __init__(self, directory, prefix: str = "segment", max_segment_bytes: int = 4 * 1024 * 1024,
+                 max_segments: int = 8, max_records: int = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+        self.max_records = max_records
+        self._lock = threading.Lock()
+        self._handle = None
+        self._agent_index = None
+        segments = self.segments()
+        self._active_index = self._segment_index(segments[-1]) if segments else 1
+        self._open_active()
+
+    # --- Segmentos ---
+    def _segment_path(self, index: int) -> Path:
+        return self.directory / f"{self.prefix}-{index:06d}.jsonl"
+
+    def _segment_index(self, path: Path) -> int:
+        return int(path.stem.rsplit("-", 1)[1])
+
+    def segments(self):
+        """Segmentos existentes, del más antiguo al más nuevo."""
+        return sorted(self.directory.glob(f"{self.prefix}-*.jsonl"), key=self._segment_index)
+
+    def _open_active(self):
+        path = self._segment_path(self._active_index)
+        self._handle = open(path, "ab")
+        self._active_size = self._handle.tell()
+
+    def _rotate(self):
+        self._handle.close()
+        self._active_index += 1
+        self._open_active()
+        if len(self.segments()) - 1 > self.max_segments:
+            self._compact()
+
+    def _compact(self):
+        sealed = self.segments()[:-1]
+        if not sealed:
+            return
+        records = []
+        for path in sealed:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                records.extend(line for line in f if line.strip())
+        if self.max_records is not None:
+            records = records[-self.max_records:]
+
+        target = sealed[0]
+        tmp = target.with_suffix(".jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(records)
+        os.replace(tmp, target)
+        for path in sealed[1:]:
+            path.unlink()
+        # Los offsets cambiaron: el índice se rearma en la próxima consulta
+        self._agent_index = None
+
+    def _build_index(self):
+        index = {}
+        for path in self.segments():
+            segment, offset = self._segment_index(path), 0
+            with open(path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            agent = json.loads(line).get("agent")
+                        except (ValueError, AttributeError):
+                            agent = None
+                        index.setdefault(agent, []).append((segment, offset))
+                    offset += len(line)
+        self._agent_index = index
+
+    def compact(self):
+        """Fusiona los segmentos sellados en uno solo aplicando la retención."""
+        with self._lock:
+            self._compact()
+
+    # --- Escritura ---
+    def append(self, record: dict):
+        line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            if self._agent_index is not None:
+                self._agent_index.setdefault(record.get("agent"), []).append((self._active_index, self._active_size))
+            self._handle.write(line)
+            self._handle.flush()
+            self._active_size += len(line)
+            if self._active_size >= self.max_segment_bytes:
+                self._rotate()
+
+    # --- Lectura ---
+    def iter_reverse(self):
+        """Itera registros del más nuevo al más antiguo sin cargar el historial."""
+        with self._lock:
+            self._handle.flush()
+            segments = self.segments()
+        for path in reversed(segments):
+            for line in read_lines_reverse(path):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def _tail_agent(self, agent, limit: int, since: str = None):
+        """``tail`` de un agente leyendo por offset sólo sus registros, desde el índice."""
+        selected, handles = [], {}
+        if limit <= 0:
+            return selected
+        with self._lock:
+            self._handle.flush()
+            if self._agent_index is None:
+                self._build_index()
+            positions = self._agent_index.get(agent, [])
+            try:
+                for segment, offset in reversed(positions):
+                    f = handles.get(segment)
+                    if f is None:
+                        f = handles[segment] = open(self._segment_path(segment), "rb")
+                    f.seek(offset)
+                    try:
+                        record = json.loads(f.readline())
+                    except ValueError:
+                        continue
+                    if since is not None and str(record.get("timestamp", "")) <= since:
+                        break
+                    selected.append(record)
+                    if len(selected) >= limit:
+                        break
+            finally:
+                for f in handles.values():
+                    f.close()
+        selected.reverse()
+        return selected
+
+    def tail(self, limit: int = 20, agent: str = None, since: str = None):
+        """Últimos ``limit`` registros en orden cronológico."""
+        if agent is not None:
+            return self._tail_agent(agent, limit, since)
+        return tail_records(self.iter_reverse(), limit, since=since)
+
+    def all(self):
+        records = list(self.iter_reverse())
+        records.reverse()
+        return records
+
+    def clear(self):
+        with self._lock:
+            self._handle.close()
+            for path in self.segments():
+                path.unlink()
+            self._agent_index = None
+            self._active_index = 1
+            self._open_active()
+
+    def close(self):
+        with self._lock:
+            if self._handle and not self._handle.closed:
+                self._handle.close()
@@ -1,19 +1,65 @@
 
 import sqlite3
 import os
+import queue
+import atexit
+import threading
+import time
 from datetime import datetime
 from iopeer.data.memory.base_memory import BaseMemory
 
+INSERT_SQL = {
+    "logs": "INSERT INTO logs (timestamp, agent, action, status, output) VALUES (?, ?, ?, ?, ?)",
+    "metrics": "INSERT INTO metrics (timestamp, agent, metric, value) VALUES (?, ?, ?, ?)",
+    "reflections": "INSERT INTO reflections (timestamp, agent, insight) VALUES (?, ?, ?)",
+}
+
+_STOP = object()
+# Segundos que flush() espera al hilo escritor antes de rendirse
+FLUSH_TIMEOUT = float(os.getenv("SQLITE_FLUSH_TIMEOUT", "30"))
+# Intentos de un lote antes de apartarlo en ``failed_rows``
+WRITE_RETRIES = int(os.getenv("SQLITE_WRITE_RETRIES", "3"))
+
+
 class SQLiteMemory(BaseMemory):
-    """Implementación con SQLite como backend de persistencia."""
+    """Implementación con SQLite como backend de persistencia.
+
+    Con ``write_behind=True`` las escrituras se encolan en memoria y un único
+    hilo escritor las vuelca con ``executemany`` en una sola transacción cada
+    ``flush_interval`` segundos o cada ``batch_size`` filas. ``flush()`` y
+    ``close()`` bloquean hasta que todo lo encolado está commiteado.
 
-    def __init__(self, agent_name: str):
-        db_path = f"iopeer/tool/agents/{agent_name}_agent/memory/{agent_name}_memory.db"
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    Si un lote falla, sus filas se reintentan en el siguiente volcado (con un
+    ``flush()`` esperando, en el momento); tras ``WRITE_RETRIES`` intentos
+    quedan en ``failed_rows`` como ``(tabla, fila)`` y sólo entonces
+    ``flush()`` relanza el error. Un reintento exitoso no deja error
+    pendiente. Si el hilo escritor muere, ``flush()`` falla en vez de
+    bloquear.
+    """
+
+    def __init__(self, agent_name: str, db_path: str = None, write_behind: bool = False,
+                 flush_interval: float = 0.5, batch_size: int = 500):
+        if db_path is None:
+            db_path = f"iopeer/tool/agents/{agent_name}_agent/memory/{agent_name}_memory.db"
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
         self.cur = self.conn.cursor()
         self._init_tables()
 
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._closed = False
+        self._writer_error = None
+        self.failed_rows = []
+        if write_behind:
+            self._queue = queue.Queue(maxsize=batch_size * 10)
+            self._writer = threading.Thread(target=self._writer_loop, name=f"sqlite-writer-{agent_name}", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
     def _init_tables(self):
         self.cur.execute("""
             CREATE TABLE IF NOT EXISTS logs (
@@ -42,32 +88,206 @@ class SQLiteMemory(BaseMemory):
                 insight TEXT
             )
         """)
+        # Índice para tail(): recorre los logs de un agente del más nuevo al más viejo
+        self.cur.execute("CREATE INDEX IF NOT EXISTS idx_logs_agent_id ON logs (agent, id DESC)")
         self.conn.commit()
 
+    # --- Escritura ---
+    def _write(self, table, row):
+        if not self.write_behind:
+            self.cur.execute(INSERT_SQL[table], row)
+            self.conn.commit()
+            return
+        if self._closed:
+            raise RuntimeError("SQLiteMemory cerrada: no se aceptan más escrituras.")
+        self._put((table, row))
+
+    def _put(self, item, timeout=None):
+        """Encola sin bloquear para siempre si el hilo escritor murió con la cola llena.
+
+        Si el hilo murió, una fila que no se pudo encolar queda en ``failed_rows``.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if not self._writer.is_alive():
+                if isinstance(item, tuple):
+                    self.failed_rows.append(item)
+                self._raise_writer_error()
+                raise RuntimeError("El hilo escritor de SQLiteMemory no está corriendo.")
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("Cola de escritura de SQLiteMemory llena.")
+
     def save_log(self, agent, action, status, output):
-        self.cur.execute("""
-            INSERT INTO logs (timestamp, agent, action, status, output)
-            VALUES (?, ?, ?, ?, ?)
-        """, (datetime.utcnow().isoformat(), agent, action, status, output[:2000]))
-        self.conn.commit()
+        self._write("logs", (datetime.utcnow().isoformat(), agent, action, status, output[:2000]))
 
     def save_metric(self, agent, metric_name, value):
-        self.cur.execute("""
-            INSERT INTO metrics (timestamp, agent, metric, value)
-            VALUES (?, ?, ?, ?)
-        """, (datetime.utcnow().isoformat(), agent, metric_name, str(value)))
-        self.conn.commit()
+        self._write("metrics", (datetime.utcnow().isoformat(), agent, metric_name, str(value)))
 
     def save_reflection(self, agent, insight):
-        self.cur.execute("""
-            INSERT INTO reflections (timestamp, agent, insight)
-            VALUES (?, ?, ?)
-        """, (datetime.utcnow().isoformat(), agent, insight))
-        self.conn.commit()
+        self._write("reflections", (datetime.utcnow().isoformat(), agent, insight))
+
+    # --- Hilo escritor (write-behind) ---
+    def _writer_loop(self):
+        try:
+            conn = sqlite3.connect(self.db_path)
+        except Exception as e:
+            self._writer_error = e
+            print(f"⚠️ Error abriendo la base de SQLiteMemory: {e}")
+            return
+        pending = {table: [] for table in INSERT_SQL}
+        count = 0
+        attempts = 0
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                waiters = []
+                stop = False
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not None:
+                    pending[item[0]].append(item[1])
+                    count += 1
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                timed_out = deadline is not None and time.monotonic() >= deadline
+                if count and (count >= self.batch_size or timed_out or waiters or stop):
+                    while True:
+                        error = self._commit(conn, pending)
+                        if error is None:
+                            break
+                        attempts += 1
+                        print(f"⚠️ Error en escritura diferida de SQLiteMemory ({count} filas, intento {attempts}): {error}")
+                        # Con alguien esperando (flush/close) se reintenta ya; si no, en el próximo volcado
+                        if attempts >= WRITE_RETRIES or not (waiters or stop):
+                            break
+                        time.sleep(self.flush_interval)
+                    if error is None or attempts >= WRITE_RETRIES:
+                        if error is not None:
+                            self.failed_rows.extend((table, row) for table, rows in pending.items() for row in rows)
+                            self._writer_error = error
+                        pending = {table: [] for table in INSERT_SQL}
+                        count = 0
+                        attempts = 0
+                        deadline = None
+                    else:
+                        # Las filas quedan pendientes y se reintentan en el próximo volcado
+                        deadline = time.monotonic() + self.flush_interval
+
+                for event in waiters:
+                    event.set()
+                if stop:
+                    return
+        except BaseException as e:
+            self._writer_error = e
+            self.failed_rows.extend((table, row) for table, rows in pending.items() for row in rows)
+            print(f"⚠️ El hilo escritor de SQLiteMemory terminó inesperadamente: {e}")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _commit(conn, pending):
+        """Inserta el lote en una transacción; devuelve la excepción o ``None``."""
+        try:
+            with conn:
+                for table, rows in pending.items():
+                    if rows:
+                        conn.executemany(INSERT_SQL[table], rows)
+        except Exception as e:
+            return e
+        return None
+
+    def _raise_writer_error(self):
+        if self._writer_error is not None:
+            error, self._writer_error = self._writer_error, None
+            raise error
 
+    def flush(self, timeout: float = FLUSH_TIMEOUT):
+        """Bloquea hasta que todas las escrituras encoladas quedan commiteadas.
+
+        Lanza ``TimeoutError`` si no terminan en ``timeout`` segundos y
+        ``RuntimeError`` si el hilo escritor ya no corre.
+        """
+        if not self.write_behind or self._closed:
+            return
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        self._put(done, timeout)
+        while not done.wait(0.1):
+            if not self._writer.is_alive():
+                self._raise_writer_error()
+                raise RuntimeError("El hilo escritor de SQLiteMemory terminó con escrituras pendientes.")
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"flush() de SQLiteMemory superó {timeout}s.")
+        self._raise_writer_error()
+
+    def close(self):
+        """Vuelca lo pendiente, detiene el hilo escritor y cierra la conexión."""
+        if self._closed:
+            return
+        try:
+            if self.write_behind:
+                self.flush()
+        finally:
+            if self.write_behind:
+                if self._writer.is_alive():
+                    try:
+                        self._queue.put(_STOP, timeout=FLUSH_TIMEOUT)
+                    except queue.Full:
+                        pass
+                    self._writer.join(FLUSH_TIMEOUT)
+                atexit.unregister(self.close)
+            self._closed = True
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Lectura ---
     def get_recent_logs(self, agent, limit=5):
+        self.flush()
         self.cur.execute("""
             SELECT timestamp, action, status, output
             FROM logs WHERE agent=? ORDER BY id DESC LIMIT ?
         """, (agent, limit))
         return self.cur.fetchall()
+
+    def tail(self, agent, limit=5, since=None):
+        self.flush()
+        cur = self.conn.execute("""
+            SELECT timestamp, agent, action, status, output
+            FROM logs WHERE agent=? ORDER BY id DESC
+        """, (agent,))
+        columns = [c[0] for c in cur.description]
+        rows = []
+        # Los ids crecen con el tiempo: al cruzar `since` no hay más filas útiles
+        while len(rows) < limit:
+            batch = cur.fetchmany(limit - len(rows))
+            if not batch:
+                break
+            for row in batch:
+                if since is not None and row[0] <= since:
+                    batch = None
+                    break
+                rows.append(dict(zip(columns, row)))
+            if batch is None:
+                break
+        cur.close()
+        rows.reverse()
+        return rows
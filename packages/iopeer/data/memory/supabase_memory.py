@@ -11,3 +11,4 @@ class SupabaseMemory(BaseMemory):
     def save_metric(self, agent, metric_name, value): pass
     def save_reflection(self, agent, insight): pass
     def get_recent_logs(self, agent, limit=5): return []
+    def tail(self, agent, limit=5, since=None): return []
@@ -0,0 +1,230 @@
+"""
+timeseries.py — Series temporales de métricas sobre SQLite.
+
+Cada punto se guarda en ``metrics`` con un ``ts`` entero (epoch en segundos)
+indexado por ``(agent, metric, ts)``, y en la misma transacción se actualizan
+por UPSERT los rollups de 1 minuto, 1 hora y 1 día (min/max/suma/cantidad; el
+promedio sale de suma/cantidad). Las políticas de retención borran puntos
+crudos y rollups finos viejos, y ``query`` elige la resolución más fina que
+responde el rango pedido sin pasar de ``max_points`` filas, así un dashboard
+de meses lee unos cientos de buckets en vez de recorrer la tabla entera.
+"""
+
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+from iopeer.data.memory.connection_pool import get_connection, ensure_columns
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent / "git_diagnostics.db"
+
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+DAY = 86400
+# Segundos que se conserva cada nivel (None = para siempre)
+DEFAULT_RETENTION = {"raw": 30 * DAY, "1m": 90 * DAY, "1h": 730 * DAY, "1d": None}
+
+METRICS_DDL = """
+    CREATE TABLE IF NOT EXISTS metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        agent TEXT,
+        metric TEXT,
+        value REAL
+    )
+"""
+ROLLUP_DDL = """
+    CREATE TABLE IF NOT EXISTS metrics_rollup (
+        agent TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        resolution INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        min REAL,
+        max REAL,
+        sum REAL,
+        count INTEGER,
+        PRIMARY KEY (agent, metric, resolution, bucket)
+    ) WITHOUT ROWID
+"""
+
+
+def _backfill_metric_ts(conn):
+    """Completa ``ts`` de filas anteriores a la migración (ISO en hora local, como ``datetime.now()``)."""
+    rows = conn.execute("SELECT id, timestamp FROM metrics WHERE ts IS NULL").fetchall()
+    updates = []
+    for row_id, timestamp in rows:
+        try:
+            updates.append((int(datetime.fromisoformat(timestamp).timestamp()), row_id))
+        except (TypeError, ValueError):
+            continue
+    conn.executemany("UPDATE metrics SET ts = ? WHERE id = ?", updates)
+    if updates and conn.execute("SELECT 1 FROM metrics_rollup LIMIT 1").fetchone() is None:
+        for seconds in RESOLUTIONS.values():
+            conn.execute("""
+                INSERT OR REPLACE INTO metrics_rollup (agent, metric, resolution, bucket, min, max, sum, count)
+                SELECT agent, metric, ?, ts - ts % ?, MIN(value), MAX(value), SUM(value), COUNT(*)
+                FROM metrics WHERE ts IS NOT NULL AND typeof(value) IN ('integer', 'real')
+                GROUP BY agent, metric, ts - ts % ?
+            """, (seconds, seconds, seconds))
+
+
+SCHEMA = [
+    METRICS_DDL,
+    ensure_columns("metrics", [("ts", "INTEGER")]),
+    "CREATE INDEX IF NOT EXISTS idx_metrics_agent_metric_ts ON metrics (agent, metric, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_metrics_ts ON metrics (ts)",
+    ROLLUP_DDL,
+    "CREATE INDEX IF NOT EXISTS idx_metrics_rollup_bucket ON metrics_rollup (resolution, bucket)",
+    _backfill_metric_ts,
+]
+
+INSERT_POINT_SQL = "INSERT INTO metrics (timestamp, agent, metric, value, ts) VALUES (?, ?, ?, ?, ?)"
+UPSERT_ROLLUP_SQL = """
+    INSERT INTO metrics_rollup (agent, metric, resolution, bucket, min, max, sum, count)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+    ON CONFLICT (agent, metric, resolution, bucket) DO UPDATE SET
+        min = MIN(min, excluded.min),
+        max = MAX(max, excluded.max),
+        sum = sum + excluded.sum,
+        count = count + 1
+"""
+RAW_RANGE_SQL = """
+    SELECT ts, value FROM metrics
+    WHERE agent = ? AND metric = ? AND ts >= ? AND ts < ?
+    ORDER BY ts
+"""
+RAW_COUNT_SQL = """
+    SELECT COUNT(*) FROM (
+        SELECT 1 FROM metrics WHERE agent = ? AND metric = ? AND ts >= ? AND ts < ? LIMIT ?
+    )
+"""
+ROLLUP_RANGE_SQL = """
+    SELECT bucket, min, max, sum, count FROM metrics_rollup
+    WHERE agent = ? AND metric = ? AND resolution = ? AND bucket >= ? AND bucket < ?
+    ORDER BY bucket
+"""
+
+
+class TimeSeriesStore:
+    """Puntos crudos + rollups 1m/1h/1d con retención, sobre una base SQLite compartida."""
+
+    def __init__(self, path=DEFAULT_DB_PATH, retention: dict = None, retention_every: int = 1000):
+        self.path = path
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.retention_every = retention_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        return get_connection(self.path, SCHEMA)
+
+    # --- Escritura ---
+    def record(self, agent: str, metric: str, value, ts: int = None, timestamp: str = None):
+        """Guarda un punto numérico y actualiza sus rollups en una sola transacción."""
+        self.record_many([(agent, metric, value, ts, timestamp)])
+
+    def record_many(self, points):
+        """``points``: iterable de ``(agent, metric, value[, ts[, timestamp]])``."""
+        rows, rollups = [], []
+        now = int(time.time())
+        for point in points:
+            agent, metric, value, ts, timestamp = (tuple(point) + (None, None))[:5]
+            ts = int(ts) if ts is not None else now
+            value = float(value)
+            rows.append((timestamp or datetime.fromtimestamp(ts).isoformat(), agent, metric, value, ts))
+            for seconds in RESOLUTIONS.values():
+                rollups.append((agent, metric, seconds, ts - ts % seconds, value, value, value))
+        if not rows:
+            return
+        conn = self._conn()
+        with conn:
+            conn.executemany(INSERT_POINT_SQL, rows)
+            conn.executemany(UPSERT_ROLLUP_SQL, rollups)
+
+        with self._lock:
+            self._writes += len(rows)
+            due = self.retention_every and self._writes >= self.retention_every
+            if due:
+                self._writes = 0
+        if due:
+            self.apply_retention()
+
+    def apply_retention(self, now: int = None) -> dict:
+        """Borra puntos crudos y rollups más viejos que su retención; devuelve filas borradas por nivel."""
+        now = int(now if now is not None else time.time())
+        deleted = {}
+        conn = self._conn()
+        with conn:
+            keep = self.retention.get("raw")
+            if keep is not None:
+                deleted["raw"] = conn.execute("DELETE FROM metrics WHERE ts < ?", (now - keep,)).rowcount
+            for name, seconds in RESOLUTIONS.items():
+                keep = self.retention.get(name)
+                if keep is not None:
+                    deleted[name] = conn.execute(
+                        "DELETE FROM metrics_rollup WHERE resolution = ? AND bucket < ?", (seconds, now - keep)
+                    ).rowcount
+        return deleted
+
+    # --- Lectura ---
+    def pick_resolution(self, agent: str, metric: str, start: int, end: int, max_points: int = 1000) -> str:
+        """Nivel más fino que cubre ``[start, end)`` dentro de su retención y con ``<= max_points`` filas."""
+        now = int(time.time())
+
+        def retained(name):
+            keep = self.retention.get(name)
+            return keep is None or start >= now - keep
+
+        if retained("raw"):
+            count = self._conn().execute(RAW_COUNT_SQL, (agent, metric, start, end, max_points + 1)).fetchone()[0]
+            if count <= max_points:
+                return "raw"
+        for name, seconds in RESOLUTIONS.items():
+            if retained(name) and (end - start) / seconds <= max_points:
+                return name
+        return "1d"
+
+    def query(self, agent: str, metric: str, start: int = None, end: int = None,
+              resolution: str = "auto", max_points: int = 1000):
+        """Serie en ``[start, end)`` como dicts ``{ts, min, max, avg, count}`` ordenados por ``ts``.
+
+        ``resolution`` es ``"raw"``, ``"1m"``, ``"1h"``, ``"1d"`` o ``"auto"``.
+        """
+        end = int(end if end is not None else time.time() + 1)
+        start = int(start if start is not None else end - DAY)
+        if resolution == "auto":
+            resolution = self.pick_resolution(agent, metric, start, end, max_points)
+
+        conn = self._conn()
+        if resolution == "raw":
+            return [{"ts": ts, "min": v, "max": v, "avg": v, "count": 1}
+                    for ts, v in conn.execute(RAW_RANGE_SQL, (agent, metric, start, end))]
+
+        seconds = RESOLUTIONS[resolution]
+        rows = conn.execute(ROLLUP_RANGE_SQL, (agent, metric, seconds, start - start % seconds, end))
+        return [{"ts": bucket, "min": lo, "max": hi, "avg": total / count if count else None, "count": count}
+                for bucket, lo, hi, total, count in rows]
+
+    def summary(self, agent: str, metric: str, start: int = None, end: int = None) -> dict:
+        """Agregado único del rango (min/max/avg/count) sobre la serie que devuelve ``query``."""
+        series = self.query(agent, metric, start, end)
+        count = sum(p["count"] for p in series)
+        return {
+            "count": count,
+            "min": min((p["min"] for p in series), default=None),
+            "max": max((p["max"] for p in series), default=None),
+            "avg": sum(p["avg"] * p["count"] for p in series) / count if count else None,
+        }
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(path=DEFAULT_DB_PATH) -> TimeSeriesStore:
+    """Store compartido por base: el contador de escrituras (y la retención) se acumula entre llamadas."""
+    key = str(Path(path).resolve())
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = TimeSeriesStore(path)
+        return store
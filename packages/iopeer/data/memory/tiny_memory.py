@@ -1,25 +1,108 @@
 import os
 import json
-import sqlite3
+import time
 from datetime import datetime
-from tinydb import TinyDB, Query
 from pathlib import Path
+from iopeer.data.memory.log_store import AppendOnlyLogStore
+from iopeer.data.memory.connection_pool import get_connection, ensure_columns
+from iopeer.data.memory.timeseries import get_store, SCHEMA as TIMESERIES_SCHEMA
 
 # Ruta base del sistema
 BASE_DIR = Path(__file__).resolve().parent
 DB_TINY_PATH = BASE_DIR / "tiny_memory.json"
+DB_LOG_DIR = BASE_DIR / "tiny_memory"
 DB_SQLITE_PATH = BASE_DIR / "git_diagnostics.db"
 
+# Retención del log append-only (registros conservados tras compactar)
+MAX_RECORDS = int(os.getenv("TINY_MEMORY_MAX_RECORDS", "100000"))
+
+# Esquema de git_diagnostics.db (se aplica una vez por proceso vía connection_pool)
+GIT_DIAGNOSTICS_DDL = """
+    CREATE TABLE IF NOT EXISTS git_diagnostics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        local_branch TEXT,
+        remote_branch TEXT,
+        ahead INTEGER,
+        behind INTEGER,
+        staged_count INTEGER,
+        unstaged_count INTEGER,
+        untracked_count INTEGER,
+        is_tracking INTEGER,
+        is_synced INTEGER
+    )
+"""
+# Columnas del modo incremental (firma del estado del repo al tomar el snapshot)
+GIT_DIAGNOSTICS_STATE_COLUMNS = [
+    ("kind", "TEXT"),
+    ("repo", "TEXT"),
+    ("index_mtime_ns", "INTEGER"),
+    ("index_size", "INTEGER"),
+    ("head_sha", "TEXT"),
+    ("orig_head_sha", "TEXT"),
+    ("upstream_sha", "TEXT"),
+]
+GIT_DIAGNOSTICS_MIGRATION = ensure_columns("git_diagnostics", GIT_DIAGNOSTICS_STATE_COLUMNS)
+GIT_DIAGNOSTICS_REPO_INDEX = "CREATE INDEX IF NOT EXISTS idx_git_diagnostics_repo ON git_diagnostics (repo, kind, id DESC)"
+# Epoch entero para consultas por rango; las filas viejas se completan desde el ISO (UTC)
+GIT_DIAGNOSTICS_TS_MIGRATION = ensure_columns("git_diagnostics", [("ts", "INTEGER")])
+GIT_DIAGNOSTICS_TS_BACKFILL = "UPDATE git_diagnostics SET ts = CAST(strftime('%s', timestamp) AS INTEGER) WHERE ts IS NULL"
+GIT_DIAGNOSTICS_TS_INDEX = "CREATE INDEX IF NOT EXISTS idx_git_diagnostics_ts ON git_diagnostics (repo, ts)"
+GIT_DIAGNOSTICS_SCHEMA = [
+    GIT_DIAGNOSTICS_DDL, GIT_DIAGNOSTICS_MIGRATION, GIT_DIAGNOSTICS_REPO_INDEX,
+    GIT_DIAGNOSTICS_TS_MIGRATION, GIT_DIAGNOSTICS_TS_INDEX, GIT_DIAGNOSTICS_TS_BACKFILL,
+]
+# La tabla metrics (con ts entero y rollups) pertenece a iopeer.data.memory.timeseries
+SQLITE_SCHEMA = GIT_DIAGNOSTICS_SCHEMA + TIMESERIES_SCHEMA
+
+INSERT_GIT_DIAGNOSTIC_SQL = """
+    INSERT INTO git_diagnostics (
+        timestamp, local_branch, remote_branch,
+        ahead, behind, staged_count, unstaged_count,
+        untracked_count, is_tracking, is_synced, ts
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_GIT_SNAPSHOT_SQL = """
+    INSERT INTO git_diagnostics (
+        timestamp, local_branch, remote_branch,
+        ahead, behind, staged_count, unstaged_count,
+        untracked_count, is_tracking, is_synced,
+        kind, repo, index_mtime_ns, index_size,
+        head_sha, orig_head_sha, upstream_sha, ts
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 class TinyMemory:
-    def __init__(self):
-        self.db = TinyDB(DB_TINY_PATH)
+    def __init__(self, log_dir=DB_LOG_DIR, legacy_path=None):
+        # El JSON de TinyDB vive junto al directorio del log: <log_dir>.json
+        self.log_dir = Path(log_dir)
+        self.db = AppendOnlyLogStore(self.log_dir, max_records=MAX_RECORDS)
+        self.timeseries = get_store(DB_SQLITE_PATH)
+        self._migrate_legacy(Path(legacy_path) if legacy_path else self.log_dir.with_suffix(".json"))
+
+    def _migrate_legacy(self, legacy_path):
+        """Importa una única vez el JSON de TinyDB (``legacy_path``) al log append-only."""
+        if not legacy_path.exists():
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                tables = json.load(f) or {}
+            for table in tables.values():
+                for _, record in sorted(table.items(), key=lambda item: int(item[0])):
+                    self.db.append(record)
+            legacy_path.rename(legacy_path.with_suffix(".json.migrated"))
+            print(f"📦 {legacy_path.name} migrado a {self.log_dir.name}/")
+        except Exception as e:
+            print(f"⚠️ Error migrando {legacy_path.name}: {e}")
 
     # 🧠 --- Función principal de guardado ---
     def save_log(self, data: dict):
-        """Guarda un log en TinyDB y sincroniza datos estructurados en SQLite"""
+        """Guarda un log en el log append-only y sincroniza datos estructurados en SQLite"""
         data["timestamp"] = data.get("timestamp", datetime.utcnow().isoformat())
-        self.db.insert(data)
-        print(f"💾 Log guardado en TinyMemory ({DB_TINY_PATH.name})")
+        self.db.append(data)
+        print(f"💾 Log guardado en TinyMemory ({self.log_dir.name}/)")
 
         # Intentar sincronizar en SQLite si es un log de Git
         if data.get("agent") == "git":
@@ -34,36 +117,15 @@ class TinyMemory:
             "value": value
         }
         # Guardar también en TinyMemory
-        self.db.insert(record)
+        self.db.append(record)
         print(f"📈 Métrica '{metric_name}' registrada para agente '{agent_name}'.")
 
-        # Intentar sincronizar en SQLite
+        # Intentar sincronizar en SQLite (serie temporal + rollups; sólo valores numéricos)
+        if not isinstance(value, (int, float)):
+            print(f"ℹ️ Métrica '{metric_name}' no numérica: sólo se guarda en TinyMemory.")
+            return
         try:
-            conn = sqlite3.connect(DB_SQLITE_PATH)
-            cursor = conn.cursor()
-
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                agent TEXT,
-                metric TEXT,
-                value REAL
-            )
-            """)
-
-            cursor.execute("""
-                INSERT INTO metrics (timestamp, agent, metric, value)
-                VALUES (?, ?, ?, ?)
-            """, (
-                record["timestamp"],
-                record["agent"],
-                record["metric"],
-                record["value"]
-            ))
-
-            conn.commit()
-            conn.close()
+            self.timeseries.record(agent_name, metric_name, value, timestamp=record["timestamp"])
             print(f"📊 Métrica '{metric_name}' guardada en {DB_SQLITE_PATH.name}")
         except Exception as e:
             print(f"⚠️ Error al guardar métrica en SQLite: {e}")
@@ -73,26 +135,6 @@ class TinyMemory:
     def _sync_with_sqlite(self, data: dict):
         """Extrae datos estructurados del log y los guarda en git_diagnostics.db"""
         try:
-            conn = sqlite3.connect(DB_SQLITE_PATH)
-            cursor = conn.cursor()
-
-            # Crear la tabla si no existe
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS git_diagnostics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                local_branch TEXT,
-                remote_branch TEXT,
-                ahead INTEGER,
-                behind INTEGER,
-                staged_count INTEGER,
-                unstaged_count INTEGER,
-                untracked_count INTEGER,
-                is_tracking INTEGER,
-                is_synced INTEGER
-            )
-            """)
-
             # Extraer datos del log
             output = data.get("output", "")
             local_branch = "main" if "On branch main" in output else "unknown"
@@ -103,34 +145,33 @@ class TinyMemory:
             is_tracking = 1 if "Your branch is up to date" in output else 0
             is_synced = 1 if "up to date" in output else 0
 
-            cursor.execute("""
-                INSERT INTO git_diagnostics (
-                    timestamp, local_branch, remote_branch,
-                    ahead, behind, staged_count, unstaged_count,
-                    untracked_count, is_tracking, is_synced
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                data.get("timestamp"),
-                local_branch,
-                remote_branch,
-                0, 0, staged, unstaged, untracked, is_tracking, is_synced
-            ))
-
-            conn.commit()
-            conn.close()
+            conn = get_connection(DB_SQLITE_PATH, SQLITE_SCHEMA)
+            with conn:
+                conn.execute(INSERT_GIT_DIAGNOSTIC_SQL, (
+                    data.get("timestamp"),
+                    local_branch,
+                    remote_branch,
+                    0, 0, staged, unstaged, untracked, is_tracking, is_synced,
+                    int(time.time())
+                ))
             print(f"📊 Datos estructurados guardados en {DB_SQLITE_PATH.name}")
         except Exception as e:
             print(f"⚠️ Error al sincronizar con SQLite: {e}")
 
     # --- Recuperar logs ---
     def get_logs(self, limit=20):
-        logs = self.db.all()[-limit:]
-        return logs
+        return self.db.tail(limit)
+
+    def tail(self, agent, limit=5, since=None):
+        """Últimos logs del agente leyendo el log append-only desde el final."""
+        return self.db.tail(limit, agent=agent, since=since)
+
+    def get_recent_logs(self, agent, limit=5):
+        return self.tail(agent, limit)
 
-    # --- Borrar base de TinyDB ---
+    # --- Borrar el log append-only ---
     def clear(self):
-        self.db.truncate()
+        self.db.clear()
         print("🧹 TinyMemory limpiada.")
 
 # --- Prueba directa ---
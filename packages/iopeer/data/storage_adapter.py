@@ -1,13 +1,46 @@
 
 import os, json, datetime
+from iopeer.data.memory.log_store import read_lines_reverse, tail_records
 
 class DataLayer:
-    def __init__(self, db_path="iopeer/data/memory/autopilot_logs.json"):
+    """Log de eventos del autopilot en formato NDJSON (una línea JSON por evento).
+
+    Registrar un evento es un único append; los lectores recorren el archivo en
+    streaming con ``iter_events`` o desde el final con ``tail``.
+    """
+
+    def __init__(self, db_path="iopeer/data/memory/autopilot_logs.ndjson"):
         self.db_path = db_path
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._migrate_legacy()
         if not os.path.exists(db_path):
-            with open(db_path, "w") as f:
-                json.dump([], f)
+            open(db_path, "a", encoding="utf-8").close()
+
+    def _migrate_legacy(self):
+        """Convierte una única vez el arreglo JSON heredado (autopilot_logs.json) a NDJSON."""
+        root, _ = os.path.splitext(self.db_path)
+        for legacy in (self.db_path, root + ".json"):
+            if not os.path.exists(legacy):
+                continue
+            with open(legacy, "r", encoding="utf-8") as f:
+                head = f.read(64).lstrip()
+            if not head.startswith("["):
+                continue
+
+            with open(legacy, "r", encoding="utf-8") as f:
+                events = json.load(f)
+            tmp = self.db_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as dst:
+                for entry in events:
+                    dst.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                # Eventos NDJSON ya existentes son posteriores al arreglo heredado
+                if legacy != self.db_path and os.path.exists(self.db_path):
+                    with open(self.db_path, "r", encoding="utf-8") as src:
+                        dst.writelines(src)
+            os.replace(tmp, self.db_path)
+            if legacy != self.db_path:
+                os.rename(legacy, legacy + ".migrated")
+            print(f"📦 {os.path.basename(legacy)} migrado a NDJSON ({len(events)} eventos)")
 
     def log_event(self, agent, action, status, output):
         entry = {
@@ -17,7 +50,35 @@ class DataLayer:
             "status": status,
             "output": output[:5000],
         }
-        data = json.load(open(self.db_path))
-        data.append(entry)
-        with open(self.db_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with open(self.db_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def iter_events(self, agent=None, since=None):
+        """Itera los eventos en orden cronológico sin cargar el archivo completo.
+
+        ``since`` filtra eventos con timestamp ISO estrictamente posterior.
+        """
+        with open(self.db_path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if agent is not None and event.get("agent") != agent:
+                    continue
+                if since is not None and event.get("timestamp", "") <= since:
+                    continue
+                yield event
+
+    def tail(self, limit=5, agent=None, since=None):
+        """Últimos ``limit`` eventos leyendo el archivo desde el final."""
+        def newest_first():
+            for line in read_lines_reverse(self.db_path):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        return tail_records(newest_first(), limit, agent=agent, since=since)
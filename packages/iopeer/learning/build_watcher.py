@@ -0,0 +1,132 @@
+"""
+build_watcher.py — Vigila un build en vivo y arranca la reparación antes de que termine.
+
+El build corre sobre ``shell_tools.run_cmd_async``; cada línea se compara con
+las firmas de error de ``log_fingerprint`` (TypeScript, módulos faltantes,
+Next.js, pnpm, entorno...). Con la primera firma fatal se espera un instante
+(``settle``) para juntar el contexto del error y se lanza ``on_error`` con el
+log acumulado (clasificación + parche) en paralelo con el resto del build, que
+opcionalmente se aborta (``abort_on_fatal``). La métrica principal es el
+tiempo hasta el primer parche (``time_to_first_patch``).
+"""
+
+import asyncio
+import inspect
+import time
+from collections import deque
+
+from iopeer.utils.shell_tools import run_cmd_async, DEFAULT_TIMEOUT
+from iopeer.utils.log_fingerprint import extract_signatures
+
+# Firmas tras las cuales el build ya no puede terminar bien
+FATAL_KINDS = {"typescript", "module_not_found", "nest_di", "next_type_error",
+               "next_prerender", "syntax_error", "pnpm", "env"}
+MAX_CONTEXT_LINES = 4000
+
+
+class BuildWatcher:
+    """Ejecuta ``cmd`` y dispara ``on_error(log_text)`` con la primera firma fatal."""
+
+    def __init__(self, cmd: str, cwd=None, on_error=None, abort_on_fatal: bool = False,
+                 settle: float = 1.0, settle_lines: int = 40, timeout: float = DEFAULT_TIMEOUT,
+                 fatal_kinds=FATAL_KINDS, subscribers=()):
+        self.cmd = cmd
+        self.cwd = cwd
+        self.on_error = on_error
+        self.abort_on_fatal = abort_on_fatal
+        self.settle = settle
+        self.settle_lines = settle_lines
+        self.timeout = timeout
+        self.fatal_kinds = set(fatal_kinds)
+        self.subscribers = list(subscribers)
+
+        self.lines = deque(maxlen=MAX_CONTEXT_LINES)
+        self.signatures = []
+        self._previous = ""
+        self._line_count = 0
+        self._first_error_line = None
+        self._first_error = None
+        self._detected = None
+        self._more_lines = None
+        self._start = None
+
+    def _on_line(self, stream, line):
+        self.lines.append(line)
+        self._line_count += 1
+        if self._first_error is not None:
+            if self._line_count - self._first_error_line >= self.settle_lines:
+                self._more_lines.set()
+            return
+        # Next.js imprime la ubicación en la línea anterior a "Type error:"
+        found = [s for s in extract_signatures(f"{self._previous}\n{line}") if s["kind"] in self.fatal_kinds]
+        self._previous = line
+        if found:
+            self.signatures = found
+            self._first_error_line = self._line_count
+            self._first_error = time.perf_counter() - self._start
+            self._detected.set()
+
+    async def _run_handler(self, text):
+        if inspect.iscoroutinefunction(self.on_error):
+            return await self.on_error(text)
+        return await asyncio.to_thread(self.on_error, text)
+
+    async def _react(self, build, stop):
+        """Espera la primera firma fatal, junta contexto y lanza ``on_error`` mientras el build sigue."""
+        detected = asyncio.ensure_future(self._detected.wait())
+        await asyncio.wait({detected, build}, return_when=asyncio.FIRST_COMPLETED)
+        if not detected.done():
+            detected.cancel()
+            # La última línea pudo marcar el error justo antes de que el build terminara
+            if not self._detected.is_set():
+                return None
+        more = asyncio.ensure_future(self._more_lines.wait())
+        await asyncio.wait({more, build}, timeout=self.settle, return_when=asyncio.FIRST_COMPLETED)
+        more.cancel()
+        if self.abort_on_fatal:
+            stop.set()
+        if self.on_error is None:
+            return None
+        started = time.perf_counter() - self._start
+        result = await self._run_handler("\n".join(self.lines))
+        return {"started_at": started, "finished_at": time.perf_counter() - self._start, "result": result}
+
+    async def run_async(self) -> dict:
+        self._start = time.perf_counter()
+        self._detected = asyncio.Event()
+        self._more_lines = asyncio.Event()
+        stop = asyncio.Event()
+        build = asyncio.ensure_future(run_cmd_async(
+            self.cmd, cwd=self.cwd, timeout=self.timeout, stop=stop,
+            subscribers=[self._on_line, *self.subscribers],
+        ))
+        handler = await self._react(build, stop)
+        result = await build
+        build_seconds = result["duration"]
+
+        def seconds(value):
+            return round(value, 3) if value is not None else None
+
+        report = {
+            "build": result,
+            "signatures": self.signatures,
+            "first_error_at": seconds(self._first_error),
+            "handler_started_at": seconds(handler["started_at"]) if handler else None,
+            "time_to_first_patch": seconds(handler["finished_at"]) if handler else None,
+            "handler_result": handler["result"] if handler else None,
+            "build_seconds": build_seconds,
+        }
+        if handler and not result["aborted"]:
+            # Flujo secuencial equivalente: esperar el build completo y recién ahí reparar
+            handler_seconds = handler["finished_at"] - handler["started_at"]
+            report["sequential_estimate"] = round(build_seconds + handler_seconds, 3)
+            report["saved_seconds"] = round(report["sequential_estimate"] - handler["finished_at"], 3)
+        return report
+
+    def run(self) -> dict:
+        return asyncio.run(self.run_async())
+
+
+def watch_build(cmd: str, cwd=None, on_error=None, abort_on_fatal: bool = False, **kwargs) -> dict:
+    """Atajo síncrono: ejecuta el build con ``BuildWatcher`` y devuelve el reporte."""
+    return BuildWatcher(cmd, cwd=cwd, on_error=on_error, abort_on_fatal=abort_on_fatal, **kwargs).run()
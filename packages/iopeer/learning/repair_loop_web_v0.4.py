@@ -5,12 +5,14 @@ Analiza errores de compilación o runtime en Next.js y los envía a agentes espe
 """
 
 import os
-import subprocess
 import datetime
 from pathlib import Path
 from openai import OpenAI
 from agents.router import dispatch_agent
 from modules.logger import log_event
+from iopeer.data.storage_adapter import DataLayer
+from iopeer.utils.error_classifier import ErrorClassifier, TfidfCentroidModel, examples_from_events, MODEL_CHARS
+from iopeer.learning.build_watcher import watch_build
 
 # === Configuración base ===
 ROOT = Path(__file__).resolve().parents[2]
@@ -19,23 +21,49 @@ REPORTS.mkdir(parents=True, exist_ok=True)
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def get_web_errors():
-    """Ejecuta el build de Next.js y devuelve la salida de error."""
+# Confianza mínima del clasificador local para no consultar al LLM
+CLASSIFIER_THRESHOLD = float(os.getenv("CLASSIFIER_THRESHOLD", "0.6"))
+# Cortar el build apenas aparece un error fatal (la reparación ya arrancó con ese contexto)
+ABORT_ON_FATAL = os.getenv("REPAIR_ABORT_ON_FATAL", "0") == "1"
+_classifier = None
+
+def get_classifier():
+    """Clasificador local; si hay clasificaciones previas del LLM en memoria, entrena el modelo TF-IDF."""
+    global _classifier
+    if _classifier is None:
+        examples = list(examples_from_events(DataLayer().iter_events(agent="classifier")))
+        model = TfidfCentroidModel().fit(examples) if examples else None
+        _classifier = ErrorClassifier(model=model, threshold=CLASSIFIER_THRESHOLD)
+    return _classifier
+
+def get_web_errors(on_error=None):
+    """Ejecuta el build de Next.js vigilando la salida en vivo.
+
+    Con el primer error fatal se llama a ``on_error(log)`` mientras el build
+    sigue corriendo. Devuelve ``(salida de error o None, reporte del watcher)``.
+    """
     log_event("WEB", "🧱 Ejecutando build de Next.js...")
-    process = subprocess.run(
-        ["pnpm", "build", "--filter", "web"],
-        cwd=ROOT,
-        capture_output=True,
-        text=True
-    )
-    if process.returncode == 0:
+    report = watch_build("pnpm build --filter web", cwd=ROOT, on_error=on_error, abort_on_fatal=ABORT_ON_FATAL)
+    build = report["build"]
+    if build["ok"]:
         log_event("WEB", "✅ Compilación exitosa.")
-        return None
-    return process.stderr or process.stdout
+        return None, report
+    return build["stderr"] or build["stdout"], report
+
+def start_repair(log_text):
+    """Clasifica y despacha el agente; corre en paralelo con el build."""
+    error_type = classify_error(log_text)
+    log_event("WEB", f"🧭 Enviando al router para tipo {error_type}")
+    return error_type, dispatch_agent(error_type, log_text, target="web")
 
 def classify_error(log_text):
-    """Usa OpenAI para clasificar el tipo de error de la web."""
-    log_event("WEB", "🧠 Clasificando error con OpenAI...")
+    """Clasifica el error localmente; usa OpenAI sólo si la confianza queda bajo el umbral."""
+    local = get_classifier().classify(log_text)
+    if local["confident"]:
+        log_event("WEB", f"📊 Tipo de error detectado (local, {local['confidence']:.2f}): {local['label']}")
+        return local["label"]
+
+    log_event("WEB", f"🧠 Confianza local baja ({local['confidence']:.2f}); clasificando error con OpenAI...")
     try:
         response = client.chat.completions.create(
             model="gpt-4o-mini",
@@ -47,6 +75,8 @@ def classify_error(log_text):
         )
         error_type = response.choices[0].message.content.strip()
         log_event("WEB", f"📊 Tipo de error detectado: {error_type}")
+        # Queda como ejemplo etiquetado para entrenar el clasificador local (el final del log, que es lo que ve)
+        DataLayer().log_event("classifier", error_type, "labeled", log_text[-MODEL_CHARS:])
         return error_type
     except Exception as e:
         log_event("WEB", f"💥 Error clasificando error: {e}")
@@ -55,7 +85,7 @@ def classify_error(log_text):
 def repair_web():
     """Ciclo completo de reparación para la Web."""
     log_event("WEB", "🚀 Iniciando Repair Loop — WEB")
-    logs = get_web_errors()
+    logs, report = get_web_errors(on_error=start_repair)
     if not logs:
         log_event("WEB", "✅ No hay errores detectados.")
         return
@@ -65,12 +95,14 @@ def repair_web():
     with open(log_path, "w", encoding="utf-8") as f:
         f.write(logs)
 
-    # Clasificar error
-    error_type = classify_error(logs)
-
-    # Despachar agente
-    log_event("WEB", f"🧭 Enviando al router para tipo {error_type}")
-    dispatch_agent(error_type, logs)
+    if report["time_to_first_patch"] is not None:
+        log_event("WEB", f"⏱️ Primer error a los {report['first_error_at']:.1f}s; parche listo a los "
+                         f"{report['time_to_first_patch']:.1f}s (build: {report['build_seconds']:.1f}s)")
+        if report.get("saved_seconds") is not None:
+            log_event("WEB", f"⚡ {report['saved_seconds']:.1f}s antes que esperar el build completo")
+    else:
+        # Ninguna firma conocida apareció en vivo: reparación con el log completo
+        start_repair(logs)
 
     log_event("WEB", "🏁 Fin del ciclo de reparación WEB")
     print("=" * 60)
@@ -0,0 +1,271 @@
+"""
+batch_eval.py — Evaluación por lotes de ejecuciones de agentes.
+
+Trabaja sobre columnas (agent, status, duration, ts) en vez de una lista de
+dicts. ``agent`` y ``status`` se codifican como diccionario una sola vez al
+armar el ``LogBatch`` (códigos enteros + nombres, como los DictionaryArray de
+Arrow); con NumPy todas las métricas salen después de una pasada vectorizada:
+conteos con ``bincount`` y ordenamientos por agente para la ventana móvil y
+los percentiles, así puntuar millones de ejecuciones históricas no
+recorre ningún dict.
+
+Por agente se calcula:
+
+- ``score`` / ``success`` / ``errors``: como ``EvalLayer.evaluate``
+- ``rolling_score``: tasa de éxito de las últimas ``window`` ejecuciones
+- ``error_trend``: pendiente de la tasa de error por bucket de ``bucket_seconds``
+  (positiva = empeora)
+- ``p50`` / ``p90`` / ``p99``: latencias (``duration``) por percentil
+
+NumPy es opcional (``pip install iopeer[metrics]``); sin él se usa la misma
+lógica en Python puro. Acepta también tablas de Arrow (``pyarrow.Table``).
+"""
+
+import math
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+COLUMNS = ("agent", "status", "duration", "ts")
+SUCCESS = "success"
+DEFAULT_WINDOW = 100
+DEFAULT_BUCKET = 3600
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def _to_epoch(value):
+    """Epoch en segundos; los valores ilegibles cuentan como 0 (primer bucket)."""
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _factorize(values):
+    """``(nombres, códigos)`` en orden de primera aparición."""
+    index = {}
+    codes = [index.setdefault(v, len(index)) for v in values]
+    return list(index), codes
+
+
+class LogBatch:
+    """Ejecuciones en columnas: ``agents`` + ``codes`` (agente por fila), ``ok``, ``duration`` (s) y ``ts`` (epoch s)."""
+
+    def __init__(self, agent, status, duration=None, ts=None):
+        agents, codes = _factorize(agent)
+        statuses, status_codes = _factorize(status)
+        success = statuses.index(SUCCESS) if SUCCESS in statuses else -1
+        self._set(agents, codes, [c == success for c in status_codes], duration, ts)
+
+    def _set(self, agents, codes, ok, duration, ts):
+        n = len(codes)
+        self.agents = list(agents)
+        duration = [math.nan] * n if duration is None else duration
+        ts = list(range(n)) if ts is None else ts
+        if np is not None:
+            self.codes = np.asarray(codes, dtype=np.int64)
+            self.ok = np.asarray(ok, dtype=bool)
+            if isinstance(duration, list):
+                duration = [math.nan if d is None else d for d in duration]
+            self.duration = np.asarray(duration, dtype=float)
+            self.ts = self._epoch_array(ts)
+        else:
+            self.codes = list(codes)
+            self.ok = list(ok)
+            self.duration = [math.nan if d is None else float(d) for d in duration]
+            self.ts = [_to_epoch(t) for t in ts]
+
+    @staticmethod
+    def _epoch_array(ts):
+        ts = np.asarray(ts)
+        if ts.dtype.kind in "iuf":
+            return ts.astype(float)
+        if ts.dtype.kind == "M":
+            return ts.astype("datetime64[ms]").astype("int64") / 1000.0
+        return np.fromiter((_to_epoch(t) for t in ts), dtype=float, count=len(ts))
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_records(cls, logs):
+        """Desde dicts de log (``timestamp`` se usa si no hay ``ts``)."""
+        logs = list(logs)
+        return cls(
+            [log.get("agent") for log in logs],
+            [log.get("status") for log in logs],
+            [log.get("duration") for log in logs],
+            [log.get("ts", log.get("timestamp")) for log in logs],
+        )
+
+    @classmethod
+    def from_arrow(cls, table):
+        """Desde una ``pyarrow.Table`` con las columnas de ``COLUMNS``, sin pasar por objetos Python."""
+        names = set(table.column_names)
+
+        def encoded(name):
+            col = table.column(name).dictionary_encode().combine_chunks()
+            indices = col.indices.to_numpy(zero_copy_only=False) if np is not None else col.indices.to_pylist()
+            return col.dictionary.to_pylist(), indices
+
+        def numeric(name):
+            if name not in names:
+                return None
+            col = table.column(name)
+            return col.to_numpy() if np is not None else col.to_pylist()
+
+        agents, codes = encoded("agent")
+        statuses, status_codes = encoded("status")
+        success = statuses.index(SUCCESS) if SUCCESS in statuses else -1
+        batch = cls.__new__(cls)
+        batch._set(agents, codes, [c == success for c in status_codes] if np is None else status_codes == success,
+                   numeric("duration"), numeric("ts"))
+        return batch
+
+
+def _percentile(sorted_values, p):
+    """Interpolación lineal, igual que ``numpy.percentile``."""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * p / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def _slope(xs, ys):
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mx, my = sum(xs) / n, sum(ys) / n
+    var = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var if var else 0.0
+
+
+def _round(value, digits=4):
+    return None if value is None or math.isnan(value) else round(float(value), digits)
+
+
+def _evaluate_python(batch, window, bucket_seconds, percentiles):
+    groups = [[] for _ in batch.agents]
+    for i, code in enumerate(batch.codes):
+        groups[code].append(i)
+    results = []
+    for idx in groups:
+        idx.sort(key=lambda i: batch.ts[i])
+        ok = [batch.ok[i] for i in idx]
+        buckets = {}
+        for i, good in zip(idx, ok):
+            b = buckets.setdefault(batch.ts[i] // bucket_seconds, [0, 0])
+            b[0] += 1
+            b[1] += not good
+        xs = sorted(buckets)
+        durations = sorted(d for d in (batch.duration[i] for i in idx) if not math.isnan(d))
+        recent = ok[-window:]
+        results.append({
+            "runs": len(idx),
+            "success": sum(ok),
+            "score": sum(ok) / len(ok) if ok else 0.0,
+            "rolling_score": sum(recent) / len(recent) if recent else 0.0,
+            "error_trend": _slope(xs, [buckets[x][1] / buckets[x][0] for x in xs]),
+            **{f"p{p}": _percentile(durations, p) for p in percentiles},
+        })
+    return results
+
+
+def _evaluate_numpy(batch, window, bucket_seconds, percentiles):
+    codes, ok, k = batch.codes, batch.ok, len(batch.agents)
+    runs = np.bincount(codes, minlength=k)
+    success = np.bincount(codes, weights=ok, minlength=k)
+
+    # Ventana móvil: éxitos acumulados por agente en orden temporal
+    order = np.lexsort((batch.ts, codes))
+    cumulative = np.concatenate(([0], np.cumsum(ok[order], dtype=np.int64)))
+    ends = np.cumsum(runs)
+    window_start = np.maximum(ends - runs, ends - window)
+    rolling = (cumulative[ends] - cumulative[window_start]) / np.maximum(ends - window_start, 1)
+
+    # Tendencia: tasa de error por (agente, bucket) y pendiente por mínimos cuadrados.
+    # Los buckets se cuentan desde el primero del lote para que la clave entera sea chica.
+    buckets = np.floor(batch.ts / bucket_seconds).astype(np.int64)
+    buckets -= buckets.min()
+    span = int(buckets.max()) + 1
+    keys, key_idx = np.unique(codes * span + buckets, return_inverse=True)
+    rate = np.bincount(key_idx, weights=~ok) / np.bincount(key_idx)
+    key_agent, x = keys // span, (keys % span).astype(float)
+    n = np.bincount(key_agent, minlength=k)
+    sx = np.bincount(key_agent, weights=x, minlength=k)
+    sy = np.bincount(key_agent, weights=rate, minlength=k)
+    sxy = np.bincount(key_agent, weights=x * rate, minlength=k)
+    sxx = np.bincount(key_agent, weights=x * x, minlength=k)
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trend = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, 0.0)
+
+    # Percentiles: duraciones conocidas ordenadas y luego agrupadas por agente con un
+    # orden estable (en floats es bastante más rápido que un lexsort de dos claves)
+    valid = ~np.isnan(batch.duration)
+    valid_codes = codes[valid]
+    durations = batch.duration[valid]
+    by_duration = np.argsort(durations)
+    durations = durations[by_duration][np.argsort(valid_codes[by_duration], kind="stable")]
+    counts = np.bincount(valid_codes, minlength=k)
+    offsets = np.cumsum(counts) - counts
+    quantiles = {}
+    for p in percentiles:
+        pos = (np.maximum(counts, 1) - 1) * p / 100
+        low = np.floor(pos).astype(np.int64)
+        high = np.minimum(low + 1, np.maximum(counts - 1, 0))
+        if len(durations):
+            lo_v = durations[np.minimum(offsets + low, len(durations) - 1)]
+            hi_v = durations[np.minimum(offsets + high, len(durations) - 1)]
+            quantiles[p] = np.where(counts > 0, lo_v + (hi_v - lo_v) * (pos - low), np.nan)
+        else:
+            quantiles[p] = np.full(k, np.nan)
+
+    return [
+        {
+            "runs": int(runs[i]),
+            "success": int(success[i]),
+            "score": success[i] / runs[i] if runs[i] else 0.0,
+            "rolling_score": rolling[i],
+            "error_trend": trend[i],
+            **{f"p{p}": quantiles[p][i] for p in percentiles},
+        }
+        for i in range(k)
+    ]
+
+
+def evaluate_batch(batch, window: int = DEFAULT_WINDOW, bucket_seconds: int = DEFAULT_BUCKET,
+                   percentiles=DEFAULT_PERCENTILES) -> dict:
+    """Métricas por agente ``{agent: {...}}`` para un ``LogBatch`` (o una lista de dicts de log)."""
+    if not isinstance(batch, LogBatch):
+        batch = LogBatch.from_records(batch)
+    if len(batch) == 0:
+        return {}
+    engine = _evaluate_numpy if np is not None else _evaluate_python
+    results = {}
+    for agent, metrics in zip(batch.agents, engine(batch, window, bucket_seconds, percentiles)):
+        if not metrics["runs"]:
+            continue
+        results[agent] = {
+            "agent": agent,
+            "status": "evaluated",
+            "runs": metrics["runs"],
+            "success": metrics["success"],
+            "errors": metrics["runs"] - metrics["success"],
+            "score": round(float(metrics["score"]), 2),
+            "rolling_score": _round(metrics["rolling_score"], 2),
+            "error_trend": _round(metrics["error_trend"], 6),
+            **{f"p{p}": _round(metrics[f"p{p}"]) for p in percentiles},
+        }
+    return results
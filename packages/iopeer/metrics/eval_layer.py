@@ -1,5 +1,9 @@
 # packages/iopeer/core/eval_layer.py
+import re
 from datetime import datetime
+from iopeer.metrics.batch_eval import evaluate_batch
+
+ERROR_RE = re.compile("error", re.IGNORECASE)
 
 class EvalLayer:
     """Evalúa ejecuciones de agentes y calcula métricas heurísticas."""
@@ -22,8 +26,14 @@ class EvalLayer:
             "errors": error_count,
         }
 
+    @staticmethod
+    def evaluate_batch(batch, **kwargs):
+        """Evalúa muchas ejecuciones de una vez (columnas o lista de dicts); ver ``batch_eval``."""
+        return evaluate_batch(batch, **kwargs)
+
     @staticmethod
     def evaluate_run(agent, command, output):
         """Evalúa la ejecución y devuelve un puntaje simple."""
-        score = 1.0 if "error" not in output.lower() else 0.0
+        # Búsqueda sin distinguir mayúsculas, sin copiar la salida en minúsculas
+        score = 0.0 if ERROR_RE.search(output) else 1.0
         return {"agent": agent, "command": command, "score": score}
@@ -0,0 +1,211 @@
+"""
+agent_sync.py — Reconciliación de agentes (OpenAI Assistants + Supabase).
+
+En lugar de crear todos los assistants en cada corrida, cada spec se resume
+en un hash (nombre, modelo, instrucciones, tools, metadata) y se compara con
+el registro local ``reports/status/agents_registry.json`` (el mismo que
+escribe ``planning/tasks.py``):
+
+- sin registro      → ``create`` (salvo que ya exista remoto con ese nombre)
+- hash distinto     → ``update`` del assistant existente
+- hash igual        → ``unchanged`` (cero llamadas remotas)
+
+Las llamadas remotas corren en un pool de hilos con límite y Supabase recibe
+un único upsert con todas las filas que cambiaron. Si el upsert falla, las
+entradas quedan marcadas ``supabase_pending`` en el registro y se reenvían en
+la próxima corrida aunque su spec no cambie. El upsert por ``name`` necesita la
+columna ``spec_hash`` y una restricción única en ``agents.name``
+(``planning/agents_supabase.sql``). ``client`` y ``supabase`` se inyectan, así
+que se puede probar sin red contra ``scripts/fake_openai_server.py``.
+"""
+
+import os
+import json
+import hashlib
+import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+AGENTS_REGISTRY = Path("reports/status/agents_registry.json")
+SYNC_WORKERS = int(os.getenv("AGENT_SYNC_WORKERS", "4"))
+DEFAULT_MODEL = "gpt-4-turbo"
+
+
+def normalize_spec(spec: dict) -> dict:
+    """Spec con los campos que importan y valores por defecto explícitos."""
+    return {
+        "name": spec["name"],
+        "model": spec.get("model", DEFAULT_MODEL),
+        "instructions": spec.get("instructions", ""),
+        "tools": spec.get("tools", []),
+        "metadata": spec.get("metadata", {}),
+    }
+
+
+def spec_hash(spec: dict) -> str:
+    canonical = json.dumps(normalize_spec(spec), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def load_registry(path=AGENTS_REGISTRY) -> dict:
+    """Registro ``{nombre: entrada}``; acepta también la lista ``[{name, id}]`` de ``tasks.py``."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if isinstance(data, dict):
+        data = data.get("agents", [])
+    return {entry["name"]: entry for entry in data if entry.get("name") and entry.get("id")}
+
+
+def save_registry(registry: dict, path=AGENTS_REGISTRY):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    entries = sorted(registry.values(), key=lambda e: e["name"])
+    tmp.write_text(json.dumps(entries, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def list_remote(client) -> dict:
+    """Assistants existentes ``{nombre: assistant}`` (se usa sólo si falta alguno en el registro)."""
+    remote = {}
+    for assistant in client.beta.assistants.list(limit=100):
+        remote.setdefault(assistant.name, assistant)
+    return remote
+
+
+def plan_sync(specs, registry: dict, remote: dict = None) -> list:
+    """Acciones ``{"action", "spec", "hash", "id"}`` necesarias para alinear ``specs``."""
+    actions = []
+    for spec in specs:
+        spec = normalize_spec(spec)
+        digest = spec_hash(spec)
+        entry = registry.get(spec["name"])
+        if entry is None and remote and spec["name"] in remote:
+            # Creado en otra máquina o antes de existir el registro: se adopta
+            assistant = remote[spec["name"]]
+            entry = {"id": assistant.id, "hash": (getattr(assistant, "metadata", None) or {}).get("spec_hash"),
+                     "supabase_pending": True}
+        if entry is None:
+            actions.append({"action": "create", "spec": spec, "hash": digest, "id": None})
+        elif entry.get("hash") != digest:
+            actions.append({"action": "update", "spec": spec, "hash": digest, "id": entry["id"]})
+        else:
+            actions.append({"action": "unchanged", "spec": spec, "hash": digest, "id": entry["id"],
+                            "supabase_pending": bool(entry.get("supabase_pending"))})
+    return actions
+
+
+def _is_not_found(error) -> bool:
+    return getattr(error, "status_code", None) == 404 or type(error).__name__ == "NotFoundError"
+
+
+def _apply(client, action: dict) -> dict:
+    spec = action["spec"]
+    # El hash viaja en la metadata del assistant para poder adoptarlo desde otro registro
+    params = dict(spec, metadata={**spec["metadata"], "spec_hash": action["hash"]})
+    if action["action"] == "update":
+        try:
+            assistant = client.beta.assistants.update(action["id"], **params)
+            return {**action, "id": assistant.id}
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            # Borrado remotamente: se vuelve a crear
+            action = {**action, "action": "create"}
+    assistant = client.beta.assistants.create(**params)
+    return {**action, "id": assistant.id}
+
+
+def _supabase_row(result: dict, now: str) -> dict:
+    spec = result["spec"]
+    return {
+        "name": spec["name"],
+        "model": spec["model"],
+        "metadata": spec["instructions"],
+        "assistant_id": result["id"],
+        "spec_hash": result["hash"],
+        "created_at": now,
+    }
+
+
+def sync_agents(specs, client, supabase=None, registry_path=AGENTS_REGISTRY, max_workers: int = SYNC_WORKERS,
+                adopt_remote: bool = True, log=print) -> dict:
+    """Crea/actualiza sólo lo que cambió y devuelve el resumen de la reconciliación."""
+    registry = load_registry(registry_path)
+    remote = None
+    if adopt_remote and any(normalize_spec(s)["name"] not in registry for s in specs):
+        try:
+            remote = list_remote(client)
+        except Exception as e:
+            log(f"⚠️ No se pudieron listar los assistants remotos: {e}")
+
+    actions = plan_sync(specs, registry, remote)
+    pending = [a for a in actions if a["action"] != "unchanged"]
+    done = [a for a in actions if a["action"] == "unchanged"]
+    failed = []
+
+    if pending:
+        log(f"🤖 Reconciliando {len(pending)} agente(s) ({len(done)} sin cambios)...")
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="agent-sync") as pool:
+            futures = {pool.submit(_apply, client, action): action for action in pending}
+            for future in as_completed(futures):
+                action = futures[future]
+                name = action["spec"]["name"]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    log(f"⚠️ Error al sincronizar agente {name}: {e}")
+                    failed.append({"name": name, "action": action["action"], "error": str(e)})
+                    continue
+                log(f"✅ Agente {name}: {result['action']} ({result['id']})")
+                done.append(result)
+    else:
+        log(f"♻️ {len(done)} agente(s) sin cambios, nada que sincronizar")
+
+    # Lo que cambió más lo que quedó sin subir (upsert fallido o adoptado de otro registro)
+    rows = [r for r in done if r["action"] != "unchanged" or r.get("supabase_pending")]
+    row_names = {r["spec"]["name"] for r in rows}
+    now = datetime.datetime.now().isoformat()
+    pushed = False
+    if supabase is not None and rows:
+        try:
+            # Un solo upsert con todas las filas modificadas
+            supabase.table("agents").upsert([_supabase_row(r, now) for r in rows], on_conflict="name").execute()
+            pushed = True
+            log(f"🗄️ Supabase: {len(rows)} fila(s) en un upsert")
+        except Exception as e:
+            log(f"⚠️ Error al registrar agentes en Supabase (se reintenta en la próxima corrida): {e}")
+
+    # El registro se escribe después del upsert: lo que no llegó a Supabase queda pendiente
+    for result in done:
+        name = result["spec"]["name"]
+        previous = registry.get(name, {})
+        entry = {
+            "name": name, "id": result["id"], "hash": result["hash"], "model": result["spec"]["model"],
+            "updated_at": previous.get("updated_at") if result["action"] == "unchanged" else now,
+        }
+        if supabase is not None and not pushed and name in row_names:
+            entry["supabase_pending"] = True
+        elif supabase is None and previous.get("supabase_pending"):
+            entry["supabase_pending"] = True
+        registry[name] = entry
+    save_registry(registry, registry_path)
+
+    order = {normalize_spec(s)["name"]: i for i, s in enumerate(specs)}
+    done.sort(key=lambda r: order[r["spec"]["name"]])
+    summary = {
+        "ids": [r["id"] for r in done],
+        "created": [r["spec"]["name"] for r in done if r["action"] == "create"],
+        "updated": [r["spec"]["name"] for r in done if r["action"] == "update"],
+        "unchanged": [r["spec"]["name"] for r in done if r["action"] == "unchanged"],
+        "failed": failed,
+    }
+    log(f"Total de agentes sincronizados: {len(summary['ids'])} "
+        f"(nuevos {len(summary['created'])}, actualizados {len(summary['updated'])}, "
+        f"sin cambios {len(summary['unchanged'])}, errores {len(failed)})")
+    return summary
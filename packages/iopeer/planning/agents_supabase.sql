@@ -0,0 +1,24 @@
+-- ==========================================================
+-- 🤖 Tabla agents de Supabase para planning/agent_sync.py
+-- ==========================================================
+-- sync_agents hace upsert por nombre (on_conflict=name) y guarda el hash de la
+-- spec: hacen falta la columna spec_hash y una restricción única en name.
+
+CREATE TABLE IF NOT EXISTS agents (
+  id BIGSERIAL PRIMARY KEY,
+  name TEXT NOT NULL,
+  model TEXT,
+  metadata TEXT,
+  assistant_id TEXT,
+  created_at TIMESTAMPTZ DEFAULT now()
+);
+
+ALTER TABLE agents ADD COLUMN IF NOT EXISTS spec_hash TEXT;
+
+-- El flujo anterior insertaba una fila por corrida: se conserva la más reciente por nombre
+DELETE FROM agents a
+USING agents b
+WHERE a.name = b.name
+  AND (a.created_at, a.id) < (b.created_at, b.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS agents_name_key ON agents (name);
@@ -0,0 +1,247 @@
+"""
+dag.py — Ejecutor de pipelines como DAG.
+
+Cada ``Step`` declara sus dependencias; el scheduler (asyncio) lanza en
+paralelo todo paso cuyas dependencias ya terminaron, con un máximo de
+``max_parallel`` simultáneos. Los pasos pueden ser comandos shell (salida en
+vivo vía ``shell_tools.run_cmd_async``) o funciones Python, y admiten timeout,
+reintentos y caché: si un paso declara ``inputs`` (archivos) o ``key`` (datos),
+su resultado exitoso se guarda con el fingerprint de esas entradas y se
+reutiliza mientras no cambien.
+
+Al terminar se calcula el camino crítico (la cadena de dependencias que
+determinó la duración total) para saber qué paso conviene acelerar.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+from pathlib import Path
+
+from iopeer.utils.shell_tools import run_cmd_async
+
+OK_STATUSES = {"ok", "cached"}
+
+
+class Step:
+    """Paso del pipeline: ``action`` es un comando shell (str) o un callable sin argumentos."""
+
+    def __init__(self, name, action, deps=(), label=None, timeout=None, retries=0, retry_delay=1.0,
+                 inputs=(), key=None, requires_success=False):
+        self.name = name
+        self.action = action
+        self.deps = list(deps)
+        self.label = label or name
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.inputs = list(inputs)
+        self.key = key
+        self.requires_success = requires_success
+
+    @property
+    def cacheable(self):
+        return bool(self.inputs) or self.key is not None
+
+    def fingerprint(self, cwd=None) -> str:
+        """sha256 de la acción, ``key`` y (ruta, tamaño, mtime) de cada input."""
+        h = hashlib.sha256()
+        action = self.action if isinstance(self.action, str) else getattr(self.action, "__qualname__", repr(self.action))
+        h.update(action.encode())
+        h.update(json.dumps(self.key, sort_keys=True, default=str).encode())
+        for item in self.inputs:
+            path = Path(cwd or ".") / item
+            try:
+                st = path.stat()
+                h.update(f"{item}\x00{st.st_size}\x00{st.st_mtime_ns}".encode())
+            except FileNotFoundError:
+                h.update(f"{item}\x00missing".encode())
+        return h.hexdigest()
+
+
+def validate(steps) -> list:
+    """Orden topológico de ``steps``; lanza ``ValueError`` con dependencias desconocidas o ciclos."""
+    by_name = {s.name: s for s in steps}
+    if len(by_name) != len(steps):
+        raise ValueError("Hay pasos con nombre repetido")
+    for step in steps:
+        missing = [d for d in step.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"El paso '{step.name}' depende de pasos inexistentes: {missing}")
+
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Ciclo en el DAG: {' → '.join(path + [name])}")
+        state[name] = "visiting"
+        for dep in by_name[name].deps:
+            visit(dep, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for step in steps:
+        visit(step.name, [])
+    return order
+
+
+def critical_path(steps, results) -> list:
+    """Cadena que terminó última: desde el último paso, la dependencia que más tarde terminó."""
+    by_name = {s.name: s for s in steps}
+    timed = {n: r for n, r in results.items() if r.get("end") is not None}
+    if not timed:
+        return []
+    current = max(timed, key=lambda n: timed[n]["end"])
+    path = [current]
+    while True:
+        deps = [d for d in by_name[current].deps if d in timed]
+        if not deps:
+            break
+        current = max(deps, key=lambda d: timed[d]["end"])
+        path.append(current)
+    return list(reversed(path))
+
+
+def _load_cache(path):
+    if path and Path(path).exists():
+        try:
+            return json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+    return {}
+
+
+class DAGExecutor:
+    """Ejecuta una lista de ``Step`` respetando dependencias, en paralelo."""
+
+    def __init__(self, steps, cwd=None, max_parallel=4, cache_path=None, log=print):
+        self.steps = list(steps)
+        self.order = validate(self.steps)
+        self.cwd = cwd
+        self.max_parallel = max_parallel
+        self.cache_path = cache_path
+        self.log = log
+
+    async def _attempt(self, step):
+        if isinstance(step.action, str):
+            result = await run_cmd_async(
+                step.action, cwd=self.cwd, timeout=step.timeout,
+                subscribers=[lambda stream, line: self.log(f"   [{step.name}] {line}")],
+            )
+            status = "ok" if result["ok"] else ("timeout" if result["timed_out"] else "failed")
+            return status, {"code": result["code"], "duration": result["duration"]}, None
+        # Funciones: el timeout deja de esperar, pero no puede interrumpir el hilo
+        try:
+            if inspect.iscoroutinefunction(step.action):
+                value = await asyncio.wait_for(step.action(), step.timeout)
+            else:
+                value = await asyncio.wait_for(asyncio.to_thread(step.action), step.timeout)
+            return "ok", value, None
+        except asyncio.TimeoutError:
+            return "timeout", None, f"timeout tras {step.timeout}s"
+        except Exception as e:
+            return "failed", None, str(e)
+
+    async def _run_step(self, step, events, results, cache, semaphore, t0):
+        await asyncio.gather(*(events[d].wait() for d in step.deps))
+        record = {"label": step.label, "deps": step.deps, "attempts": 0, "start": None, "end": None,
+                  "duration": 0.0, "status": None, "result": None, "error": None}
+        try:
+            failed_deps = [d for d in step.deps if results[d]["status"] not in OK_STATUSES]
+            if step.requires_success and failed_deps:
+                record.update(status="skipped", error=f"dependencias fallidas: {failed_deps}")
+                self.log(f"⏭️ {step.label}: omitido ({record['error']})")
+                return
+
+            try:
+                fingerprint = step.fingerprint(self.cwd) if step.cacheable else None
+            except Exception as e:
+                self.log(f"⚠️ {step.label}: no se pudo calcular el fingerprint ({e}); se ejecuta sin caché")
+                fingerprint = None
+            cached = cache.get(step.name)
+            if fingerprint and cached and cached.get("fingerprint") == fingerprint:
+                now = time.perf_counter() - t0
+                record.update(status="cached", result=cached.get("result"), start=now, end=now)
+                self.log(f"♻️ {step.label}: sin cambios en sus entradas, resultado en caché")
+                return
+
+            async with semaphore:
+                record["start"] = time.perf_counter() - t0
+                self.log(f"\n🧩 {step.label}")
+                for attempt in range(step.retries + 1):
+                    record["attempts"] = attempt + 1
+                    status, value, error = await self._attempt(step)
+                    record.update(status=status, result=value, error=error)
+                    if status == "ok":
+                        break
+                    if attempt < step.retries:
+                        delay = step.retry_delay * (2 ** attempt)
+                        self.log(f"🔁 {step.label}: {status}; reintento {attempt + 1}/{step.retries} en {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                record["end"] = time.perf_counter() - t0
+                record["duration"] = round(record["end"] - record["start"], 3)
+
+            icon = "✅" if record["status"] == "ok" else "⚠️"
+            self.log(f"{icon} {step.label}: {record['status']} en {record['duration']:.2f}s")
+            if record["status"] == "ok" and fingerprint:
+                cache[step.name] = {"fingerprint": fingerprint, "result": record["result"],
+                                    "finished_at": time.time()}
+        finally:
+            results[step.name] = record
+            events[step.name].set()
+
+    async def run_async(self) -> dict:
+        cache = _load_cache(self.cache_path)
+        events = {s.name: asyncio.Event() for s in self.steps}
+        results = {}
+        semaphore = asyncio.Semaphore(max(1, self.max_parallel))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(self._run_step(s, events, results, cache, semaphore, t0) for s in self.steps))
+        wall = time.perf_counter() - t0
+
+        if self.cache_path:
+            Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(f"{self.cache_path}.tmp")
+            tmp.write_text(json.dumps(cache, indent=2, default=str), encoding="utf-8")
+            os.replace(tmp, self.cache_path)
+
+        path = critical_path(self.steps, results)
+        return {
+            "wall_seconds": round(wall, 3),
+            "sum_step_seconds": round(sum(r["duration"] for r in results.values()), 3),
+            "critical_path": path,
+            "critical_path_seconds": round(sum(results[n]["duration"] for n in path), 3),
+            "ok": all(r["status"] in OK_STATUSES for r in results.values()),
+            "steps": {name: results[name] for name in self.order},
+        }
+
+    def run(self) -> dict:
+        return asyncio.run(self.run_async())
+
+
+def format_report(report) -> str:
+    """Tabla de tiempos por paso con el camino crítico marcado (★)."""
+    lines = [f"{'paso':<28} {'estado':<8} {'inicio':>8} {'fin':>8} {'dur.':>8} {'int.':>4}"]
+    for name, r in report["steps"].items():
+        mark = "★" if name in report["critical_path"] else " "
+        start = f"{r['start']:.2f}" if r["start"] is not None else "-"
+        end = f"{r['end']:.2f}" if r["end"] is not None else "-"
+        lines.append(f"{mark}{name:<27} {r['status']:<8} {start:>8} {end:>8} {r['duration']:>8.2f} {r['attempts']:>4}")
+    lines.append(f"Camino crítico: {' → '.join(report['critical_path'])} ({report['critical_path_seconds']:.2f}s)")
+    lines.append(f"Wall-clock {report['wall_seconds']:.2f}s vs {report['sum_step_seconds']:.2f}s en serie")
+    return "\n".join(lines)
+
+
+def run_dag(steps, cwd=None, max_parallel=4, cache_path=None, log=print, report_path=None) -> dict:
+    """Ejecuta el DAG, registra la tabla de tiempos en ``log`` y, si se indica, guarda el reporte JSON."""
+    report = DAGExecutor(steps, cwd=cwd, max_parallel=max_parallel, cache_path=cache_path, log=log).run()
+    log("\n⏱️ Tiempos del pipeline\n" + format_report(report))
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+        log(f"📄 Reporte de camino crítico: {report_path}")
+    return report
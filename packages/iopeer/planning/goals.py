@@ -3,14 +3,23 @@
 Repair Agent — analiza los logs de build (API o WEB),
 consulta a OpenAI para proponer un fix, y lo aplica automáticamente.
 """
-import os, datetime, subprocess
+import os, datetime
 from openai import OpenAI
 from pathlib import Path
 from dotenv import load_dotenv
+from iopeer.data.llm_cache import cached_response_text, invalidate_response
+from iopeer.utils.log_fingerprint import fingerprint_log
+from iopeer.utils.prompt_builder import build_prompt
+from iopeer.utils.shell_tools import run_cmd, print_subscriber
+from iopeer.utils.diff_engine import PatchError, parse_patch, apply_patch_set
+from iopeer.tool.agents.patch_batcher import batch_patch
+from iopeer.planning.speculative_repair import CANDIDATES, speculative_repair
 
 ROOT = Path(__file__).resolve().parents[2]
 LOGS = ROOT / "logs"
 FIX_HISTORY = LOGS / "fix_history.log"
+BUILD_TIMEOUT = float(os.getenv("REPAIR_BUILD_TIMEOUT", "900"))
+SPECULATIVE = os.getenv("REPAIR_SPECULATIVE", "0") == "1"
 
 load_dotenv(ROOT / ".env")
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -21,7 +30,39 @@ def log_fix(msg):
     with open(FIX_HISTORY, "a", encoding="utf-8") as f:
         f.write(line + "\n")
 
-def analyze_and_fix(target="api"):
+def repair_prompt(raw_output):
+    # Líneas de error con su contexto, rankeadas y dentro del presupuesto de tokens del modelo
+    return build_prompt("""
+    You are a TypeScript repair agent.
+    Analyze the following TypeScript build log and produce a VALID GIT PATCH.
+    The output must be a unified diff starting with lines like:
+
+    diff --git a/path/to/file b/path/to/file
+    --- a/path/to/file
+    +++ b/path/to/file
+    @@ -1,5 +1,7 @@
+
+    Only include the minimal change necessary to fix the error.
+    Do not add explanations or commentary.
+    """, raw_output, model="gpt-4o-mini", label="Build Log")
+
+def speculative_fix(target, raw_output, candidates=CANDIDATES):
+    """Varios patches en paralelo, cada uno compilado en su worktree; se queda el primer build verde."""
+    print(f"🎲 Reparación especulativa para {target} con {candidates} candidatos...")
+    report_path = LOGS / f"{target}_speculative_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+    report = speculative_repair(target, repair_prompt(raw_output), client, model="gpt-4o-mini", root=ROOT,
+                                candidates=candidates, timeout=BUILD_TIMEOUT, report_path=report_path)
+    if report["winner"] is None:
+        log_fix(f"❌ Ningún candidato compiló ({report['wall_seconds']}s), reporte en {report_path.name}")
+    elif not report["applied"]:
+        log_fix(f"⚠️ El candidato {report['winner']} compiló pero no se pudo aplicar: {report['error']}")
+    else:
+        won = report["candidates"][report["winner"]]
+        log_fix(f"✅ Candidato {report['winner']} (t={won['temperature']}) aplicado: build verde en "
+                f"{report['wall_seconds']}s, reporte en {report_path.name}")
+    log_fix(f"🏁 Fin de reparación para {target}")
+
+def analyze_and_fix(target="api", speculative=SPECULATIVE, candidates=CANDIDATES):
     build_log = LOGS / f"{target}_build.log"
     result_log = LOGS / f"{target}_result.log"
     if not build_log.exists() or not result_log.exists():
@@ -35,44 +76,63 @@ def analyze_and_fix(target="api"):
         return
 
     with open(build_log, "r", encoding="utf-8") as f:
-        build_output = f.read()[-8000:]
+        raw_output = f.read()
+    fingerprint = fingerprint_log(raw_output)
+    log_fix(f"🔎 Fingerprint del build {target}: {fingerprint['fingerprint']}")
+    if speculative:
+        return speculative_fix(target, raw_output, candidates)
 
-    prompt = f"""
-    You are a TypeScript repair agent.
-    Analyze the following TypeScript build log and produce a VALID GIT PATCH.
-    The output must be a unified diff starting with lines like:
+    prompt = None
+    if len(fingerprint["signatures"]) > 1:
+        # Varios errores: un diff por grupo de archivos (en paralelo) en vez de uno para todo el log
+        print("🧠 Consultando OpenAI por grupos de errores...")
+        patch = batch_patch(raw_output, client, model="gpt-4o-mini", role="You are a TypeScript repair agent.",
+                            cwd=ROOT, log=log_fix)["patch"]
+    else:
+        prompt = repair_prompt(raw_output)
 
-    diff --git a/path/to/file b/path/to/file
-    --- a/path/to/file
-    +++ b/path/to/file
-    @@ -1,5 +1,7 @@
-
-    Only include the minimal change necessary to fix the error.
-    Do not add explanations or commentary.
-    Build Log:
-    {build_output}
-    """
-
-    print("🧠 Consultando OpenAI para diagnóstico y fix...")
-    response = client.responses.create(model="gpt-4o-mini", input=prompt, temperature=0.2)
-    patch = response.output_text
+        print("🧠 Consultando OpenAI para diagnóstico y fix...")
+        patch = cached_response_text(client, "gpt-4o-mini", prompt, temperature=0.2)
 
     patch_path = LOGS / f"{target}_fix_{datetime.datetime.now():%Y%m%d_%H%M%S}.patch"
     patch_path.write_text(patch, encoding="utf-8")
     log_fix(f"🧩 Patch propuesto para {target}: {patch_path.name}")
 
-    if not patch.strip().startswith("diff --git"):
+    try:
+        file_patches = parse_patch(patch)
+    except PatchError:
         log_fix("⚠️ Patch no válido, guardado para revisión manual.")
         (LOGS / "invalid_patch.txt").write_text(patch, encoding="utf-8")
+        # No reutilizar una respuesta inválida la próxima vez que se repita el log
+        if prompt:
+            invalidate_response("gpt-4o-mini", 0.2, prompt)
         return
-    
 
-    # Aplicar y reintentar build
-    subprocess.run(f"git apply {patch_path}", shell=True, cwd=ROOT)
+    # Aplicar en proceso (todo o nada) y reintentar build
+    applied = apply_patch_set(file_patches, ROOT)
+    if not applied["ok"]:
+        log_fix(f"⚠️ El patch no aplica: {applied['error']}")
+        return
+    for path, entry in applied["files"].items():
+        moved = [h for h in entry["hunks"] if h["offset"] or h["fuzz"]]
+        if moved:
+            log_fix(f"🩹 {path}: {len(moved)} hunks aplicados con offset/fuzz")
     log_fix(f"✅ Patch aplicado. Reintentando build {target}...")
-    subprocess.run(f"pnpm -C apps/{target} build", shell=True, cwd=ROOT)
+    build = run_cmd(f"pnpm -C apps/{target} build", cwd=ROOT, timeout=BUILD_TIMEOUT,
+                    subscribers=[print_subscriber("   ")])
+    if build["timed_out"]:
+        log_fix(f"⏱️ Build {target} cortado tras {BUILD_TIMEOUT:.0f}s")
+    else:
+        log_fix(f"{'✅' if build['ok'] else '❌'} Build {target} terminó con código {build['code']} en {build['duration']}s")
 
     log_fix(f"🏁 Fin de reparación para {target}")
 
 if __name__ == "__main__":
-    analyze_and_fix("api")   # o "web"
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("target", nargs="?", default="api", choices=["api", "web"])
+    parser.add_argument("--speculative", action="store_true", default=SPECULATIVE,
+                        help="varios patches en paralelo, gana el primer build verde")
+    parser.add_argument("--candidates", type=int, default=CANDIDATES)
+    args = parser.parse_args()
+    analyze_and_fix(args.target, args.speculative, args.candidates)
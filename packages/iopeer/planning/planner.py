@@ -8,12 +8,14 @@ Crea, actualiza y sincroniza agentes reales según los resultados del pipeline.
 import os
 import json
 import time
-import subprocess
 import datetime
 from pathlib import Path
 from openai import OpenAI
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from iopeer.utils.shell_tools import run_cmd
+from iopeer.planning.dag import Step, run_dag
+from iopeer.planning.agent_sync import sync_agents as reconcile_agents
 from repair_loop_api import main as repair_api
 from repair_loop_web import main as repair_web
 
@@ -38,7 +40,12 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 client = OpenAI(api_key=OPENAI_KEY)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+STEP_TIMEOUT = float(os.getenv("AUTOPILOT_STEP_TIMEOUT", "900"))
+MAX_PARALLEL = int(os.getenv("AUTOPILOT_MAX_PARALLEL", "4"))
+DAG_CACHE = STATUS / "dag_cache.json"
+AGENTS_REGISTRY = STATUS / "agents_registry.json"
 LOG_PATH = LOGS / f"autopilot_v4_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+DAG_REPORT_PATH = LOG_PATH.with_name(f"{LOG_PATH.stem}_dag.json")
 
 # ===============================================================
 # FUNCIONES AUXILIARES
@@ -50,21 +57,30 @@ def log(msg: str):
     with open(LOG_PATH, "a", encoding="utf-8") as f:
         f.write(line + "\n")
 
-def run(cmd: str, cwd=ROOT):
+def run(cmd: str, cwd=ROOT, timeout=STEP_TIMEOUT):
     log(f"→ Ejecutando: {cmd}")
-    result = subprocess.run(cmd, shell=True, cwd=cwd)
-    if result.returncode != 0:
+    # La salida se vuelca línea a línea al log mientras el comando corre
+    result = run_cmd(cmd, cwd=cwd, timeout=timeout, subscribers=[lambda stream, line: log(f"   {line}")])
+    if result["timed_out"]:
+        log(f"⏱️ Timeout ({timeout:.0f}s) ejecutando: {cmd}")
+    elif not result["ok"]:
         log(f"⚠️ Error ejecutando: {cmd}")
     return result
 
 # ===============================================================
 # PIPELINE BASE
 # ===============================================================
+# Cada paso declara sus dependencias; lo independiente corre en paralelo.
+# verify_env se cachea mientras .env y el script no cambien.
 PIPELINE = [
-    ("Verificación del entorno", "python scripts/agentic-autopilot/verify_env.py"),
-    ("Diagnóstico del proyecto", "bash scripts/agentic-autopilot/project-status.sh"),
-    ("Consolidación de reportes", "python scripts/agentic-autopilot/project_status.py"),
-    ("Envío de correos", "python scripts/agentic-autopilot/auto_mail_report.py"),
+    Step("verify_env", "python scripts/agentic-autopilot/verify_env.py", label="Verificación del entorno",
+         timeout=STEP_TIMEOUT, inputs=[".env", "scripts/agentic-autopilot/verify_env.py"]),
+    Step("project_status_sh", "bash scripts/agentic-autopilot/project-status.sh", deps=["verify_env"],
+         label="Diagnóstico del proyecto", timeout=STEP_TIMEOUT),
+    Step("project_status", "python scripts/agentic-autopilot/project_status.py", deps=["project_status_sh"],
+         label="Consolidación de reportes", timeout=STEP_TIMEOUT),
+    Step("mail", "python scripts/agentic-autopilot/auto_mail_report.py", deps=["project_status"],
+         label="Envío de correos", timeout=STEP_TIMEOUT),
 ]
 
 # ===============================================================
@@ -92,37 +108,10 @@ AGENTS = [
 # FUNCIONES DE OPENAI ASSISTANTS API
 # ===============================================================
 def sync_agents():
-    """Crea o actualiza agentes en OpenAI y registra en Supabase."""
+    """Crea o actualiza en OpenAI sólo los agentes que cambiaron y los registra en Supabase."""
     log("🤖 Sincronizando agentes con OpenAI...")
-
-    created_agents = []
-    for agent in AGENTS:
-        try:
-            log(f"🧠 Creando/actualizando agente: {agent['name']}")
-            assistant = client.beta.assistants.create(
-                name=agent["name"],
-                model=agent["model"],
-                instructions=agent["instructions"],
-                metadata={"project": "Agentic Platform", "version": "v4"},
-            )
-
-            # Guardar en Supabase
-            supabase.table("agents").insert({
-                "name": agent["name"],
-                "model": agent["model"],
-                "created_at": datetime.datetime.now().isoformat(),
-                "metadata": agent["instructions"],
-                "assistant_id": assistant.id
-            }).execute()
-
-            log(f"✅ Agente registrado: {agent['name']} ({assistant.id})")
-            created_agents.append(assistant.id)
-
-        except Exception as e:
-            log(f"⚠️ Error al crear agente {agent['name']}: {e}")
-
-    log(f"Total de agentes sincronizados: {len(created_agents)}")
-    return created_agents
+    specs = [{**agent, "metadata": {"project": "Agentic Platform", "version": "v4"}} for agent in AGENTS]
+    return reconcile_agents(specs, client, supabase, registry_path=AGENTS_REGISTRY, log=log)
 
 # ===============================================================
 # GENERACIÓN DE DOCUMENTACIÓN
@@ -156,6 +145,23 @@ flowchart TD
     md_path.write_text(content, encoding="utf-8")
     log(f"📘 Documentación actualizada: {md_path}")
 
+def _sync_agents_step():
+    # Si falta algún agente el paso falla y se reintenta (sólo lo pendiente)
+    summary = sync_agents()
+    if summary["failed"]:
+        raise RuntimeError(f"sólo se sincronizaron {len(summary['ids'])}/{len(AGENTS)} agentes")
+    return summary["ids"]
+
+
+def build_dag():
+    """PIPELINE + sincronización de agentes + documentación."""
+    return PIPELINE + [
+        # La reconciliación ya es idempotente: sin cambios no hace llamadas remotas
+        Step("sync_agents", _sync_agents_step, deps=["verify_env"], label="Sincronización de agentes",
+             timeout=STEP_TIMEOUT, retries=1),
+        Step("generate_docs", generate_docs, deps=["project_status", "sync_agents"], label="Documentación", timeout=STEP_TIMEOUT),
+    ]
+
 # ===============================================================
 # FUNCIÓN PRINCIPAL
 # ===============================================================
@@ -164,16 +170,10 @@ def main():
     log("🚀 Iniciando Agentic Autopilot Master v4")
     log("=" * 80)
 
-    # Ejecutar pipeline base
-    for label, command in PIPELINE:
-        log(f"\n🧩 {label}")
-        run(command)
-
-    # Sincronización de agentes reales
-    agent_ids = sync_agents()
-
-    # Generar documentación
-    generate_docs()
+    # Ejecutar el DAG del pipeline (pasos independientes en paralelo)
+    report = run_dag(build_dag(), cwd=ROOT, max_parallel=MAX_PARALLEL, cache_path=DAG_CACHE,
+                     log=log, report_path=DAG_REPORT_PATH)
+    agent_ids = report["steps"]["sync_agents"]["result"] or []
 
     end = time.time()
     duration = round(end - start, 2)
@@ -0,0 +1,251 @@
+"""
+speculative_repair.py — Reparación especulativa: varios patches a la vez,
+gana el primer build verde.
+
+En vez de pedir un patch, aplicarlo, compilar y volver a empezar si falla:
+
+- se piden ``candidates`` patches en paralelo, cada uno con otra temperatura
+  (0.2 → 0.8) para que no salgan iguales; los repetidos se descartan
+- cada candidato se valida en memoria con ``diff_engine`` y, si aplica, se
+  aplica en su propio ``git worktree`` (creado desde ``git stash create``, así
+  incluye los cambios sin commitear; ``node_modules`` y ``.env`` se enlazan
+  desde el repo para no reinstalar nada)
+- un candidato que toca un paquete del workspace (``packages/<pkg>`` con
+  ``package.json``) se descarta: los ``node_modules`` enlazados resuelven esos
+  paquetes al árbol original, así que el build del worktree no vería el cambio
+- los builds corren como procesos en paralelo dentro de un presupuesto de CPU
+  (``cpu_budget`` núcleos, ``cpus_per_build`` por build); cada candidato
+  arranca apenas llega su patch
+- el primer build que pasa gana: los demás se abortan (se mata su árbol de
+  procesos) y los que esperaban turno no arrancan; el patch ganador se aplica
+  al repo y los worktrees se borran
+
+Limitaciones de compartir ``node_modules``: los builds concurrentes usan el
+mismo ``node_modules/.cache`` (webpack/babel/tsbuildinfo ahí adentro se pisan
+o se reusan entre candidatos) y nada que requiera reinstalar dependencias
+(cambios en ``package.json`` o el lockfile) se puede probar así. Las respuestas
+del LLM no pasan por la caché: con cada corrida se piden candidatos nuevos, y
+la de temperatura 0.2 no repite la que ya falló en el camino normal de
+``goals``.
+
+El reporte tiene los tiempos de cada candidato (generación, espera, worktree,
+build) y se puede guardar en JSON.
+"""
+
+import os
+import json
+import time
+import shlex
+import asyncio
+import tempfile
+from pathlib import Path
+
+from iopeer.utils.diff_engine import PatchError, parse_patch, dry_run, apply_patch_set, resolve_path
+from iopeer.utils.shell_tools import run_cmd_async
+
+CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "3"))
+CPU_BUDGET = int(os.getenv("SPECULATIVE_CPU_BUDGET", str(max(1, (os.cpu_count() or 2) // 2))))
+CPUS_PER_BUILD = int(os.getenv("SPECULATIVE_CPUS_PER_BUILD", "1"))
+BUILD_TIMEOUT = float(os.getenv("REPAIR_BUILD_TIMEOUT", "900"))
+BUILD_CMD = "pnpm -C apps/{target} build"
+SHARED_PATHS = ("node_modules", ".env")
+MIN_TEMPERATURE, MAX_TEMPERATURE = 0.2, 0.8
+
+
+def candidate_temperatures(n: int):
+    if n <= 1:
+        return [MIN_TEMPERATURE]
+    step = (MAX_TEMPERATURE - MIN_TEMPERATURE) / (n - 1)
+    return [round(MIN_TEMPERATURE + i * step, 2) for i in range(n)]
+
+
+def workspace_package(root: Path, path: str):
+    """Nombre del paquete del workspace (``packages/<pkg>`` con ``package.json``) que contiene ``path``."""
+    found = resolve_path(root, path)
+    try:
+        parts = (found or root / path).resolve().relative_to(root).parts
+    except ValueError:
+        return None
+    if len(parts) > 2 and parts[0] == "packages" and (root / "packages" / parts[1] / "package.json").exists():
+        return parts[1]
+    return None
+
+
+def _share_ignored(root: Path, worktree: Path):
+    """Enlaza ``node_modules``/``.env`` (ignorados por git) del repo en el worktree."""
+    dirs = [Path(".")] + [p.relative_to(root) for pattern in ("apps/*", "packages/*") for p in root.glob(pattern)
+                          if p.is_dir()]
+    for rel in dirs:
+        for name in SHARED_PATHS:
+            source, link = root / rel / name, worktree / rel / name
+            if source.exists() and not link.exists() and link.parent.is_dir():
+                link.symlink_to(source.resolve(), target_is_directory=source.is_dir())
+
+
+class SpeculativeRepair:
+    """Una corrida especulativa sobre ``root``; ``run_async`` devuelve el reporte."""
+
+    def __init__(self, target, prompt=None, client=None, model="gpt-4o-mini", root=".", candidates=CANDIDATES,
+                 cpu_budget=CPU_BUDGET, cpus_per_build=CPUS_PER_BUILD, build_cmd=BUILD_CMD,
+                 timeout=BUILD_TIMEOUT, generate=None, log=print):
+        self.target = target
+        self.prompt = prompt
+        self.client = client
+        self.model = model
+        self.root = Path(root).resolve()
+        self.candidates = max(1, candidates)
+        self.concurrency = max(1, cpu_budget // max(1, cpus_per_build))
+        self.build_cmd = build_cmd.format(target=target)
+        self.timeout = timeout
+        # generate(temperatura) -> texto del patch; por defecto, el LLM con ``prompt``
+        self.generate = generate or self._generate
+        self.log = log
+
+    def _generate(self, temperature: float) -> str:
+        # Sin caché: repetir la corrida tiene que traer candidatos nuevos, no los que ya fallaron
+        response = self.client.responses.create(model=self.model, input=self.prompt, temperature=temperature)
+        return response.output_text
+
+    async def _git(self, args: str) -> dict:
+        return await run_cmd_async(f"git {args}", cwd=self.root, timeout=120)
+
+    async def _add_worktree(self, base: str, index: int) -> Path:
+        path = Path(tempfile.mkdtemp(prefix=f"iopeer-{self.target}-{index}-"))
+        async with self._git_lock:
+            result = await self._git(f"worktree add --detach {shlex.quote(str(path))} {base}")
+        if not result["ok"]:
+            raise RuntimeError(f"git worktree add falló: {result['output'].strip()[:300]}")
+        _share_ignored(self.root, path)
+        return path
+
+    async def _remove_worktree(self, path: Path):
+        async with self._git_lock:
+            await self._git(f"worktree remove --force {shlex.quote(str(path))}")
+
+    async def _candidate(self, index: int, temperature: float, base: str, t0: float) -> dict:
+        entry = {"index": index, "temperature": temperature, "status": "pending", "error": None, "files": [],
+                 "generate_s": None, "wait_s": None, "worktree_s": None, "build_s": None, "finished_at": None}
+        self.entries.append(entry)
+        start = time.perf_counter()
+        try:
+            patch = await asyncio.to_thread(self.generate, temperature)
+        except Exception as e:
+            entry.update(status="failed", error=f"generación: {e}")
+            return entry
+        entry["generate_s"] = round(time.perf_counter() - start, 3)
+
+        try:
+            file_patches = parse_patch(patch)
+        except PatchError as e:
+            entry.update(status="invalid", error=str(e))
+            return entry
+        entry["files"] = [fp.path for fp in file_patches]
+        shared = sorted({pkg for fp in file_patches if (pkg := workspace_package(self.root, fp.path))})
+        if shared:
+            entry.update(status="shared", error=f"toca paquetes del workspace ({', '.join(shared)}): el build del "
+                                                f"worktree los resuelve por node_modules al árbol original")
+            return entry
+        key = patch.strip()
+        if key in self.seen:
+            entry.update(status="duplicate", error=f"igual al candidato {self.seen[key]}")
+            return entry
+        self.seen[key] = index
+        check = dry_run(file_patches, self.root)
+        if not check["ok"]:
+            entry.update(status="invalid", error=check["error"])
+            return entry
+        self.patches[index] = file_patches
+
+        queued = time.perf_counter()
+        async with self.semaphore:
+            entry["wait_s"] = round(time.perf_counter() - queued, 3)
+            if self.stop.is_set():
+                entry["status"] = "cancelled"
+                return entry
+            worktree = None
+            try:
+                step = time.perf_counter()
+                worktree = await self._add_worktree(base, index)
+                applied = apply_patch_set(parse_patch(patch), worktree)
+                entry["worktree_s"] = round(time.perf_counter() - step, 3)
+                if not applied["ok"]:
+                    entry.update(status="invalid", error=applied["error"])
+                    return entry
+                self.log(f"🏗️ Candidato {index} (t={temperature}): compilando en {worktree.name}...")
+                build = await run_cmd_async(self.build_cmd, cwd=worktree, timeout=self.timeout, stop=self.stop)
+                entry["build_s"] = build["duration"]
+                if build["aborted"]:
+                    entry["status"] = "cancelled"
+                elif build["timed_out"]:
+                    entry["status"] = "timeout"
+                elif build["ok"] and not self.stop.is_set():
+                    entry["status"] = "won"
+                    self.winner = index
+                    self.stop.set()
+                elif build["ok"]:
+                    entry["status"] = "cancelled"
+                else:
+                    entry.update(status="failed", error=build["output"].strip()[-500:])
+            except Exception as e:
+                entry.update(status="failed", error=str(e))
+            finally:
+                entry["finished_at"] = round(time.perf_counter() - t0, 3)
+                if worktree is not None:
+                    await self._remove_worktree(worktree)
+        return entry
+
+    async def run_async(self) -> dict:
+        t0 = time.perf_counter()
+        self.entries, self.seen, self.patches, self.winner = [], {}, {}, None
+        self.stop = asyncio.Event()
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self._git_lock = asyncio.Lock()
+
+        # Commit con los cambios sin commitear (sin tocar el árbol); HEAD si no hay cambios
+        stash = await self._git("stash create")
+        base = stash["stdout"].strip() if stash["ok"] and stash["stdout"].strip() else "HEAD"
+        temperatures = candidate_temperatures(self.candidates)
+        self.log(f"🎲 {len(temperatures)} candidatos, {self.concurrency} builds en paralelo, base {base[:12]}")
+
+        await asyncio.gather(*(self._candidate(i, t, base, t0) for i, t in enumerate(temperatures)))
+        await self._git("worktree prune")
+
+        report = {
+            "target": self.target,
+            "winner": self.winner,
+            "applied": False,
+            "concurrency": self.concurrency,
+            "candidates": sorted(self.entries, key=lambda e: e["index"]),
+        }
+        if self.winner is not None:
+            applied = apply_patch_set(self.patches[self.winner], self.root)
+            report["applied"] = applied["ok"]
+            report["error"] = applied["error"]
+        report["wall_seconds"] = round(time.perf_counter() - t0, 3)
+        return report
+
+    def run(self) -> dict:
+        return asyncio.run(self.run_async())
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{'#':>2} {'temp':>5} {'estado':<10} {'gen':>7} {'espera':>7} {'worktree':>8} {'build':>7}"]
+    fmt = lambda v: "-" if v is None else f"{v:.2f}s"
+    for e in report["candidates"]:
+        lines.append(f"{e['index']:>2} {e['temperature']:>5} {e['status']:<10} {fmt(e['generate_s']):>7} "
+                     f"{fmt(e['wait_s']):>7} {fmt(e['worktree_s']):>8} {fmt(e['build_s']):>7}")
+    lines.append(f"Ganador: {report['winner'] if report['winner'] is not None else 'ninguno'} "
+                 f"en {report['wall_seconds']:.2f}s")
+    return "\n".join(lines)
+
+
+def speculative_repair(target, prompt=None, client=None, model="gpt-4o-mini", root=".", candidates=CANDIDATES,
+                       cpu_budget=CPU_BUDGET, cpus_per_build=CPUS_PER_BUILD, build_cmd=BUILD_CMD,
+                       timeout=BUILD_TIMEOUT, generate=None, report_path=None, log=print) -> dict:
+    """Corre la reparación especulativa y devuelve el reporte (guardado en ``report_path`` si se indica)."""
+    report = SpeculativeRepair(target, prompt, client, model, root, candidates, cpu_budget, cpus_per_build,
+                               build_cmd, timeout, generate, log).run()
+    log(format_report(report))
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return report
@@ -1,40 +1,225 @@
+"""
+analyzer.py — Reflexión incremental sobre los logs de cada agente.
 
+Por agente se guarda una marca de agua (timestamp del último log ya
+reflexionado) y un resumen jerárquico en ``reflection_state.json``:
+
+- sin logs nuevos desde la marca → no se llama al LLM
+- con logs nuevos → se envían compactados (acciones repetidas agrupadas,
+  errores reducidos a sus firmas) junto al resumen acumulado; el LLM devuelve
+  un resumen corto del tramo nuevo y las sugerencias
+- los resúmenes de tramo se acumulan en el nivel 0; cada ``FANOUT`` se pliegan
+  en uno del nivel siguiente (resumen de resúmenes), así el contexto enviado
+  queda acotado aunque el historial crezca sin límite
+
+Tokens y latencia de cada reflexión se registran como métricas del agente.
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
 from openai import OpenAI
-import os, json
+from iopeer.data.storage_adapter import DataLayer
+from iopeer.utils.log_fingerprint import compact_log
+from iopeer.utils.prompt_builder import build_prompt, truncate_to_tokens, model_budget
+
+MODEL = os.getenv("REFLECTION_MODEL", "gpt-4o-mini")
+STATE_PATH = Path(__file__).resolve().parents[1] / "data" / "memory" / "reflection_state.json"
+MAX_NEW_EVENTS = int(os.getenv("REFLECTION_MAX_EVENTS", "500"))
+FANOUT = 4
+ERROR_CHARS = 400
+SUMMARY_MARK = "RESUMEN:"
+INSIGHT_MARK = "SUGERENCIAS:"
+LEGACY_LOG_FIELDS = ("timestamp", "action", "status", "output")
+
+
+class ReflectionState:
+    """Marca de agua y resumen jerárquico por agente, persistidos en JSON."""
+
+    def __init__(self, path=STATE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, agent: str) -> dict:
+        with self._lock:
+            entry = self._load().get(agent, {})
+        return {"watermark": None, "levels": [], "events": 0, "reflections": 0, **entry}
+
+    def save(self, agent: str, entry: dict):
+        with self._lock:
+            data = self._load()
+            data[agent] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def _as_event(log) -> dict:
+    """Acepta dicts de log y las tuplas ``(timestamp, action, status, output)`` de SQLiteMemory."""
+    if isinstance(log, dict):
+        return log
+    return dict(zip(LEGACY_LOG_FIELDS, log))
+
+
+def compact_events(events) -> str:
+    """Una línea por tramo de acciones iguales; los errores con sus firmas."""
+    lines, previous, repeat = [], None, 0
+    for event in events:
+        key = (event.get("action"), event.get("status"))
+        if key == previous:
+            repeat += 1
+            continue
+        if repeat:
+            lines[-1] += f" (x{repeat + 1})"
+        previous, repeat = key, 0
+        line = f"{event.get('timestamp', '')} → {event.get('action')}: {event.get('status')}"
+        output = event.get("output")
+        if output and event.get("status") not in ("success", "ok"):
+            line += "\n    " + compact_log(str(output), ERROR_CHARS).replace("\n", "\n    ")
+        lines.append(line)
+    if repeat:
+        lines[-1] += f" (x{repeat + 1})"
+    return "\n".join(lines)
+
+
+def rolling_summary(levels) -> str:
+    """Resumen acumulado: de los niveles más agregados a los tramos más recientes."""
+    parts = []
+    for depth in range(len(levels) - 1, -1, -1):
+        parts += [f"[nivel {depth}] {summary}" for summary in levels[depth]]
+    return "\n".join(parts)
+
+
+def _split_response(text: str):
+    """Separa ``RESUMEN:`` y ``SUGERENCIAS:``; si el modelo no respeta el formato, todo es sugerencia."""
+    if INSIGHT_MARK not in text:
+        return text.strip()[:500], text.strip()
+    summary, insight = text.split(INSIGHT_MARK, 1)
+    return summary.replace(SUMMARY_MARK, "").strip(), insight.strip()
+
 
 class ReflectionLayer:
+    def __init__(self, memory=None, client=None, state_path=STATE_PATH, model: str = MODEL):
+        self.memory = memory
+        self.client = client
+        self.state = ReflectionState(state_path)
+        self.model = model
+        self._timeseries = None
+
+    def _complete(self, prompt: str, usage: dict) -> str:
+        if self.client is None:
+            self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        resp = self.client.chat.completions.create(model=self.model, messages=[{"role": "user", "content": prompt}])
+        used = getattr(resp, "usage", None)
+        usage["prompt_tokens"] += getattr(used, "prompt_tokens", 0) or 0
+        usage["completion_tokens"] += getattr(used, "completion_tokens", 0) or 0
+        usage["calls"] += 1
+        return resp.choices[0].message.content.strip()
+
+    def _record_metrics(self, agent_name: str, metrics: dict):
+        if self.memory is not None:
+            for name, value in metrics.items():
+                self.memory.save_metric(agent_name, name, value)
+            return
+        if self._timeseries is None:
+            from iopeer.data.memory.timeseries import get_store
+            self._timeseries = get_store()
+        self._timeseries.record_many((agent_name, name, value) for name, value in metrics.items())
+
+    def _fold(self, agent_name: str, levels: list, usage: dict):
+        """Pliega cada ``FANOUT`` resúmenes de un nivel en uno del nivel siguiente."""
+        depth = 0
+        while depth < len(levels):
+            if len(levels[depth]) >= FANOUT:
+                joined = "\n".join(f"- {summary}" for summary in levels[depth])
+                prompt = (f"Condensa estos resúmenes consecutivos del agente '{agent_name}' en uno solo "
+                          f"de no más de 5 líneas, conservando patrones de error y tendencias:\n{joined}")
+                merged = self._complete(prompt, usage)
+                if depth + 1 == len(levels):
+                    levels.append([])
+                levels[depth + 1].append(merged)
+                levels[depth] = []
+            depth += 1
+
+    def reflect_incremental(self, agent_name: str, logs) -> str:
+        """Reflexiona sólo sobre los logs posteriores a la marca de agua; ``None`` si no hay nuevos."""
+        entry = self.state.get(agent_name)
+        watermark = entry["watermark"]
+        events = [_as_event(log) for log in logs or []]
+        new = sorted((e for e in events if watermark is None or str(e.get("timestamp", "")) > watermark),
+                     key=lambda e: str(e.get("timestamp", "")))
+        if not new:
+            print(f"💤 Sin logs nuevos de {agent_name} desde {watermark}; se omite la reflexión.")
+            self._record_metrics(agent_name, {"reflection_skipped": 1})
+            return None
+
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "calls": 0}
+        start = time.perf_counter()
+        # El historial resumido ocupa a lo sumo un cuarto del presupuesto; el resto, los registros nuevos
+        budget = model_budget(self.model)
+        summary = rolling_summary(entry["levels"]) or "(sin reflexiones previas)"
+        summary = truncate_to_tokens(summary, budget // 4, self.model)
+        prompt = build_prompt(f"""
+    Analiza los registros nuevos del agente '{agent_name}' a la luz de su historial resumido.
+    Identifica patrones de error y sugiere pasos concretos de mejora.
+    Responde con dos secciones: "{SUMMARY_MARK}" (máximo 3 líneas sobre los registros nuevos)
+    y "{INSIGHT_MARK}".
+    --- Historial resumido ---
+    {summary}
+    """, compact_events(new), model=self.model, budget=budget, label=f"Registros nuevos ({len(new)})")
+        text = self._complete(prompt, usage)
+        digest, insight = _split_response(text)
+
+        levels = entry["levels"] or [[]]
+        levels[0].append(digest)
+        self._fold(agent_name, levels, usage)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        self.state.save(agent_name, {
+            "watermark": str(new[-1].get("timestamp", "")),
+            "levels": levels,
+            "events": entry["events"] + len(new),
+            "reflections": entry["reflections"] + 1,
+        })
+        self._record_metrics(agent_name, {
+            "reflection_new_events": len(new),
+            "reflection_prompt_tokens": usage["prompt_tokens"],
+            "reflection_completion_tokens": usage["completion_tokens"],
+            "reflection_llm_calls": usage["calls"],
+            "reflection_latency_ms": round(latency_ms, 1),
+        })
+        return insight
+
     def reflect(self, agent_name):
         print(f"🧠 Reflexionando sobre el desempeño de {agent_name}...")
-        db_path = "iopeer/data/memory/autopilot_logs.json"
-        if not os.path.exists(db_path):
-            return
-        logs = json.load(open(db_path))
-        recent = logs[-5:]
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        prompt = f"Analiza estos logs y sugiere mejoras:\n\n{json.dumps(recent, indent=2)}"
-        resp = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}])
-        print("💡 Sugerencia:", resp.choices[0].message.content.strip())
+        # Leer desde el final del log sólo hasta cruzar la marca de agua
+        watermark = self.state.get(agent_name)["watermark"]
+        recent = DataLayer().tail(MAX_NEW_EVENTS, agent=agent_name, since=watermark)
+        insight = self.reflect_incremental(agent_name, recent)
+        if insight:
+            print("💡 Sugerencia:", insight)
+        return insight
 
+    @staticmethod
     def reflect_on_logs(agent_name: str, logs: list, memory):
         """Analiza los logs y genera una reflexión del agente."""
         if not logs:
             print("⚠️ No hay logs para reflexionar.")
             return
 
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        context = "\n".join([f"{l['timestamp']} → {l['action']}: {l['status']}" for l in logs[-5:]])
-
-        prompt = f"""
-    Analiza los siguientes registros del agente '{agent_name}'.
-    Identifica patrones de error y sugiere pasos concretos de mejora.
-    ---
-    {context}
-    """
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        insight = response.choices[0].message.content.strip()
-        memory.save_reflection(agent_name, insight)
-        print(f"💡 Reflexión guardada para {agent_name}:\n{insight}\n")
+        insight = ReflectionLayer(memory=memory).reflect_incremental(agent_name, logs)
+        if insight:
+            memory.save_reflection(agent_name, insight)
+            print(f"💡 Reflexión guardada para {agent_name}:\n{insight}\n")
+        return insight
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+bench_batch_eval.py — Puntuar el historial completo de ejecuciones:
+``EvalLayer.evaluate`` por agente sobre listas de dicts vs. ``evaluate_batch``
+sobre columnas (que además calcula ventana móvil, tendencia y percentiles).
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_batch_eval --runs 1000000 --agents 50
+"""
+
+import argparse
+import random
+import time
+
+from iopeer.metrics.eval_layer import EvalLayer
+from iopeer.metrics import batch_eval
+from iopeer.metrics.batch_eval import LogBatch, evaluate_batch
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=1_000_000)
+    parser.add_argument("--agents", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    start = int(time.time()) - 90 * 86400
+    agents = [f"agent_{i}" for i in range(args.agents)]
+    columns = {"agent": [], "status": [], "duration": [], "ts": []}
+    for i in range(args.runs):
+        columns["agent"].append(agents[i % args.agents])
+        columns["status"].append("success" if rng.random() < 0.85 else "error")
+        columns["duration"].append(rng.expovariate(0.5))
+        columns["ts"].append(start + i * 7)
+    records = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    print(f"📥 {args.runs:,} ejecuciones, {args.agents} agentes "
+          f"(motor: {'numpy' if batch_eval.np is not None else 'python puro'})")
+
+    def per_dict():
+        # Flujo actual: agrupar los dicts por agente y evaluar cada lista
+        grouped = {}
+        for log in records:
+            grouped.setdefault(log["agent"], []).append(log)
+        return {agent: EvalLayer.evaluate(agent, logs) for agent, logs in grouped.items()}
+
+    legacy, legacy_ms = timed(per_dict)
+    batch, build_ms = timed(lambda: LogBatch(columns["agent"], columns["status"], columns["duration"], columns["ts"]))
+    result, batch_ms = timed(lambda: evaluate_batch(batch))
+
+    pure_ms = None
+    if batch_eval.np is not None:
+        # Mismas métricas sin NumPy, para ver cuánto aporta la vectorización
+        np_module, batch_eval.np = batch_eval.np, None
+        try:
+            pure = LogBatch(columns["agent"], columns["status"], columns["duration"], columns["ts"])
+            _, pure_ms = timed(lambda: evaluate_batch(pure))
+        finally:
+            batch_eval.np = np_module
+
+    mismatches = [a for a in legacy if legacy[a]["score"] != result[a]["score"]]
+    print(f"   EvalLayer.evaluate por dict (sólo score) : {legacy_ms:9.1f} ms")
+    print(f"   LogBatch desde listas (una vez)          : {build_ms:9.1f} ms")
+    print(f"   evaluate_batch (score+ventana+p50/p99)   : {batch_ms:9.1f} ms")
+    if pure_ms is not None:
+        print(f"   evaluate_batch en Python puro            : {pure_ms:9.1f} ms")
+    print(f"   scores distintos entre ambos: {len(mismatches)}")
+    sample = result[agents[0]]
+    print(f"   {agents[0]}: score={sample['score']} rolling={sample['rolling_score']} "
+          f"trend={sample['error_trend']} p50={sample['p50']} p99={sample['p99']}")
+
+
+if __name__ == "__main__":
+    main()
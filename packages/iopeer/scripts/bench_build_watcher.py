@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+bench_build_watcher.py — Tiempo hasta el primer parche: esperar el build
+completo y recién ahí reparar vs. BuildWatcher (con y sin abortar el build).
+
+Simula un build de Next.js que imprime un error de tipos a los
+``--error-at`` segundos y sigue compilando hasta ``--build`` segundos; la
+reparación (clasificación + LLM) se simula con ``--repair`` segundos.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_build_watcher --build 8 --error-at 1.5 --repair 2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from iopeer.learning.build_watcher import watch_build
+from iopeer.utils.shell_tools import run_cmd
+
+FAKE_BUILD = """#!/bin/sh
+echo "▲ Next.js 14.2.3"
+echo "   Creating an optimized production build ..."
+sleep {error_at}
+echo "./src/app/page.tsx:12:5"
+echo "Type error: Property 'foo' does not exist on type 'Props'."
+sleep {rest}
+echo "Failed to compile." >&2
+exit 1
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--build", type=float, default=8.0)
+    parser.add_argument("--error-at", type=float, default=1.5)
+    parser.add_argument("--repair", type=float, default=2.0)
+    args = parser.parse_args()
+
+    def repair(log_text):
+        time.sleep(args.repair)
+        return "patch"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "build.sh")
+        with open(script, "w") as f:
+            f.write(FAKE_BUILD.format(error_at=args.error_at, rest=max(0.0, args.build - args.error_at)))
+        os.chmod(script, 0o755)
+
+        start = time.perf_counter()
+        result = run_cmd(script)
+        repair(result["output"])
+        sequential = time.perf_counter() - start
+
+        streaming = watch_build(script, on_error=repair)
+        aborting = watch_build(script, on_error=repair, abort_on_fatal=True)
+
+    print(f"📊 Build simulado de {args.build:.1f}s, error a los {args.error_at:.1f}s, reparación de {args.repair:.1f}s")
+    print(f"   secuencial (build completo + reparación) : primer parche a los {sequential:6.2f}s")
+    print(f"   BuildWatcher                             : primer parche a los {streaming['time_to_first_patch']:6.2f}s"
+          f" | build {streaming['build_seconds']:.2f}s")
+    print(f"   BuildWatcher + abort                     : primer parche a los {aborting['time_to_first_patch']:6.2f}s"
+          f" | build cortado a los {aborting['build_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
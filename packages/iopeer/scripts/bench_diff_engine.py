@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+bench_diff_engine.py — Validar patches candidatos: ``git apply --check`` (un
+proceso por patch) vs. ``diff_engine.dry_run`` en memoria, secuencial y con
+``dry_run_many``. Al final aplica un patch multi-archivo con ambos.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_diff_engine --files 40 --candidates 200
+"""
+
+import argparse
+import difflib
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from iopeer.utils.diff_engine import BufferCache, dry_run, dry_run_many, apply_patch_set
+
+
+def make_repo(root: Path, files: int, lines: int, rng):
+    sources = {}
+    for f in range(files):
+        path = f"apps/api/src/module_{f}/service_{f}.ts"
+        rows = [f"  const value{n} = compute({rng.randrange(1000)});" for n in range(lines)]
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("\n".join(rows) + "\n", encoding="utf-8")
+        sources[path] = rows
+    subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+    return sources
+
+
+def candidate(sources, rng, files: int = 1, shift: bool = False) -> str:
+    """Diff de ``files`` archivos con algunos cambios; ``shift`` corre las líneas del encabezado."""
+    parts = []
+    for path in rng.sample(sorted(sources), files):
+        old = sources[path]
+        new = list(old)
+        for _ in range(3):
+            i = rng.randrange(len(new))
+            new[i] = new[i].replace("compute", "computeSafe")
+        diff = "".join(difflib.unified_diff([l + "\n" for l in old], [l + "\n" for l in new],
+                                            f"a/{path}", f"b/{path}"))
+        if shift:
+            # Encabezados corridos 5 líneas, como los que escribe un LLM
+            diff = "\n".join(_shift_header(line) for line in diff.splitlines()) + "\n"
+        parts.append(f"diff --git a/{path} b/{path}\n{diff}")
+    return "".join(parts)
+
+
+def _shift_header(line: str) -> str:
+    if not line.startswith("@@"):
+        return line
+    old, new = line.split()[1:3]
+    start, _, count = old[1:].partition(",")
+    return f"@@ -{int(start) + 5},{count} {new} @@"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--lines", type=int, default=400)
+    parser.add_argument("--candidates", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        sources = make_repo(root, args.files, args.lines, rng)
+        patches = [candidate(sources, rng, shift=i % 2 == 1) for i in range(args.candidates)]
+
+        def git_check():
+            ok = 0
+            for patch in patches:
+                proc = subprocess.run(["git", "apply", "--check", "-"], cwd=root, input=patch.encode(),
+                                      capture_output=True)
+                ok += proc.returncode == 0
+            return ok
+
+        git_ok, git_s = timed(git_check)
+        buffers = BufferCache()
+        seq, seq_s = timed(lambda: [dry_run(p, root, buffers=buffers) for p in patches])
+        many, many_s = timed(lambda: dry_run_many(patches, root))
+
+        print(f"🧪 {args.candidates} patches candidatos sobre {args.files} archivos de {args.lines} líneas "
+              f"(la mitad con encabezados corridos)")
+        print(f"   git apply --check       : {git_s * 1e6 / len(patches):9.0f} µs/patch  aplican {git_ok}")
+        print(f"   dry_run (buffers)       : {seq_s * 1e6 / len(patches):9.0f} µs/patch  aplican "
+              f"{sum(r['ok'] for r in seq)}")
+        print(f"   dry_run_many            : {many_s * 1e6 / len(patches):9.0f} µs/patch  aplican "
+              f"{sum(r['ok'] for r in many)}")
+
+        multi = candidate(sources, rng, files=min(10, args.files))
+        proc, git_apply_s = timed(lambda: subprocess.run(["git", "apply", "-"], cwd=root, input=multi.encode(),
+                                                         capture_output=True))
+        subprocess.run(["git", "apply", "-R", "-"], cwd=root, input=multi.encode(), capture_output=True)
+        applied, engine_s = timed(lambda: apply_patch_set(multi, root))
+        print(f"   patch de {len(applied['files'])} archivos: git apply {git_apply_s * 1e3:.1f} ms "
+              f"({'ok' if proc.returncode == 0 else 'falló'}), apply_patch_set {engine_s * 1e3:.1f} ms "
+              f"({'ok' if applied['ok'] else applied['error']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+bench_error_classifier.py — Precisión y latencia offline del clasificador local
+sobre el corpus etiquetado scripts/fixtures/error_logs.jsonl.
+
+Evalúa sólo reglas y reglas + modelo TF-IDF (validación cruzada leave-one-out,
+así ningún log se clasifica con un modelo que lo vio en entrenamiento), que
+sumar el modelo no baje la proporción de logs sobre el umbral ni la precisión,
+y que un único indicio débil no quede sobre el umbral. Sale con código 1 si
+alguna de esas condiciones falla.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_error_classifier
+"""
+
+import json
+import time
+from pathlib import Path
+
+from iopeer.utils.error_classifier import ErrorClassifier, TfidfCentroidModel
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "error_logs.jsonl"
+REPEAT = 50
+# Un único indicio débil: no alcanza para saltear al LLM
+WEAK_HITS = [
+    "    at Object.<anonymous> (/app/dist/main.js:12:5)",
+    "Loaded configuration from .env",
+    "Lockfile is up to date, resolution step is skipped",
+    "warning: process.env.NEXT_PUBLIC_URL is used in a client component",
+]
+
+
+def load_corpus(path=FIXTURES):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(corpus, make_classifier):
+    correct, confident, latencies = 0, 0, []
+    for i, sample in enumerate(corpus):
+        classifier = make_classifier(i)
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            result = classifier.classify(sample["text"])
+        latencies.append((time.perf_counter() - start) / REPEAT)
+        correct += result["label"] == sample["label"]
+        confident += result["confident"]
+    latencies.sort()
+    return {
+        "accuracy": correct / len(corpus),
+        "confident": confident / len(corpus),
+        "p50_ms": latencies[len(latencies) // 2] * 1e3,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1e3,
+    }
+
+
+def main():
+    corpus = load_corpus()
+    rules = ErrorClassifier()
+    models = {}
+    for i in range(len(corpus)):
+        train = [(s["text"], s["label"]) for j, s in enumerate(corpus) if j != i]
+        models[i] = ErrorClassifier(model=TfidfCentroidModel().fit(train))
+
+    print(f"📊 Clasificador local — {len(corpus)} logs etiquetados")
+    results = {}
+    for name, make in [("reglas", lambda i: rules), ("reglas + tf-idf", lambda i: models[i])]:
+        r = results[name] = evaluate(corpus, make)
+        print(f"   {name:<16} accuracy {r['accuracy']:.0%} | sobre umbral {r['confident']:.0%}"
+              f" | p50 {r['p50_ms']:.3f} ms | p95 {r['p95_ms']:.3f} ms")
+    # También con el modelo entrenado con todo el corpus: no debe levantar un indicio débil
+    full = ErrorClassifier(model=TfidfCentroidModel().fit([(s["text"], s["label"]) for s in corpus]))
+    weak = [classifier.classify(text) for classifier in (rules, full) for text in WEAK_HITS]
+    print(f"   indicios débiles sobre umbral: {sum(r['confident'] for r in weak)}/{len(weak)} "
+          f"(confianza máx. {max(r['confidence'] for r in weak):.2f})")
+
+    failures = []
+    base, combined = results["reglas"], results["reglas + tf-idf"]
+    if combined["confident"] < base["confident"]:
+        failures.append(f"el modelo baja los logs sobre umbral: {base['confident']:.0%} → {combined['confident']:.0%}")
+    if combined["accuracy"] < base["accuracy"]:
+        failures.append(f"el modelo baja la precisión: {base['accuracy']:.0%} → {combined['accuracy']:.0%}")
+    if any(r["confident"] for r in weak):
+        failures.append("un indicio débil quedó sobre el umbral")
+    for failure in failures:
+        print(f"   ❌ {failure}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
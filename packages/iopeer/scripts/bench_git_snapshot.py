@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+bench_git_snapshot.py — Procesos lanzados y latencia de generate_diagnostic:
+diagnóstico por comandos (seis invocaciones de git) vs. snapshot porcelain v2.
+
+Sin --repo crea un repositorio temporal con upstream, commits adelantados y
+archivos staged, modificados y sin trackear.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_git_snapshot --files 2000
+    python -m iopeer.scripts.bench_git_snapshot --repo /ruta/al/monorepo
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from iopeer.tool.agents.git_agent import git_diagnostic
+from iopeer.tool.agents.git_agent.git_snapshot import take_snapshot
+
+RUNS = 10
+
+
+class CountingPopen(subprocess.Popen):
+    spawned = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingPopen.spawned += 1
+        super().__init__(*args, **kwargs)
+
+
+def git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def build_repo(root: str, files: int) -> str:
+    origin = os.path.join(root, "origin")
+    work = os.path.join(root, "work")
+    os.makedirs(origin)
+    git(origin, "init", "-q", "-b", "main")
+    git(origin, "config", "user.email", "bench@iopeer")
+    git(origin, "config", "user.name", "bench")
+    for i in range(files):
+        with open(os.path.join(origin, f"f{i}.txt"), "w") as f:
+            f.write(f"{i}\n")
+    git(origin, "add", "-A")
+    git(origin, "commit", "-q", "-m", "init")
+    git(root, "clone", "-q", origin, work)
+    git(work, "config", "user.email", "bench@iopeer")
+    git(work, "config", "user.name", "bench")
+
+    with open(os.path.join(work, "ahead.txt"), "w") as f:
+        f.write("ahead\n")
+    git(work, "add", "ahead.txt")
+    git(work, "commit", "-q", "-m", "ahead")
+    for i in range(0, files, 10):
+        with open(os.path.join(work, f"f{i}.txt"), "a") as f:
+            f.write("changed\n")
+    git(work, "add", *[f"f{i}.txt" for i in range(0, files, 20)])
+    for i in range(files // 10):
+        with open(os.path.join(work, f"new{i}.txt"), "w") as f:
+            f.write("untracked\n")
+    return work
+
+
+def measure(fn, cwd):
+    previous = os.getcwd()
+    os.chdir(cwd)
+    original = subprocess.Popen
+    subprocess.Popen = CountingPopen
+    CountingPopen.spawned = 0
+    try:
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            result = fn()
+        elapsed = (time.perf_counter() - start) / RUNS
+    finally:
+        subprocess.Popen = original
+        os.chdir(previous)
+    return result, CountingPopen.spawned / RUNS, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", help="repositorio existente a medir")
+    parser.add_argument("--files", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = args.repo or build_repo(tmp, args.files)
+        legacy, legacy_procs, legacy_t = measure(git_diagnostic.generate_diagnostic_legacy, repo)
+        snap, snap_procs, snap_t = measure(take_snapshot, repo)
+
+    keys = ["local_branch", "remote_branch", "ahead", "behind", "staged_count", "unstaged_count", "untracked_count"]
+    print(f"📊 git_diagnostic — {repo if args.repo else f'repo temporal de {args.files} archivos'}")
+    print(f"   por comandos   : {legacy_procs:.0f} procesos | {legacy_t * 1e3:8.1f} ms")
+    print(f"   porcelain v2   : {snap_procs:.0f} procesos | {snap_t * 1e3:8.1f} ms")
+    print(f"   mismo resultado: {all(legacy[k] == snap[k] for k in keys)}")
+    for k in keys:
+        if legacy[k] != snap[k]:
+            print(f"     {k}: {legacy[k]!r} vs {snap[k]!r}")
+
+
+if __name__ == "__main__":
+    main()
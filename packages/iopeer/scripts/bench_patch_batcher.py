@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+bench_patch_batcher.py — Llamadas y tiempo para pedir patches de un build con
+muchos errores TS: una llamada por error (como los agentes hasta ahora) vs.
+``batch_patch`` (una por grupo de archivos, en paralelo).
+
+El LLM es un cliente falso con latencia fija que devuelve un diff válido por
+cada archivo que se le pide, así se mide sólo el efecto del agrupamiento. Los
+prompts agrupados llevan además el código alrededor de cada error, por eso
+suman más tokens por llamada.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_patch_batcher --errors 40 --files 8 --latency 0.5
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("IOPEER_LLM_CACHE", "0")
+
+from iopeer.tool.agents.patch_batcher import batch_patch, split_diff
+from iopeer.utils.prompt_builder import build_prompt, count_tokens
+
+FIX_RE = re.compile(r"^- \[TS\d+\] (?P<file>\S+?):(?P<line>\d+):\d+", re.MULTILINE)
+
+
+class FakeClient:
+    """``responses.create`` con latencia; corrige cada línea ``broken_N`` que figura en los errores."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.tokens = 0
+        self.responses = self
+        self._lock = threading.Lock()
+
+    def create(self, model, input, temperature=0):
+        with self._lock:
+            self.calls += 1
+            self.tokens += count_tokens(input, model)
+        time.sleep(self.latency)
+        by_file = {}
+        for m in FIX_RE.finditer(input):
+            by_file.setdefault(m["file"], set()).add(int(m["line"]))
+        parts = []
+        for path, lines in sorted(by_file.items()):
+            parts.append(f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}")
+            for line in sorted(lines):
+                parts.append(f"@@ -{line},1 +{line},1 @@\n-const v{line} = broken_{line}();\n+const v{line} = 0;")
+        return SimpleNamespace(output_text="\n".join(parts) + "\n" if parts else "NO_PATCH")
+
+
+def make_tree(root: Path, errors: int, files: int) -> str:
+    log = ["> nest build"]
+    per_file = max(1, errors // files)
+    for f in range(files):
+        path = f"apps/api/src/module_{f}/service_{f}.ts"
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        rows = [f"const v{n} = broken_{n}();" for n in range(1, per_file * 3 + 1)]
+        (root / path).write_text("\n".join(rows) + "\n", encoding="utf-8")
+        for k in range(per_file):
+            line = k * 3 + 1
+            log.append(f"{path}:{line}:11 - error TS2304: Cannot find name 'broken_{line}'.")
+    log.append(f"Found {files * per_file} error(s).")
+    return "\n".join(log)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--errors", type=int, default=40)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        log = make_tree(root, args.errors, args.files)
+        errors = [line for line in log.splitlines() if "error TS" in line]
+
+        single = FakeClient(args.latency)
+        start = time.perf_counter()
+        for line in errors:
+            # Flujo anterior: un prompt y una llamada por log de error
+            prompt = build_prompt("You are a NestJS or TypeScript auto-repair assistant.\n"
+                                  f"Errors:\n- [TS2304] {line.split(' - ')[0]} — fix it\n", line, model="gpt-4o")
+            split_diff(single.create("gpt-4o", prompt).output_text)
+        single_s = time.perf_counter() - start
+
+        batched = FakeClient(args.latency)
+        start = time.perf_counter()
+        summary = batch_patch(log, batched, model="gpt-4o", cwd=root, log=lambda msg: None)
+        batch_s = time.perf_counter() - start
+
+    print(f"🧪 {len(errors)} errores en {args.files} archivos, latencia {args.latency}s por llamada")
+    print(f"   una llamada por error : {single.calls:3d} llamadas {single.tokens:7d} tokens {single_s:7.2f}s")
+    print(f"   batch_patch           : {batched.calls:3d} llamadas {batched.tokens:7d} tokens {batch_s:7.2f}s")
+    print(f"   archivos con diff válido: {len(summary['files'])}/{args.files}, descartados: {len(summary['rejected'])}")
+
+
+if __name__ == "__main__":
+    main()
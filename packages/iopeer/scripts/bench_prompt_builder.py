@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+bench_prompt_builder.py — Tokens por prompt de reparación antes y después de
+``prompt_builder`` sobre los logs grabados de scripts/fixtures/error_logs.jsonl.
+
+Cada log se usa tal cual y embebido en un build ruidoso sintético (progreso,
+warnings, el mismo error repetido con su stack trace). Se compara:
+
+- ``raw[-8000:]``: los últimos 8000 caracteres crudos (lo que se mandaba al principio)
+- ``compact_log``: una línea por firma, hasta 6000 caracteres
+- ``build_prompt``: secciones rankeadas dentro del presupuesto del modelo
+
+``errores`` es la fracción de firmas del log original (mensaje y archivo) que llega al prompt.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_prompt_builder --model gpt-4o
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+
+from iopeer.utils import prompt_builder
+from iopeer.utils.log_fingerprint import compact_log, extract_signatures, normalize_paths
+from iopeer.utils.prompt_builder import build_prompt, count_tokens, model_budget
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "error_logs.jsonl"
+INSTRUCTIONS = """You are a NestJS or TypeScript auto-repair assistant.
+Analyze the log below and return ONLY a valid unified diff patch, or "NO_PATCH".
+"""
+FRAMES = [
+    "    at Object.<anonymous> (/app/apps/api/src/main.ts:{n}:11)",
+    "    at Module._compile (node:internal/modules/cjs/loader:1256:14)",
+    "    at Module.load (node:internal/modules/cjs/loader:1119:32)",
+    "    at Function.Module._load (node:internal/modules/cjs/loader:960:12)",
+]
+
+
+def noisy_build(text: str, rng: random.Random, lines: int = 1500) -> str:
+    """El log grabado rodeado de ruido de build y repetido con un stack trace."""
+    out = ["> turbo run build --filter=api", "• Packages in scope: api, web, shared"]
+    for i in range(lines):
+        out.append(f"[{i:05d}] webpack compiling module {rng.randrange(10_000)} ({i * 100 // lines}%)")
+        if i % 250 == 0:
+            out.append(f"npm WARN deprecated inflight@1.0.{i % 7}: This module is not supported")
+        if i % 500 == 499:
+            out.append(text)
+            out += [frame.format(n=rng.randrange(1, 200)) for frame in FRAMES]
+    out.append(text)
+    out.append(" ELIFECYCLE  Command failed with exit code 1.")
+    return "\n".join(out)
+
+
+def coverage(prompt: str, text: str) -> float:
+    """Fracción de firmas del log cuyo mensaje (y archivo, si tiene) aparece en el prompt."""
+    signatures = extract_signatures(text)
+    if not signatures:
+        return 1.0
+    prompt = normalize_paths(prompt)
+    kept = [s for s in signatures if s["message"] in prompt and (not s["file"] or s["file"] in prompt)]
+    return len(kept) / len(signatures)
+
+
+def strategies(model):
+    return {
+        "raw[-8000:]": lambda log: f"{INSTRUCTIONS}\nLog:\n{log[-8000:]}",
+        "compact_log": lambda log: f"{INSTRUCTIONS}\nLog:\n{compact_log(log)}",
+        "build_prompt": lambda log: build_prompt(INSTRUCTIONS, log, model=model),
+    }
+
+
+def report(title, logs, model):
+    print(f"\n{title} ({len(logs)} logs)")
+    print(f"   {'estrategia':<14}{'tokens medios':>14}{'máximo':>9}{'errores':>9}")
+    for name, build in strategies(model).items():
+        tokens, kept = [], []
+        for text, original in logs:
+            prompt = build(text)
+            tokens.append(count_tokens(prompt, model))
+            kept.append(coverage(prompt, original))
+        print(f"   {name:<14}{sum(tokens) / len(tokens):>14.0f}{max(tokens):>9}{sum(kept) / len(kept):>9.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="gpt-4o")
+    args = parser.parse_args()
+
+    with open(FIXTURES, "r", encoding="utf-8") as f:
+        corpus = [json.loads(line)["text"] for line in f if line.strip()]
+    rng = random.Random(7)
+    tokenizer = "tiktoken" if prompt_builder.tiktoken is not None else "estimador local"
+    print(f"📏 Presupuesto {args.model}: {model_budget(args.model)} tokens (conteo: {tokenizer})")
+    report("Logs grabados", [(text, text) for text in corpus], args.model)
+    report("Builds ruidosos", [(noisy_build(text, rng), text) for text in corpus], args.model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+bench_speculative_repair.py — Tiempo hasta un build verde: un candidato por
+vez (pedir patch, aplicar, compilar, repetir si falla) vs.
+``speculative_repair`` (todos los candidatos en paralelo, gana el primero).
+
+Se arma un repo git temporal con un archivo roto. El "LLM" es una función con
+latencia fija que devuelve un patch distinto por temperatura; sólo algunos
+arreglan el error. El "build" es un script que tarda ``--build`` segundos y
+falla si el archivo sigue roto.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_speculative_repair --candidates 4 --good 3 --build 1.0
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from iopeer.planning.speculative_repair import candidate_temperatures, format_report, speculative_repair
+from iopeer.utils.diff_engine import apply_patch_set
+from iopeer.utils.shell_tools import run_cmd
+
+SOURCE = "apps/api/src/service.ts"
+BUILD = """
+import sys, time
+time.sleep(float(sys.argv[1]))
+sys.exit(1 if "broken()" in open("apps/api/src/service.ts").read() else 0)
+"""
+
+
+def make_repo(root: Path):
+    (root / SOURCE).parent.mkdir(parents=True)
+    (root / SOURCE).write_text("export const a = 1;\nexport const v = broken();\nexport const b = 2;\n",
+                               encoding="utf-8")
+    (root / "build.py").write_text(BUILD, encoding="utf-8")
+    for cmd in ("git init -q", "git add -A", "git -c user.name=bench -c user.email=bench@local commit -qm init"):
+        subprocess.run(cmd.split(), cwd=root, check=True)
+
+
+def make_generate(temperatures, good: int, latency: float):
+    """Sólo el candidato ``good`` arregla el error; los demás cambian otra línea."""
+    def generate(temperature):
+        time.sleep(latency)
+        index = temperatures.index(temperature)
+        old, new = ("export const v = broken();", "export const v = 0;") if index == good else \
+            ("export const b = 2;", f"export const b = {index + 2};")
+        body = [" export const a = 1;", " export const v = broken();", " export const b = 2;"]
+        body = [line if line[1:] != old else f"-{old}\n+{new}" for line in body]
+        return f"diff --git a/{SOURCE} b/{SOURCE}\n--- a/{SOURCE}\n+++ b/{SOURCE}\n@@ -1,3 +1,3 @@\n" + \
+            "\n".join(body) + "\n"
+    return generate
+
+
+def sequential(root: Path, generate, temperatures, build_cmd: str):
+    """Flujo anterior: un candidato a la vez hasta que uno compile."""
+    start = time.perf_counter()
+    for index, temperature in enumerate(temperatures):
+        applied = apply_patch_set(generate(temperature), root)
+        if applied["ok"] and run_cmd(build_cmd, cwd=root, timeout=60)["ok"]:
+            return index, time.perf_counter() - start
+        subprocess.run(["git", "checkout", "-q", "--", "."], cwd=root)
+    return None, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=4)
+    parser.add_argument("--good", type=int, default=3, help="índice del único candidato que arregla el build")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--build", type=float, default=1.0)
+    parser.add_argument("--cpu-budget", type=int, default=4)
+    args = parser.parse_args()
+    temperatures = candidate_temperatures(args.candidates)
+    generate = make_generate(temperatures, args.good, args.latency)
+    build_cmd = f"{sys.executable} build.py {args.build}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_repo(root)
+        seq_winner, seq_s = sequential(root, generate, temperatures, build_cmd)
+        subprocess.run(["git", "checkout", "-q", "--", "."], cwd=root)
+
+        print(f"🧪 {args.candidates} candidatos, el {args.good} es el bueno; LLM {args.latency}s, build {args.build}s")
+        report = speculative_repair("api", root=root, candidates=args.candidates, cpu_budget=args.cpu_budget,
+                                    build_cmd=build_cmd, timeout=60, generate=generate, log=lambda msg: None)
+        fixed = "broken()" not in (root / SOURCE).read_text(encoding="utf-8")
+        leftovers = subprocess.run(["git", "worktree", "list"], cwd=root, capture_output=True,
+                                   text=True).stdout.count("\n") - 1
+
+    print(f"   secuencial  : ganador {seq_winner} en {seq_s:6.2f}s")
+    print(f"   especulativo: ganador {report['winner']} en {report['wall_seconds']:6.2f}s "
+          f"({report['concurrency']} builds en paralelo, aplicado {report['applied'] and fixed}, "
+          f"worktrees sobrantes {leftovers})")
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+bench_sqlite_memory.py — Compara filas/segundo de SQLiteMemory
+entre el commit por fila y el modo write-behind por lotes.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_sqlite_memory --rows 5000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from iopeer.data.memory.sqlite_memory import SQLiteMemory
+
+
+def bench(rows: int, **kwargs):
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = SQLiteMemory("bench", db_path=os.path.join(tmp, "bench.db"), **kwargs)
+        start = time.perf_counter()
+        for i in range(rows):
+            memory.save_log("bench", f"cmd {i}", "success", "output " * 20)
+        memory.close()
+        elapsed = time.perf_counter() - start
+    return rows / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    per_row, t_row = bench(args.rows)
+    batched, t_batch = bench(args.rows, write_behind=True, batch_size=args.batch_size,
+                             flush_interval=args.flush_interval)
+
+    print(f"📊 SQLiteMemory — {args.rows} filas")
+    print(f"   commit por fila : {per_row:>12,.0f} filas/s ({t_row:.3f}s)")
+    print(f"   write-behind    : {batched:>12,.0f} filas/s ({t_batch:.3f}s)")
+    print(f"   speedup         : {batched / per_row:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
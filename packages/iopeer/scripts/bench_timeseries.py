@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+bench_timeseries.py — Consultas de dashboard sobre meses de métricas:
+escaneo de la tabla cruda (sin índice, ts ISO) vs. TimeSeriesStore con
+índice ``(agent, metric, ts)`` y rollups elegidos automáticamente.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_timeseries --days 180 --per-minute 2
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from iopeer.data.memory.timeseries import TimeSeriesStore, DAY
+
+AGENTS = ["git", "backend", "web", "planner"]
+METRICS = ["eval", "latency", "repair_success_rate"]
+
+
+def timed(fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--per-minute", type=int, default=2, help="puntos por minuto y serie")
+    args = parser.parse_args()
+
+    now = int(time.time())
+    start = now - args.days * DAY
+    step = 60 // args.per_minute
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TimeSeriesStore(os.path.join(tmp, "ts.db"), retention={"raw": None, "1m": None, "1h": None},
+                                retention_every=0)
+        legacy = sqlite3.connect(os.path.join(tmp, "legacy.db"))
+        legacy.execute("CREATE TABLE metrics (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, agent TEXT, metric TEXT, value REAL)")
+
+        t0 = time.perf_counter()
+        total = 0
+        batch = []
+        for ts in range(start, now, step):
+            for agent in AGENTS:
+                for metric in METRICS:
+                    batch.append((agent, metric, random.random(), ts))
+            if len(batch) >= 20000:
+                store.record_many(batch)
+                legacy.executemany("INSERT INTO metrics (timestamp, agent, metric, value) VALUES (?, ?, ?, ?)",
+                                   [(datetime.fromtimestamp(t).isoformat(), a, m, v) for a, m, v, t in batch])
+                total += len(batch)
+                batch = []
+        store.record_many(batch)
+        total += len(batch)
+        legacy.commit()
+        print(f"📥 {total:,} puntos en {time.perf_counter() - t0:.1f}s ({args.days} días)")
+
+        iso_start = datetime.fromtimestamp(start).isoformat()
+        _, scan_ms = timed(lambda: legacy.execute(
+            "SELECT substr(timestamp, 1, 10), MIN(value), MAX(value), AVG(value), COUNT(*) FROM metrics "
+            "WHERE agent = 'git' AND metric = 'eval' AND timestamp >= ? GROUP BY 1", (iso_start,)).fetchall())
+        print(f"   tabla cruda (scan + GROUP BY) : {scan_ms:8.2f} ms")
+        for label, span in [("última hora", 3600), ("último día", DAY), ("últimos 30 días", 30 * DAY),
+                            (f"últimos {args.days} días", args.days * DAY)]:
+            series, ms = timed(lambda: store.query("git", "eval", now - span, now + 1))
+            resolution = store.pick_resolution("git", "eval", now - span, now + 1)
+            print(f"   {label:<22} ({resolution:>3}) : {ms:8.2f} ms | {len(series)} puntos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+bench_tiny_memory.py — Latencia de inserción del log append-only de TinyMemory
+a medida que crece el historial (por defecto 10k, 100k y 1M registros).
+
+Uso (desde packages/):
+    python -m iopeer.scripts.bench_tiny_memory --sizes 10000 100000 1000000
+"""
+
+import argparse
+import tempfile
+import time
+
+from iopeer.data.memory.log_store import AppendOnlyLogStore
+
+SAMPLE = 1000
+
+
+def record(i: int) -> dict:
+    return {
+        "timestamp": "2025-10-14T22:13:00",
+        "agent": "git",
+        "action": "git status",
+        "status": "success",
+        "output": f"On branch main — run {i}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AppendOnlyLogStore(tmp)
+        inserted = 0
+        print(f"📊 Log append-only — latencia media sobre {SAMPLE} inserciones")
+        for size in sorted(args.sizes):
+            while inserted < size - SAMPLE:
+                store.append(record(inserted))
+                inserted += 1
+            start = time.perf_counter()
+            for _ in range(SAMPLE):
+                store.append(record(inserted))
+                inserted += 1
+            per_insert = (time.perf_counter() - start) / SAMPLE
+
+            start = time.perf_counter()
+            store.tail(20)
+            tail = time.perf_counter() - start
+            print(f"   {size:>10,} registros: insert {per_insert * 1e6:8.1f} µs | tail(20) {tail * 1e3:6.2f} ms"
+                  f" | segmentos {len(store.segments())}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
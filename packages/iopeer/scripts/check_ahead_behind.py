@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+check_ahead_behind.py — Compara ``GitRepoReader.ahead_behind`` con
+``git rev-list --left-right --count`` sobre DAGs aleatorios.
+
+Cada DAG se arma con ``git commit-tree`` en un repo temporal, con todos los
+commits en el mismo segundo o con fechas corridas al azar (lo que dejan los
+rebases y los commits scripteados). Cada caso se compara dos veces: sin
+commit-graph (generaciones calculadas en proceso) y con un commit-graph que
+cubre la mitad más vieja del DAG (generaciones leídas del archivo más las de
+los commits nuevos). Sale con código 1 si hay diferencias.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.check_ahead_behind --graphs 40 --commits 30
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import tempfile
+
+from iopeer.tool.agents.git_agent.git_backend import GitRepoReader
+
+BASE_DATE = 1700000000
+
+
+def git(cwd, *args, env=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True,
+                          env=env).stdout.strip()
+
+
+def build_dag(repo, parents, dates):
+    """Crea un commit por nodo (``parents[i]`` son índices anteriores) y devuelve los SHAs."""
+    tree = git(repo, "write-tree")
+    shas = []
+    for i, ps in enumerate(parents):
+        env = dict(os.environ, GIT_AUTHOR_DATE=f"{dates[i]} +0000", GIT_COMMITTER_DATE=f"{dates[i]} +0000")
+        args = ["commit-tree", tree, "-m", f"c{i}"]
+        for p in ps:
+            args += ["-p", shas[p]]
+        shas.append(git(repo, *args, env=env))
+    return shas
+
+
+def random_dag(rng, size):
+    parents = [[]]
+    for i in range(1, size):
+        count = 2 if i > 2 and rng.random() < 0.3 else 1
+        parents.append(sorted(rng.sample(range(i), min(count, i))))
+    return parents
+
+
+def write_commit_graph(repo, shas):
+    """commit-graph con ``shas`` y sus ancestros (reemplaza el anterior)."""
+    subprocess.run(["git", "commit-graph", "write", "--stdin-commits"], cwd=repo, check=True,
+                   input="\n".join(shas), capture_output=True, text=True)
+
+
+def remove_commit_graph(repo):
+    path = os.path.join(repo, ".git", "objects", "info", "commit-graph")
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def compare(repo, parents, dates, pairs):
+    shas = build_dag(repo, parents, dates)
+    mismatches = []
+    for graph in (False, True):
+        remove_commit_graph(repo)
+        if graph:
+            write_commit_graph(repo, shas[:len(shas) // 2])
+        reader = GitRepoReader(repo)
+        try:
+            for local, upstream in pairs:
+                ours = reader.ahead_behind(shas[local], shas[upstream])
+                behind, ahead = map(int, git(repo, "rev-list", "--left-right", "--count",
+                                             f"{shas[upstream]}...{shas[local]}").split())
+                if ours != (ahead, behind):
+                    mismatches.append((parents, local, upstream, ours, (ahead, behind), graph))
+        finally:
+            reader.close()
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--graphs", type=int, default=40)
+    parser.add_argument("--commits", type=int, default=30)
+    parser.add_argument("--pairs", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as repo:
+        git(repo, "init", "-q")
+        git(repo, "config", "user.email", "check@iopeer")
+        git(repo, "config", "user.name", "check")
+
+        # Caso reportado: todos los commits en el mismo segundo
+        cases = [([[], [0], [1], [1, 2]], [BASE_DATE] * 4, [(1, 3), (3, 1)])]
+        for g in range(args.graphs):
+            parents = random_dag(rng, args.commits)
+            if g % 2:
+                dates = [BASE_DATE + rng.randint(-86400, 86400) for _ in parents]
+            else:
+                dates = [BASE_DATE] * len(parents)
+            pairs = [(rng.randrange(len(parents)), rng.randrange(len(parents))) for _ in range(args.pairs)]
+            cases.append((parents, dates, pairs))
+
+        mismatches = []
+        for parents, dates, pairs in cases:
+            mismatches += compare(repo, parents, dates, pairs)
+
+    total = 2 * sum(len(pairs) for _, _, pairs in cases)
+    print(f"🔎 ahead_behind vs git rev-list: {total - len(mismatches)}/{total} iguales "
+          f"({len(cases)} DAGs, fechas iguales y corridas, sin y con commit-graph)")
+    for parents, local, upstream, ours, theirs, graph in mismatches[:5]:
+        print(f"   ❌ padres={parents} local={local} upstream={upstream} commit-graph={graph}: "
+              f"{ours} vs git {theirs}")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+check_router.py — Smoke check de ``router_api``: importa el módulo, despacha
+un lote con agentes de prueba y precarga los agentes reales.
+
+Los agentes de prueba se escriben en una carpeta temporal que se antepone a
+``AGENT_DIRS``; cada uno duerme ``--latency`` segundos y devuelve su nombre.
+Se verifica que un ``BuildError`` sin target vaya a api y a web, que el mismo
+job repetido para un target se ejecute una sola vez y que el lote corra en
+paralelo. Después, ``warm_up_agents`` tiene que cargar cada módulo de
+``AGENTS`` (de backend_agent/ y frontend_agent/) y un segundo warm-up no debe
+recargar ninguno. Sale con código 1 si algo falla.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.check_router --latency 0.3
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from iopeer.tool.agents.backend_agent import router_api
+
+STUB = """
+import time
+
+CALLS = []
+
+def run(log_text):
+    CALLS.append(log_text)
+    time.sleep({latency})
+    return "{name}"
+"""
+STUB_ROUTES = {
+    "BuildError": {"api": "stub_api_build", "web": "stub_web_build"},
+    "EnvError": {"api": "stub_api_env"},
+}
+BUILD_LOG = "apps/web/src/app/page.tsx:3:1\nType error: Cannot find name 'x'."
+ENV_LOG = "Error: Missing environment variable DATABASE_URL"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+    failures = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for routes in STUB_ROUTES.values():
+            for name in routes.values():
+                Path(tmp, f"{name}.py").write_text(STUB.format(latency=args.latency, name=name), encoding="utf-8")
+        router_api.AGENT_DIRS.insert(0, Path(tmp))
+        agents, router_api.AGENTS = router_api.AGENTS, STUB_ROUTES
+        try:
+            start = time.perf_counter()
+            results = router_api.dispatch_batch([
+                ("BuildError", BUILD_LOG),
+                ("BuildError", BUILD_LOG, "api"),
+                ("EnvError", ENV_LOG),
+                ("UnknownError", ENV_LOG),
+            ], concurrency=4)
+            wall = time.perf_counter() - start
+            calls = {name: len(router_api.load_agent_module(name).CALLS)
+                     for routes in STUB_ROUTES.values() for name in routes.values()}
+        finally:
+            router_api.AGENTS = agents
+            router_api.AGENT_DIRS.remove(Path(tmp))
+
+    routed = [(r["target"], r["error_type"], r["agent"], r["patch"]) for r in results]
+    expected = [
+        ("api", "BuildError", "stub_api_build", "stub_api_build"),
+        ("web", "BuildError", "stub_web_build", "stub_web_build"),
+        ("api", "BuildError", "stub_api_build", "stub_api_build"),
+        ("api", "EnvError", "stub_api_env", "stub_api_env"),
+        (None, "UnknownError", None, None),
+    ]
+    if routed != expected:
+        failures.append(f"ruteo {routed} != {expected}")
+    if calls != {"stub_api_build": 1, "stub_web_build": 1, "stub_api_env": 1}:
+        failures.append(f"cada agente debía correr una vez: {calls}")
+    if wall >= 2 * args.latency:
+        failures.append(f"el lote no corrió en paralelo: {wall:.2f}s con agentes de {args.latency}s")
+
+    missing = [name for name in router_api.agent_names() if router_api.agent_path(name) is None]
+    if missing:
+        failures.append(f"agentes sin archivo: {missing}")
+    loaded = router_api.warm_up_agents()
+    if not all(loaded.values()):
+        failures.append(f"warm-up no cargó: {[name for name, ok in loaded.items() if not ok]}")
+    before = router_api.agent_cache_stats()
+    router_api.warm_up_agents()
+    after = router_api.agent_cache_stats()
+    if (after["loads"], after["reloads"]) != (before["loads"], before["reloads"]):
+        failures.append(f"el segundo warm-up recargó módulos: {before} → {after}")
+
+    print(f"🔎 router_api: {len(results)} resultados en {wall:.2f}s (agentes de {args.latency}s), "
+          f"ejecuciones {calls}")
+    print(f"   warm-up: {sum(loaded.values())}/{len(loaded)} agentes cargados, caché {after}")
+    for failure in failures:
+        print(f"   ❌ {failure}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
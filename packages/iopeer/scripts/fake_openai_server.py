@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+fake_openai_server.py — API local en memoria para probar ``agent_sync`` sin red.
+
+Implementa lo mínimo que usa la reconciliación de agentes:
+
+- OpenAI Assistants: ``GET/POST /v1/assistants``, ``GET/POST/DELETE /v1/assistants/{id}``
+- Supabase (PostgREST): ``GET/POST /rest/v1/agents`` con upsert por ``on_conflict``
+- ``GET /_stats``: llamadas recibidas por endpoint (para medir duplicados y lotes)
+
+``--latency`` agrega demora a cada request para ver el efecto de la concurrencia.
+
+Uso (desde packages/):
+    python -m iopeer.scripts.fake_openai_server --port 8765 --latency 0.2
+    python -m iopeer.scripts.fake_openai_server --demo      # servidor + sincronizaciones de ejemplo
+
+Con el servidor corriendo, los SDKs reales apuntan a él:
+    OpenAI(base_url="http://127.0.0.1:8765/v1", api_key="test")
+    create_client("http://127.0.0.1:8765", "<cualquier jwt>")
+"""
+
+import argparse
+import json
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeState:
+    """Assistants, filas de Supabase y contadores, protegidos por un lock."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.assistants = {}
+        self.rows = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+
+def _endpoint(method, parts):
+    if parts[:2] == ["v1", "assistants"]:
+        return f"{method} /v1/assistants" + ("/{id}" if len(parts) > 2 else "")
+    return f"{method} /{'/'.join(parts)}"
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    state: FakeState = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else None
+
+    def _not_found(self, what):
+        self._send(404, {"error": {"message": f"No such {what}", "type": "invalid_request_error", "code": None}})
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        state = self.state
+        with state.lock:
+            state.calls[_endpoint(method, parts)] += 1
+        if state.latency:
+            time.sleep(state.latency)
+
+        if parts == ["_stats"]:
+            with state.lock:
+                return self._send(200, {"calls": dict(state.calls), "assistants": len(state.assistants),
+                                        "rows": len(state.rows)})
+        if parts[:2] == ["v1", "assistants"]:
+            return self._assistants(method, parts[2:], query)
+        if parts[:2] == ["rest", "v1"] and parts[2:] == ["agents"]:
+            return self._agents(method, query)
+        self._not_found("route")
+
+    def _assistants(self, method, rest, query):
+        state = self.state
+        with state.lock:
+            if not rest and method == "GET":
+                items = sorted(state.assistants.values(), key=lambda a: a["created_at"], reverse=True)
+                limit = int(query.get("limit", ["20"])[0])
+                data = items[:limit]
+                return self._send(200, {"object": "list", "data": data, "has_more": len(items) > limit,
+                                        "first_id": data[0]["id"] if data else None,
+                                        "last_id": data[-1]["id"] if data else None})
+            if not rest and method == "POST":
+                body = self._body() or {}
+                assistant = {
+                    "id": f"asst_{uuid.uuid4().hex[:24]}", "object": "assistant", "created_at": int(time.time()),
+                    "name": body.get("name"), "description": body.get("description"),
+                    "model": body.get("model"), "instructions": body.get("instructions"),
+                    "tools": body.get("tools", []), "metadata": body.get("metadata", {}),
+                }
+                state.assistants[assistant["id"]] = assistant
+                return self._send(200, assistant)
+            assistant = state.assistants.get(rest[0]) if rest else None
+            if assistant is None:
+                return self._not_found("assistant")
+            if method == "GET":
+                return self._send(200, assistant)
+            if method == "POST":
+                assistant.update({k: v for k, v in (self._body() or {}).items() if k in assistant and k != "id"})
+                return self._send(200, assistant)
+            if method == "DELETE":
+                del state.assistants[rest[0]]
+                return self._send(200, {"id": rest[0], "object": "assistant.deleted", "deleted": True})
+        self._not_found("route")
+
+    def _agents(self, method, query):
+        state = self.state
+        with state.lock:
+            if method == "GET":
+                return self._send(200, list(state.rows.values()))
+            if method == "POST":
+                body = self._body() or []
+                rows = body if isinstance(body, list) else [body]
+                key = query.get("on_conflict", ["name"])[0]
+                for row in rows:
+                    state.rows[row.get(key) or uuid.uuid4().hex] = {**state.rows.get(row.get(key), {}), **row}
+                return self._send(201, rows)
+        self._not_found("route")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+    """Arranca el servidor en un hilo; devuelve ``(server, state, base_url)``."""
+    state = FakeState(latency)
+    handler = type("BoundFakeHandler", (FakeHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://{host}:{server.server_address[1]}"
+
+
+def demo(latency: float):
+    """Tres sincronizaciones: inicial, sin cambios (cero llamadas) y con un spec modificado."""
+    from openai import OpenAI
+    from supabase import create_client
+    from iopeer.planning.agent_sync import sync_agents
+
+    server, state, base_url = start_server(latency=latency)
+    client = OpenAI(base_url=f"{base_url}/v1", api_key="test", max_retries=0)
+    supabase = create_client(base_url, "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.fake")
+    specs = [{"name": f"Agent{i}", "model": "gpt-4o-mini", "instructions": f"Agente de prueba {i}"} for i in range(8)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = f"{tmp}/agents_registry.json"
+        for label, run_specs in (("inicial", specs), ("sin cambios", specs),
+                                 ("un cambio", specs[:-1] + [{**specs[-1], "instructions": "Nuevo"}])):
+            start = time.perf_counter()
+            summary = sync_agents(run_specs, client, supabase, registry_path=registry, log=lambda m: None)
+            print(f"{label:<12} {time.perf_counter() - start:6.2f}s  nuevos={len(summary['created'])} "
+                  f"actualizados={len(summary['updated'])} sin_cambios={len(summary['unchanged'])}")
+    print(f"Assistants remotos: {len(state.assistants)}  Llamadas: {dict(state.calls)}")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--demo", action="store_true")
+    args = parser.parse_args()
+
+    if args.demo:
+        demo(args.latency or 0.2)
+        return
+    server, _, base_url = start_server(args.host, args.port, args.latency)
+    print(f"🧪 API falsa escuchando en {base_url} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
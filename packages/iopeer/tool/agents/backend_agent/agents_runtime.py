@@ -5,6 +5,10 @@ import datetime
 import re
 from .base_agent import BaseAgent
 from .logger import log_event
+from iopeer.data.llm_cache import cached_response_text, invalidate_response
+from iopeer.utils.prompt_builder import build_prompt
+from iopeer.utils.log_fingerprint import extract_signatures
+from iopeer.tool.agents.patch_batcher import batch_patch
 
 def safe_text(text: str) -> str:
     if not text:
@@ -18,37 +22,37 @@ class RepairAgent(BaseAgent):
         super().__init__(name)
 
     def run(self, log_text: str):
-        clean_log = safe_text(log_text)
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         reports_dir = Path("reports/logs")
         reports_dir.mkdir(parents=True, exist_ok=True)
-        patch_path = reports_dir / f"{self.name.lower()}_fix_{{ts}}.patch"
+        patch_path = reports_dir / f"{self.name.lower()}_fix_{ts}.patch"
 
-        log_event(self.name, f"🚀 Iniciando agente {{self.name}}...")
+        log_event(self.name, f"🚀 Iniciando agente {self.name}...")
 
         try:
             client = OpenAI()
-            log_event(f"{{self.name}} FIXER", "🧠 Consultando OpenAI para generar patch...")
+            if len(extract_signatures(log_text)) > 1:
+                # Varios errores: un diff por grupo de archivos en vez de uno por log
+                log_event(f"{self.name} FIXER", "📦 Varios errores: se piden patches agrupados por archivo...")
+                batch_patch(safe_text(log_text), client, model="gpt-4o", out_path=patch_path,
+                            log=lambda msg: log_event(f"{self.name} FIXER", msg))
+                return
 
-            prompt = f"""You are a NestJS or TypeScript auto-repair assistant.
+            log_event(f"{self.name} FIXER", "🧠 Consultando OpenAI para generar patch...")
+
+            prompt = build_prompt("""You are a NestJS or TypeScript auto-repair assistant.
 Analyze this error log and generate a unified diff patch (.patch)
 to fix the issue. If no code change is needed, return "NO_PATCH".
-Log:
-{{clean_log}}
-"""
-
-            response = client.responses.create(
-                model="gpt-4o",
-                input=prompt,
-                temperature=0.1,
-            )
+""", safe_text(log_text), model="gpt-4o")
 
-            result_text = response.output[0].content[0].text
+            result_text = cached_response_text(client, "gpt-4o", prompt, temperature=0.1)
             if "diff --git" in result_text:
                 patch_path.write_text(result_text, encoding="utf-8")
-                log_event(f"{{self.name}} FIXER", f"✅ Patch guardado en {{patch_path}}")
+                log_event(f"{self.name} FIXER", f"✅ Patch guardado en {patch_path}")
             else:
-                log_event(f"{{self.name}} FIXER", "⚠️ Respuesta inválida: no contiene diff válido.")
+                log_event(f"{self.name} FIXER", "⚠️ Respuesta inválida: no contiene diff válido.")
+                # Sin diff (o NO_PATCH): no reutilizar la respuesta la próxima vez que se repita el log
+                invalidate_response("gpt-4o", 0.1, prompt)
 
         except Exception as e:
-            log_event(f"{{self.name}} FIXER", f"💥 Error generando patch: {{e}}")
+            log_event(f"{self.name} FIXER", f"💥 Error generando patch: {e}")
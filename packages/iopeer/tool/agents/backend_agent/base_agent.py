@@ -8,7 +8,8 @@ import datetime
 from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
-from iopeer.tool.agents.logger import log_event
+from iopeer.tool.agents.backend_agent.logger import log_event
+from iopeer.data.llm_cache import cached_response_text, invalidate_response
 
 ROOT = Path(__file__).resolve().parents[2]
 REPORTS = ROOT / "reports" / "logs"
@@ -31,11 +32,12 @@ class BaseAgent:
 
         try:
             log_event(self.name, "🧠 Consultando OpenAI para generar patch...")
-            response = client.responses.create(model=self.model, input=prompt, temperature=0)
-            patch = response.output_text.strip()
+            patch = cached_response_text(client, self.model, prompt, temperature=0).strip()
 
             if not patch.startswith("diff --git"):
                 log_event(self.name, "⚠️ Respuesta inválida: no contiene diff válido.")
+                # No reutilizar la respuesta la próxima vez que se repita el prompt
+                invalidate_response(self.model, 0, prompt)
                 invalid_path = LOGS / f"invalid_{prefix}_{ts}.txt"
                 invalid_path.write_text(patch, encoding="utf-8")
                 return None
@@ -54,8 +56,8 @@ class BaseAgent:
         report_path = REPORTS / f"{prefix}_{ts}.txt"
         try:
             log_event(self.name, "🧠 Solicitando diagnóstico a OpenAI...")
-            response = client.responses.create(model=self.model, input=prompt, temperature=0.2)
-            report_path.write_text(response.output_text, encoding="utf-8")
+            report = cached_response_text(client, self.model, prompt, temperature=0.2)
+            report_path.write_text(report, encoding="utf-8")
             log_event(self.name, f"📄 Reporte guardado en {report_path}")
         except Exception as e:
             log_event(self.name, f"💥 Error generando reporte: {e}")
@@ -1,26 +1,32 @@
 #!/usr/bin/env python3
 """
 Agent Router — Despacha errores a los agentes correspondientes
-Versión 0.5 — Simplificada para carpeta `iopeer`
+Versión 0.6 — Despacho concurrente de lotes (asyncio) con límite de concurrencia
 """
 
+import os
 import sys
+import time
+import asyncio
+import threading
 import importlib.util
 import datetime
 from pathlib import Path
+from iopeer.utils.log_fingerprint import fingerprint_log
 
 # === Paths base ===
 CURRENT_FILE = Path(__file__).resolve()
 ROOT = CURRENT_FILE.parents[3]
-AGENTS_DIR = ROOT / "packages" / "iopeer" / "tool" / "agents"
+# Carpetas de agentes: los de la API viven junto al router, los de la web en frontend_agent/
+AGENT_DIRS = [CURRENT_FILE.parent, CURRENT_FILE.parent.parent / "frontend_agent"]
 
+for agents_dir in AGENT_DIRS:
+    if not agents_dir.exists():
+        raise FileNotFoundError(f"❌ No se encontró la carpeta de agentes en {agents_dir}")
 
-if not AGENTS_DIR.exists():
-    raise FileNotFoundError(f"❌ No se encontró la carpeta de agentes en {AGENTS_DIR}")
-
-# Agregar al sys.path para permitir imports absolutos
+# Agregar al sys.path para permitir imports absolutos (``iopeer.…`` también al correr como script)
 sys.path.insert(0, str(ROOT / "scripts"))
-sys.path.insert(0, str(AGENTS_DIR))
+sys.path.insert(0, str(ROOT.parent))
 
 LOGS = ROOT / "logs" / "agents"
 LOGS.mkdir(parents=True, exist_ok=True)
@@ -34,70 +40,219 @@ def log_event(agent: str, message: str):
         f.write(entry + "\n")
 
 # === Registro de agentes disponibles ===
+# tipo de error -> target -> módulo; un job sin target va a todos los targets del tipo
 AGENTS = {
-    "BuildError": "agents_build",
-    "DependencyError": "agents_dependency",
-    "EnvError": "agents_env",
-    "RuntimeError": "agents_runtime",
-    "BuildError": "agents_web_build",
-    "DependencyError": "agents_web_dependency",
-    "RuntimeError": "agents_web_runtime",
-    "EnvError": "agents_env"
+    "BuildError": {"api": "agents_build", "web": "agents_web_build"},
+    "DependencyError": {"api": "agents_dependency", "web": "agents_web_dependency"},
+    "RuntimeError": {"api": "agents_runtime", "web": "agents_web_runtime"},
+    "EnvError": {"api": "agents_env"},
 }
 
-def load_agent_module(agent_name: str):
-    """Carga dinámica del módulo del agente."""
-    module_path = AGENTS_DIR / f"{agent_name}.py"
-    if not module_path.exists():
-        log_event("router", f"❌ No se encontró el archivo del agente: {module_path}")
-        return None
+# === Caché de módulos de agentes (vida del proceso) ===
+# ruta del módulo -> (mtime_ns, módulo, runner); se recarga sólo si el archivo cambió
+_MODULE_CACHE = {}
+_CACHE_STATS = {"hits": 0, "loads": 0, "reloads": 0}
+_CACHE_LOCK = threading.Lock()
+
+def agent_path(agent_name: str):
+    """Ruta del archivo del agente en la primera carpeta de ``AGENT_DIRS`` que lo tenga (o ``None``)."""
+    for agents_dir in AGENT_DIRS:
+        module_path = agents_dir / f"{agent_name}.py"
+        if module_path.exists():
+            return module_path
+    return None
 
+def qualified_name(module_path: Path) -> str:
+    """Nombre completo del módulo (``iopeer.tool.agents.<carpeta>.<agente>``) para que funcionen
+    sus imports relativos; el nombre del archivo si está fuera del paquete."""
     try:
-        spec = importlib.util.spec_from_file_location(agent_name, module_path)
-        module = importlib.util.module_from_spec(spec)
-        sys.modules[agent_name] = module
-        spec.loader.exec_module(module)
-        return module
-    except Exception as e:
-        log_event("router", f"💥 Error al cargar módulo {agent_name}: {e}")
+        parts = module_path.with_suffix("").relative_to(ROOT).parts
+    except ValueError:
+        return module_path.stem
+    return ".".join((ROOT.name, *parts))
+
+def _agent_runner(module):
+    """``run`` del módulo o, si no hay, el de una instancia de la clase de agente definida en él."""
+    if callable(getattr(module, "run", None)):
+        return module.run
+    for obj in vars(module).values():
+        if isinstance(obj, type) and obj.__module__ == module.__name__ and callable(getattr(obj, "run", None)):
+            return obj().run
+    return None
+
+def _load(agent_name: str):
+    """Entrada de la caché ``(mtime_ns, módulo, runner)`` del agente; ``None`` si no se pudo cargar."""
+    module_path = agent_path(agent_name)
+    if module_path is None:
+        log_event("router", f"❌ No se encontró el archivo del agente {agent_name} en {', '.join(map(str, AGENT_DIRS))}")
         return None
 
-def dispatch_agent(error_type: str, log_text: str):
-    """Ejecuta el agente según el tipo de error."""
-    if error_type not in AGENTS:
-        log_event("router", f"⚠️ Tipo de error desconocido: {error_type}")
-        return
+    key = str(module_path)
+    with _CACHE_LOCK:
+        mtime = module_path.stat().st_mtime_ns
+        cached = _MODULE_CACHE.get(key)
+        if cached and cached[0] == mtime:
+            _CACHE_STATS["hits"] += 1
+            return cached
+
+        name = qualified_name(module_path)
+        try:
+            spec = importlib.util.spec_from_file_location(name, module_path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module
+            spec.loader.exec_module(module)
+            # El agente (y su cliente OpenAI) se construye una vez por carga, no por despacho
+            runner = _agent_runner(module)
+        except Exception as e:
+            log_event("router", f"💥 Error al cargar módulo {agent_name}: {e}")
+            return None
+
+        entry = _MODULE_CACHE[key] = (mtime, module, runner)
+        if cached:
+            _CACHE_STATS["reloads"] += 1
+            log_event("router", f"♻️ Agente {agent_name} recargado (archivo modificado)")
+        else:
+            _CACHE_STATS["loads"] += 1
+        return entry
+
+def load_agent_module(agent_name: str):
+    """Carga dinámica del módulo del agente, reutilizando la versión en caché."""
+    entry = _load(agent_name)
+    return entry[1] if entry else None
+
+def load_agent(agent_name: str):
+    """Función ``run(log_text)`` del agente (en caché junto a su módulo) o ``None``."""
+    entry = _load(agent_name)
+    return entry[2] if entry else None
+
+def agent_names():
+    """Módulos de agente referidos en ``AGENTS``, sin repetir."""
+    return list(dict.fromkeys(name for routes in AGENTS.values() for name in routes.values()))
+
+def warm_up_agents():
+    """Precarga todos los agentes de ``AGENTS`` para no pagar la carga al primer error."""
+    start = time.perf_counter()
+    loaded = {name: load_agent(name) is not None for name in agent_names()}
+    log_event("router", f"🔥 Warm-up: {sum(loaded.values())}/{len(loaded)} agentes en {time.perf_counter() - start:.3f}s")
+    return loaded
+
+def agent_cache_stats():
+    """Contadores de la caché de módulos (hits, cargas y recargas)."""
+    with _CACHE_LOCK:
+        return dict(_CACHE_STATS, cached=len(_MODULE_CACHE))
+
+# Máximo de agentes ejecutándose a la vez en un lote
+DEFAULT_CONCURRENCY = int(os.getenv("ROUTER_CONCURRENCY", "4"))
+
+def job_targets(error_type: str, target=None):
+    """Targets a los que va un job: el indicado o todos los que tienen agente para el tipo."""
+    if target is not None:
+        return [target]
+    return list(AGENTS.get(error_type, {})) or [None]
+
+def _resolve_agent(error_type: str, target):
+    """Devuelve (nombre_modulo, run) o (nombre_modulo, None) si no se puede ejecutar."""
+    module_name = AGENTS.get(error_type, {}).get(target)
+    if module_name is None:
+        log_event("router", f"⚠️ Sin agente para {error_type} ({target or 'sin target'})")
+        return None, None
 
-    module_name = AGENTS[error_type]
     log_event("router", f"🚀 Buscando agente: {module_name}")
-    module = load_agent_module(module_name)
+    entry = _load(module_name)
 
-    if not module:
+    if not entry:
         log_event("router", f"💥 Falló la carga del agente {module_name}")
-        return
+        return module_name, None
 
-    if not hasattr(module, "run"):
+    if entry[2] is None:
         log_event("router", f"⚠️ El agente {module_name} no tiene función 'run'.")
-        return
+        return module_name, None
 
-    try:
-        log_event("router", f"🚀 Ejecutando agente: {module_name}")
-        module.run(log_text)
-        log_event("router", f"✅ Agente {module_name} completado correctamente.")
-    except Exception as e:
-        log_event("router", f"💥 Error ejecutando {module_name}: {e}")
+    return module_name, entry[2]
+
+async def _run_job(semaphore, target, error_type: str, log_text: str, module_name, run):
+    result = {"target": target, "error_type": error_type, "agent": module_name, "ok": False, "patch": None, "latency": 0.0, "error": None}
+    if run is None:
+        result["error"] = "agent_unavailable"
+        return result
+
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            log_event("router", f"🚀 Ejecutando agente: {module_name}")
+            result["patch"] = await asyncio.to_thread(run, log_text)
+            result["ok"] = True
+            log_event("router", f"✅ Agente {module_name} completado correctamente.")
+        except Exception as e:
+            result["error"] = str(e)
+            log_event("router", f"💥 Error ejecutando {module_name}: {e}")
+        result["latency"] = round(time.perf_counter() - start, 3)
+    return result
+
+async def dispatch_batch_async(jobs, concurrency: int = DEFAULT_CONCURRENCY):
+    """Ejecuta un lote de jobs ``(error_type, log_text)`` o ``(error_type, log_text, target)`` en paralelo.
+
+    Un job sin target se reparte entre todos los targets con agente para su
+    tipo (p. ej. ``BuildError`` → api y web). Los módulos se cargan primero en
+    el hilo actual; luego cada ``run`` corre en un hilo del executor, con a lo
+    sumo ``concurrency`` agentes a la vez. Jobs con el mismo target, el mismo
+    tipo y el mismo fingerprint de log se ejecutan una sola vez. Devuelve un
+    resultado por job y target, en el orden de los jobs, con el patch y la
+    latencia.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    unique = {}
+    keys = []
+    for job in jobs:
+        error_type, log_text, target = (*job, None)[:3]
+        fingerprint = fingerprint_log(log_text)["fingerprint"]
+        for job_target in job_targets(error_type, target):
+            key = (job_target, error_type, fingerprint)
+            keys.append(key)
+            if key not in unique:
+                unique[key] = (job_target, error_type, log_text, *_resolve_agent(error_type, job_target))
+            else:
+                log_event("router", f"♻️ Job duplicado {error_type}@{job_target} ({fingerprint}), se reutiliza el resultado")
+    start = time.perf_counter()
+    runs = await asyncio.gather(*(_run_job(semaphore, *job) for job in unique.values()))
+    by_key = dict(zip(unique, runs))
+    results = [dict(by_key[key], fingerprint=key[2]) for key in keys]
+    total = time.perf_counter() - start
+    for r in results:
+        log_event("router", f"⏱️ {r['error_type']}@{r['target']} → {r['agent']}: {r['latency']:.3f}s "
+                            f"({'ok' if r['ok'] else r['error']})")
+    log_event("router", f"⏱️ Lote de {len(results)} jobs completado en {total:.3f}s")
+    return results
+
+def dispatch_batch(jobs, concurrency: int = DEFAULT_CONCURRENCY):
+    """Versión síncrona de ``dispatch_batch_async``."""
+    return asyncio.run(dispatch_batch_async(jobs, concurrency))
+
+def dispatch_agent(error_type: str, log_text: str, target=None):
+    """Ejecuta el agente según el tipo de error (lote de un único job); un resultado por target."""
+    return dispatch_batch([(error_type, log_text, target)], concurrency=1)
+
+def parse_job_arg(arg: str):
+    """``BuildError`` o ``BuildError:web`` → ``(error_type, target)``."""
+    error_type, _, target = arg.strip().partition(":")
+    return error_type, target or None
 
 def main():
     if len(sys.argv) < 2:
-        print("Uso: router.py <ErrorType>")
+        print("Uso: router.py <ErrorType>[:<target>] [<ErrorType>[:<target>] ...]")
         sys.exit(1)
 
-    error_type = sys.argv[1].strip()
+    jobs = [parse_job_arg(arg) for arg in sys.argv[1:]]
     log_text = sys.stdin.read().strip()
+    label = ", ".join(arg.strip() for arg in sys.argv[1:])
 
-    log_event("router", f"📦 Iniciando router para tipo: {error_type}")
-    dispatch_agent(error_type, log_text)
-    log_event("router", f"🏁 Fin del proceso del router ({error_type})")
+    log_event("router", f"📦 Iniciando router para tipo: {label}")
+    warm_up_agents()
+    if len(jobs) == 1:
+        dispatch_agent(jobs[0][0], log_text, jobs[0][1])
+    else:
+        dispatch_batch([(error_type, log_text, target) for error_type, target in jobs])
+    log_event("router", f"🏁 Fin del proceso del router ({label})")
     print("=" * 80)
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
-from agents.base_agent import BaseAgent
-from modules.logger import log_event
+from iopeer.tool.agents.backend_agent.base_agent import BaseAgent
+from iopeer.tool.agents.backend_agent.logger import log_event
 from openai import OpenAI
+from iopeer.utils.log_fingerprint import extract_signatures
+from iopeer.tool.agents.patch_batcher import batch_patch
 import os
 from pathlib import Path
 
@@ -13,6 +15,14 @@ class WebBuildAgent(BaseAgent):
     def run(self, log_text):
         log_event("WEB_BUILD", "🧱 Iniciando agente BuildError...")
         try:
+            if len(extract_signatures(log_text)) > 1:
+                # Varios errores: un diff por grupo de archivos en vez de uno por log
+                batch_patch(log_text, self.client, model="gpt-4o-mini",
+                            role="Sos un experto en Next.js y React. Corregí sólo archivos .tsx o .ts "
+                                 "y no dejes CSS o tailwind en archivos TypeScript.",
+                            out_path=self.reports / f"web_build_fix_{self.timestamp()}.patch",
+                            log=lambda msg: log_event("WEB_BUILD", msg))
+                return
             prompt = f"""
 Sos un experto en Next.js y React.
 Analizá el siguiente error de compilación o sintaxis y generá un parche válido en formato unified diff.
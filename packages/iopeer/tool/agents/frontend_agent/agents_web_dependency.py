@@ -1,5 +1,5 @@
-from agents.base_agent import BaseAgent
-from modules.logger import log_event
+from iopeer.tool.agents.backend_agent.base_agent import BaseAgent
+from iopeer.tool.agents.backend_agent.logger import log_event
 from openai import OpenAI
 from pathlib import Path
 import os
@@ -1,3 +1,4 @@
+import sys
 from dotenv import load_dotenv
 from iopeer.data.memory.tiny_memory import TinyMemory
 from iopeer.metrics.eval_layer import EvalLayer
@@ -7,6 +8,7 @@ from iopeer.tool.agents.git_agent.git_health import check_git_health
 from iopeer.tool.agents.git_agent.git_repair import auto_repair_git
 from iopeer.tool.agents.git_agent.git_status_reporter import generate_report
 from iopeer.tool.agents.git_agent.git_diagnostic import run_diagnostic
+from iopeer.tool.agents.git_agent.git_fleet import run_fleet, DEFAULT_WORKERS
 
 load_dotenv()
 AGENT = "git"
@@ -37,5 +39,15 @@ class GitAutopilot:
         diagnostic = run_diagnostic()
         self.memory.save_metric(AGENT, "diagnostic_executed", 1)
 
+    def run_fleet(self, repo_paths, max_workers=DEFAULT_WORKERS, repair=True):
+        """Modo flota: diagnóstico, health y reparación de varios repositorios en paralelo."""
+        report = run_fleet(repo_paths, max_workers=max_workers, repair=repair)
+        self.memory.save_metric(AGENT, "fleet_executed", report["summary"]["repos"])
+        return report
+
 if __name__ == "__main__":
-    GitAutopilot().run()
+    # `git_autopilot.py repo1 repo2 ...` activa el modo flota (ver git_fleet.py para más opciones)
+    if len(sys.argv) > 1:
+        GitAutopilot().run_fleet(sys.argv[1:])
+    else:
+        GitAutopilot().run()
@@ -0,0 +1,521 @@
+"""
+git_backend.py — Backend git persistente para los ciclos del autopilot.
+
+``GitRepoReader`` lee HEAD, refs sueltas, ``packed-refs`` y la configuración
+de upstream directamente del directorio ``.git`` (sin procesos), y calcula
+ahead/behind recorriendo el grafo de commits por número de generación, a
+través de un único ``git cat-file --batch`` que queda abierto entre consultas.
+Las generaciones salen del commit-graph de git cuando existe; sólo los
+commits que no están en él se recorren en proceso.
+
+Los lectores se reutilizan por repositorio (``get_reader``). Cuando el repo no
+se puede leer así (refs en reftable, clones shallow, objetos faltantes, git
+sin ``cat-file``), las funciones de módulo vuelven a invocar git por
+subprocess con el mismo resultado.
+"""
+
+import os
+import re
+import mmap
+import heapq
+import struct
+import atexit
+import threading
+import subprocess
+
+
+class GitBackendError(Exception):
+    """El repositorio no se puede leer en proceso; usar subprocess."""
+
+
+LEFT, RIGHT = 1, 2
+BOTH = LEFT | RIGHT
+# Commits fuera del commit-graph que se recorren para calcular generaciones; más que eso, subprocess
+MAX_WALK = int(os.getenv("GIT_MAX_WALK", "2000"))
+# Nivel topológico máximo del commit-graph (30 bits): a partir de ahí no es confiable
+GENERATION_MAX = 0x3FFFFFFF
+GRAPH_HASH_LEN = {1: 20, 2: 32}
+
+SECTION_RE = re.compile(r'^\[\s*([\w.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+
+
+def find_git_dir(path=None):
+    """Devuelve ``(worktree, git_dir)`` subiendo desde ``path``; soporta ``.git`` como archivo ``gitdir:``."""
+    current = os.path.abspath(path or os.getcwd())
+    while True:
+        dot_git = os.path.join(current, ".git")
+        if os.path.isdir(dot_git):
+            return current, dot_git
+        if os.path.isfile(dot_git):
+            with open(dot_git, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+            if not content.startswith("gitdir:"):
+                raise GitBackendError(f".git inválido en {current}")
+            git_dir = content[len("gitdir:"):].strip()
+            return current, os.path.normpath(os.path.join(current, git_dir))
+        parent = os.path.dirname(current)
+        if parent == current:
+            raise GitBackendError(f"No es un repositorio git: {path or os.getcwd()}")
+        current = parent
+
+
+def parse_git_config(text: str) -> dict:
+    """Parser mínimo de ``.git/config``: ``{"branch.main.remote": "origin", ...}``."""
+    values = {}
+    section = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line[0] in "#;":
+            continue
+        m = SECTION_RE.match(line)
+        if m:
+            name, sub = m.groups()
+            section = name.lower() + (f".{sub}" if sub is not None else "")
+            continue
+        if section is None or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        values[f"{section}.{key.strip().lower()}"] = value
+    return values
+
+
+class CatFileBatch:
+    """Co-proceso ``git cat-file --batch`` reutilizable (thread-safe)."""
+
+    def __init__(self, cwd):
+        self.cwd = cwd
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _ensure(self):
+        if self._proc is None or self._proc.poll() is not None:
+            try:
+                self._proc = subprocess.Popen(
+                    ["git", "cat-file", "--batch"], cwd=self.cwd,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                )
+            except OSError as e:
+                raise GitBackendError(f"git cat-file no disponible: {e}") from e
+        return self._proc
+
+    def read(self, sha: str):
+        """Devuelve ``(tipo, contenido)`` del objeto ``sha``."""
+        with self._lock:
+            proc = self._ensure()
+            try:
+                proc.stdin.write(sha.encode("ascii") + b"\n")
+                proc.stdin.flush()
+                header = proc.stdout.readline().split()
+                if len(header) != 3:
+                    raise GitBackendError(f"Objeto no disponible: {sha}")
+                size = int(header[2])
+                data = proc.stdout.read(size + 1)[:-1]
+            except (OSError, ValueError) as e:
+                self.close()
+                raise GitBackendError(f"cat-file falló leyendo {sha}: {e}") from e
+            return header[1].decode("ascii"), data
+
+    def close(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except Exception:
+            proc.kill()
+        finally:
+            proc.stdout.close()
+
+
+class CommitGraph:
+    """Niveles topológicos del commit-graph de git, leídos con mmap.
+
+    Usa ``objects/info/commit-graph`` y las capas de
+    ``objects/info/commit-graphs/commit-graph-chain``. El nivel es la misma
+    generación que calcula ``GitRepoReader`` (1 + el máximo de los padres).
+    """
+
+    def __init__(self, objects_dir):
+        info = os.path.join(objects_dir, "info")
+        paths = [os.path.join(info, "commit-graph")]
+        chain = os.path.join(info, "commit-graphs", "commit-graph-chain")
+        if os.path.isfile(chain):
+            with open(chain, "r", encoding="ascii") as f:
+                paths += [os.path.join(info, "commit-graphs", f"graph-{line.strip()}.graph") for line in f
+                          if line.strip()]
+        self.layers = []
+        for path in paths:
+            try:
+                self.layers.append(self._open(path))
+            except (OSError, ValueError):
+                continue
+
+    @staticmethod
+    def _open(path):
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        hash_len = GRAPH_HASH_LEN.get(data[5])
+        if data[:4] != b"CGPH" or data[4] != 1 or hash_len is None:
+            data.close()
+            raise ValueError(f"commit-graph no soportado: {path}")
+        chunks = {}
+        for i in range(data[6] + 1):
+            chunk_id, offset = struct.unpack_from(">4sQ", data, 8 + 12 * i)
+            chunks[chunk_id] = offset
+        if not {b"OIDF", b"OIDL", b"CDAT"} <= chunks.keys():
+            data.close()
+            raise ValueError(f"commit-graph incompleto: {path}")
+        fanout = struct.unpack_from(">256I", data, chunks[b"OIDF"])
+        return data, hash_len, fanout, chunks[b"OIDL"], chunks[b"CDAT"]
+
+    def generation(self, sha: str):
+        """Nivel del commit o ``None`` si no está en el commit-graph (o el nivel no es confiable)."""
+        for data, hash_len, fanout, oids, cdat in self.layers:
+            if len(sha) != 2 * hash_len:
+                continue
+            oid = bytes.fromhex(sha)
+            lo, hi = fanout[oid[0] - 1] if oid[0] else 0, fanout[oid[0]]
+            while lo < hi:
+                mid = (lo + hi) // 2
+                current = data[oids + mid * hash_len:oids + (mid + 1) * hash_len]
+                if current < oid:
+                    lo = mid + 1
+                elif current > oid:
+                    hi = mid
+                else:
+                    # Tras el árbol y los dos padres: 30 bits de nivel + 34 de fecha
+                    level = struct.unpack_from(">I", data, cdat + mid * (hash_len + 16) + hash_len + 8)[0] >> 2
+                    return level if 0 < level < GENERATION_MAX else None
+        return None
+
+    def close(self):
+        for layer in self.layers:
+            layer[0].close()
+        self.layers = []
+
+
+class GitRepoReader:
+    """Lee refs, HEAD y upstream de un repositorio sin lanzar procesos."""
+
+    def __init__(self, path=None):
+        self.worktree, self.git_dir = find_git_dir(path)
+        commondir = os.path.join(self.git_dir, "commondir")
+        if os.path.isfile(commondir):
+            with open(commondir, "r", encoding="utf-8") as f:
+                self.common_dir = os.path.normpath(os.path.join(self.git_dir, f.read().strip()))
+        else:
+            self.common_dir = self.git_dir
+        self._packed = (None, {})
+        self._config = (None, {})
+        self._commits = {}
+        self._generations = {}
+        self._graph = (None, None)
+        # Firma del commit-graph con la que el recorrido superó MAX_WALK: hasta que cambie, subprocess
+        self._too_long = None
+        self._batch = CatFileBatch(self.worktree)
+        if self.config().get("extensions.refstorage", "files") != "files":
+            raise GitBackendError("Formato de refs no soportado (reftable)")
+
+    # --- archivos de .git, cacheados por mtime ---
+    def _cached(self, attr, path, parse):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        cached_mtime, value = getattr(self, attr)
+        if cached_mtime != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                value = parse(f.read())
+            setattr(self, attr, (mtime, value))
+        return value
+
+    def config(self) -> dict:
+        return self._cached("_config", os.path.join(self.common_dir, "config"), parse_git_config)
+
+    def packed_refs(self) -> dict:
+        def parse(text):
+            refs = {}
+            for line in text.splitlines():
+                if line and line[0] not in "#^":
+                    sha, name = line.split(" ", 1)
+                    refs[name] = sha
+            return refs
+        return self._cached("_packed", os.path.join(self.common_dir, "packed-refs"), parse)
+
+    # --- refs ---
+    def _read_ref_file(self, name):
+        base = self.git_dir if name == "HEAD" or "/" not in name else self.common_dir
+        try:
+            with open(os.path.join(base, name), "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+
+    def resolve_ref(self, name: str, depth: int = 0):
+        """SHA al que apunta ``name`` (``HEAD``, ``refs/heads/x``...), siguiendo refs simbólicas."""
+        if depth > 5:
+            raise GitBackendError(f"Ref simbólica demasiado profunda: {name}")
+        value = self._read_ref_file(name)
+        if value is None:
+            return self.packed_refs().get(name)
+        if value.startswith("ref:"):
+            return self.resolve_ref(value[4:].strip(), depth + 1)
+        return value
+
+    def head(self):
+        """``(rama, sha)``; ``rama`` es ``None`` con HEAD desacoplado."""
+        value = self._read_ref_file("HEAD")
+        if value is None:
+            raise GitBackendError("HEAD no encontrado")
+        if value.startswith("ref:"):
+            ref = value[4:].strip()
+            branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else ref
+            return branch, self.resolve_ref(ref)
+        return None, value
+
+    def current_branch(self) -> str:
+        """Equivalente a ``git rev-parse --abbrev-ref HEAD``."""
+        branch, _ = self.head()
+        return branch or "HEAD"
+
+    def upstream(self, branch: str = None):
+        """``(nombre, ref)`` del upstream configurado (``origin/main``, ``refs/remotes/origin/main``) o ``None``."""
+        if branch is None:
+            branch, _ = self.head()
+            if branch is None:
+                return None
+        config = self.config()
+        remote = config.get(f"branch.{branch}.remote")
+        merge = config.get(f"branch.{branch}.merge")
+        if not remote or not merge:
+            return None
+        short = merge[len("refs/heads/"):] if merge.startswith("refs/heads/") else merge
+        if remote == ".":
+            return short, merge
+        return f"{remote}/{short}", f"refs/remotes/{remote}/{short}"
+
+    def rev_parse(self, name: str) -> str:
+        """Resuelve ``HEAD``, un SHA completo, una rama local o remota (``origin/main``)."""
+        if name == "HEAD":
+            return self.head()[1]
+        if re.fullmatch(r"[0-9a-f]{40}|[0-9a-f]{64}", name):
+            return name
+        candidates = [name] if name.startswith("refs/") else [f"refs/heads/{name}", f"refs/remotes/{name}", f"refs/tags/{name}"]
+        for ref in candidates:
+            sha = self.resolve_ref(ref)
+            if sha:
+                return sha
+        raise GitBackendError(f"No se pudo resolver {name}")
+
+    def state_key(self) -> dict:
+        """Firma barata del estado: stat del index, HEAD, ORIG_HEAD y SHA del upstream.
+
+        Si no cambia, los conteos del último snapshot siguen valiendo, salvo
+        ediciones del working tree que todavía no tocaron el index.
+        """
+        try:
+            st = os.stat(os.path.join(self.git_dir, "index"))
+            index_mtime_ns, index_size = st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            index_mtime_ns = index_size = None
+        branch, head = self.head()
+        upstream = self.upstream(branch) if branch else None
+        return {
+            "index_mtime_ns": index_mtime_ns,
+            "index_size": index_size,
+            "head_sha": head,
+            "orig_head_sha": self._read_ref_file("ORIG_HEAD"),
+            "upstream_sha": self.resolve_ref(upstream[1]) if upstream else None,
+        }
+
+    # --- grafo de commits ---
+    def _parents(self, sha):
+        """Padres de un commit, leídos con ``cat-file --batch`` y cacheados."""
+        parents = self._commits.get(sha)
+        if parents is None:
+            kind, data = self._batch.read(sha)
+            if kind != "commit":
+                raise GitBackendError(f"{sha} no es un commit ({kind})")
+            header = data.split(b"\n\n", 1)[0]
+            parents = [line[7:].decode("ascii") for line in header.split(b"\n") if line.startswith(b"parent ")]
+            self._commits[sha] = parents
+        return parents
+
+    def _graph_key(self):
+        info = os.path.join(self.common_dir, "objects", "info")
+        key = []
+        for path in (os.path.join(info, "commit-graph"), os.path.join(info, "commit-graphs", "commit-graph-chain")):
+            try:
+                st = os.stat(path)
+                key.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                key.append(None)
+        return tuple(key)
+
+    def commit_graph(self) -> CommitGraph:
+        """Commit-graph del repo, reabierto si git lo reescribió (``gc``, ``fetch``)."""
+        key = self._graph_key()
+        cached_key, graph = self._graph
+        if cached_key != key:
+            if graph is not None:
+                graph.close()
+            graph = CommitGraph(os.path.join(self.common_dir, "objects"))
+            self._graph = (key, graph)
+        return graph
+
+    def _generation(self, sha):
+        """Número de generación (1 + el máximo de los padres; las raíces valen 1), cacheado.
+
+        Sale del commit-graph si el commit está ahí; si no, se recorren sus
+        ancestros hasta llegar a commits con generación conocida. Si eso pasa
+        de ``MAX_WALK`` commits se lanza ``GitBackendError`` y, hasta que cambie
+        el commit-graph, ``ahead_behind`` va directo a subprocess. Un ancestro
+        siempre tiene generación menor, cosa que las fechas no garantizan
+        (commits del mismo segundo, relojes corridos).
+        """
+        generations = self._generations
+        graph = self.commit_graph()
+        stack = [sha]
+        walked = 0
+        while stack:
+            current = stack[-1]
+            if current in generations:
+                stack.pop()
+                continue
+            level = graph.generation(current)
+            if level is not None:
+                generations[current] = level
+                stack.pop()
+                continue
+            parents = self._parents(current)
+            missing = [p for p in parents if p not in generations]
+            if missing:
+                stack.extend(missing)
+                walked += 1
+                if walked > MAX_WALK:
+                    self._too_long = self._graph_key()
+                    raise GitBackendError("Historia demasiado larga para el recorrido en proceso")
+                continue
+            generations[current] = 1 + max((generations[p] for p in parents), default=0)
+            stack.pop()
+        return generations[sha]
+
+    def ahead_behind(self, local: str, upstream: str):
+        """``(ahead, behind)`` de ``local`` respecto de ``upstream``.
+
+        Recorre el grafo por generación (de mayor a menor) marcando cada commit
+        como alcanzable desde uno, el otro o ambos lados. Al sacar un commit ya
+        se procesaron todos sus descendientes, así que su marca es definitiva, y
+        el recorrido termina cuando en la cola sólo quedan commits comunes (lo
+        mismo que ``git rev-list --left-right --count``).
+        """
+        left, right = self.rev_parse(local), self.rev_parse(upstream)
+        if left == right:
+            return 0, 0
+        if os.path.exists(os.path.join(self.common_dir, "shallow")):
+            raise GitBackendError("Repositorio shallow")
+        if self._too_long is not None and self._too_long == self._graph_key():
+            raise GitBackendError("Historia demasiado larga para el recorrido en proceso")
+
+        flags = {left: LEFT, right: RIGHT}
+        heap = []
+        pending = 0
+        for sha in (left, right):
+            heapq.heappush(heap, (-self._generation(sha), sha, flags[sha]))
+            pending += 1
+        visited = {}
+        while heap and pending:
+            _, sha, pushed = heapq.heappop(heap)
+            if pushed != BOTH:
+                pending -= 1
+            flag = flags[sha]
+            if visited.get(sha) == flag:
+                continue
+            visited[sha] = flag
+            for parent in self._parents(sha):
+                new = flags.get(parent, 0) | flag
+                if new != flags.get(parent):
+                    flags[parent] = new
+                    heapq.heappush(heap, (-self._generation(parent), parent, new))
+                    if new != BOTH:
+                        pending += 1
+
+        ahead = sum(1 for f in flags.values() if f == LEFT)
+        behind = sum(1 for f in flags.values() if f == RIGHT)
+        return ahead, behind
+
+    def close(self):
+        self._batch.close()
+        if self._graph[1] is not None:
+            self._graph[1].close()
+
+
+_READERS = {}
+_READERS_LOCK = threading.Lock()
+
+
+def get_reader(path=None):
+    """Lector persistente del repositorio que contiene ``path`` (o ``None`` si no se puede leer)."""
+    try:
+        key = find_git_dir(path)[1]
+    except (GitBackendError, OSError):
+        return None
+    with _READERS_LOCK:
+        reader = _READERS.get(key)
+        if reader is None:
+            try:
+                reader = GitRepoReader(path)
+            except (GitBackendError, OSError):
+                return None
+            _READERS[key] = reader
+        return reader
+
+
+def close_readers():
+    with _READERS_LOCK:
+        for reader in _READERS.values():
+            reader.close()
+        _READERS.clear()
+
+
+atexit.register(close_readers)
+
+
+# --- API con respaldo por subprocess ---
+def _git(args, cwd=None):
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def branch_info(cwd=None):
+    """``(rama_local, upstream)``; ``upstream`` es ``None`` si la rama no trackea ninguna."""
+    reader = get_reader(cwd)
+    if reader is not None:
+        try:
+            upstream = reader.upstream()
+            return reader.current_branch(), upstream[0] if upstream else None
+        except (GitBackendError, OSError, ValueError):
+            pass
+    local = _git(["rev-parse", "--abbrev-ref", "HEAD"], cwd) or "HEAD"
+    remote = _git(["rev-parse", "--abbrev-ref", "--symbolic-full-name", "@{u}"], cwd)
+    return local, remote
+
+
+def ahead_behind(local, upstream, cwd=None):
+    """``(ahead, behind)`` de ``local`` contra ``upstream``; ``None`` si no se pudo calcular."""
+    reader = get_reader(cwd)
+    if reader is not None:
+        try:
+            return reader.ahead_behind(local, upstream)
+        except (GitBackendError, OSError, ValueError):
+            pass
+    output = _git(["rev-list", "--left-right", "--count", f"{upstream}...{local}"], cwd)
+    try:
+        behind, ahead = map(int, output.split())
+        return ahead, behind
+    except (AttributeError, ValueError):
+        return None
@@ -1,59 +1,72 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
-import subprocess, json, sqlite3
+import subprocess, json, argparse, time
 from datetime import datetime
-from iopeer.data.memory.tiny_memory import TinyMemory
+from iopeer.data.memory.tiny_memory import TinyMemory, GIT_DIAGNOSTICS_SCHEMA, INSERT_GIT_SNAPSHOT_SQL
+from iopeer.data.memory.connection_pool import get_connection
+from iopeer.data.memory.timeseries import get_store
+from iopeer.tool.agents.git_agent.git_snapshot import take_snapshot
+from iopeer.tool.agents.git_agent.git_backend import get_reader, GitBackendError
 
 DB_PATH = "/core/memory/git_diagnostics.db"
 
-def run_cmd(cmd):
+# Antigüedad máxima (segundos) de un snapshot reutilizado por el modo incremental
+MAX_AGE = float(os.getenv("GIT_DIAG_MAX_AGE", "300"))
+SNAPSHOT_FIELDS = [
+    "timestamp", "local_branch", "remote_branch", "ahead", "behind", "staged_count",
+    "unstaged_count", "untracked_count", "is_tracking", "is_synced",
+    "kind", "repo", "index_mtime_ns", "index_size", "head_sha", "orig_head_sha", "upstream_sha", "ts",
+]
+# Conteos que además se guardan como series temporales (agente "git:<repo>", métrica "diagnostic.<campo>")
+SERIES_FIELDS = ["ahead", "behind", "staged_count", "unstaged_count", "untracked_count"]
+STATE_FIELDS = ["index_mtime_ns", "index_size", "head_sha", "orig_head_sha", "upstream_sha"]
+LAST_FULL_SQL = f"""
+    SELECT {", ".join(SNAPSHOT_FIELDS)} FROM git_diagnostics
+    WHERE repo = ? AND kind = 'full' ORDER BY id DESC LIMIT 1
+"""
+RANGE_SQL = f"""
+    SELECT {", ".join(SNAPSHOT_FIELDS)} FROM git_diagnostics
+    WHERE repo = ? AND ts >= ? AND ts < ? AND (? OR kind IS NOT 'no-change')
+    ORDER BY ts
+"""
+
+def run_cmd(cmd, cwd=None):
     """Ejecuta un comando de shell y devuelve salida estructurada."""
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
+        result = subprocess.run(cmd, capture_output=True, text=True, shell=True, cwd=cwd)
         return {"output": result.stdout.strip(), "error": result.stderr.strip(), "ok": result.returncode == 0}
     except Exception as e:
         return {"output": "", "error": str(e), "ok": False}
 
 def ensure_sqlite_schema():
-    """Crea tabla SQLite si no existe."""
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS git_diagnostics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            local_branch TEXT,
-            remote_branch TEXT,
-            ahead INTEGER,
-            behind INTEGER,
-            staged_count INTEGER,
-            unstaged_count INTEGER,
-            untracked_count INTEGER,
-            is_tracking INTEGER,
-            is_synced INTEGER
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def count_lines(cmd):
+    """Registra el esquema y devuelve la conexión persistente del hilo (el DDL corre una vez por proceso)."""
+    return get_connection(DB_PATH, GIT_DIAGNOSTICS_SCHEMA)
+
+def count_lines(cmd, cwd=None):
     """Cuenta cantidad de líneas de salida de un comando."""
-    res = run_cmd(cmd)
+    res = run_cmd(cmd, cwd)
     return len(res["output"].splitlines()) if res["ok"] and res["output"] else 0
 
-def generate_diagnostic():
-    """Crea snapshot técnico del estado del repositorio."""
-    branch = run_cmd("git rev-parse --abbrev-ref HEAD")
-    remote = run_cmd("git rev-parse --abbrev-ref --symbolic-full-name @{u}")
-    staged = count_lines("git diff --cached --name-only")
-    unstaged = count_lines("git diff --name-only")
-    untracked = count_lines("git ls-files --others --exclude-standard")
+def generate_diagnostic(cwd=None):
+    """Crea snapshot técnico del estado del repositorio con un único `git status --porcelain=v2`."""
+    try:
+        return take_snapshot(cwd)
+    except Exception as e:
+        print(f"⚠️ Snapshot porcelain v2 no disponible ({e}); usando diagnóstico por comandos.")
+        return generate_diagnostic_legacy(cwd)
+
+def generate_diagnostic_legacy(cwd=None):
+    """Crea snapshot técnico del estado del repositorio (seis invocaciones de git)."""
+    branch = run_cmd("git rev-parse --abbrev-ref HEAD", cwd)
+    remote = run_cmd("git rev-parse --abbrev-ref --symbolic-full-name @{u}", cwd)
+    staged = count_lines("git diff --cached --name-only", cwd)
+    unstaged = count_lines("git diff --name-only", cwd)
+    untracked = count_lines("git ls-files --others --exclude-standard", cwd)
 
     tracking = remote["ok"]
     ahead, behind = 0, 0
     if tracking:
-        sync = run_cmd(f"git rev-list --left-right --count {remote['output']}...{branch['output']}")
+        sync = run_cmd(f"git rev-list --left-right --count {remote['output']}...{branch['output']}", cwd)
         if sync["ok"] and sync["output"]:
             parts = sync["output"].split()
             if len(parts) == 2:
@@ -74,21 +87,51 @@ def generate_diagnostic():
     }
 
 def save_to_sqlite(data):
-    """Guarda diagnóstico estructurado en SQLite."""
-    ensure_sqlite_schema()
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO git_diagnostics (
-            timestamp, local_branch, remote_branch, ahead, behind,
-            staged_count, unstaged_count, untracked_count, is_tracking, is_synced
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        data["timestamp"], data["local_branch"], data["remote_branch"], data["ahead"], data["behind"],
-        data["staged_count"], data["unstaged_count"], data["untracked_count"], data["is_tracking"], data["is_synced"]
-    ))
-    conn.commit()
-    conn.close()
+    """Guarda diagnóstico estructurado en SQLite (con la firma de estado si la hay)
+    y sus conteos como series temporales."""
+    data.setdefault("ts", int(time.time()))
+    conn = ensure_sqlite_schema()
+    with conn:
+        conn.execute(INSERT_GIT_SNAPSHOT_SQL, tuple(data.get(field) for field in SNAPSHOT_FIELDS))
+    agent = series_agent(data.get("repo"))
+    get_store(DB_PATH).record_many(
+        (agent, f"diagnostic.{field}", data[field], data["ts"], data["timestamp"]) for field in SERIES_FIELDS
+    )
+
+def series_agent(repo=None):
+    """Agente de las series de un repo: ``git:<ruta>`` (``git`` si no se conoce el repo)."""
+    return f"git:{repo}" if repo else "git"
+
+def diagnostics_range(start, end=None, repo=None, include_heartbeats=False):
+    """Snapshots de ``repo`` con ``start <= ts < end`` (epoch), usando el índice ``(repo, ts)``."""
+    reader = get_reader(repo)
+    repo = reader.worktree if reader is not None else os.path.abspath(repo or os.getcwd())
+    end = int(end if end is not None else time.time() + 1)
+    rows = ensure_sqlite_schema().execute(RANGE_SQL, (repo, int(start), end, int(include_heartbeats)))
+    return [dict(zip(SNAPSHOT_FIELDS, row)) for row in rows]
+
+def last_full_snapshot(repo):
+    """Último snapshot completo guardado para ``repo`` (o ``None``)."""
+    row = ensure_sqlite_schema().execute(LAST_FULL_SQL, (repo,)).fetchone()
+    return dict(zip(SNAPSHOT_FIELDS, row)) if row else None
+
+def unchanged_heartbeat(reader, max_age=MAX_AGE):
+    """Fila ``no-change`` si la firma del repo coincide con el último snapshot completo y éste
+    no supera ``max_age`` segundos; ``None`` si hace falta un snapshot nuevo.
+
+    Sólo lee archivos de ``.git``: no lanza ningún proceso git.
+    """
+    try:
+        key = reader.state_key()
+    except (GitBackendError, OSError):
+        return None
+    last = last_full_snapshot(reader.worktree)
+    if last is None or any(last[field] != key[field] for field in STATE_FIELDS):
+        return None
+    age = (datetime.utcnow() - datetime.fromisoformat(last["timestamp"])).total_seconds()
+    if max_age is not None and age > max_age:
+        return None
+    return {**last, "timestamp": datetime.utcnow().isoformat(), "ts": int(time.time()), "kind": "no-change"}
 
 def save_to_tinymemory(data):
     """Guarda datos no estructurados (logs, contexto) en TinyMemory."""
@@ -108,14 +151,49 @@ def save_to_tinymemory(data):
         })
 
 
-def run_diagnostic():
-    """Ejecuta diagnóstico completo y guarda en ambas bases."""
+def run_diagnostic(cwd=None, incremental=False, max_age=MAX_AGE):
+    """Ejecuta diagnóstico completo y guarda en ambas bases.
+
+    Con ``incremental=True``, si el index (mtime y tamaño), HEAD, ORIG_HEAD y el
+    upstream no cambiaron desde el último snapshot, no se invoca git: se guarda
+    una fila ``no-change`` con los conteos anteriores. Las ediciones del
+    working tree que aún no pasaron por el index no cambian la firma; por eso
+    ``max_age`` fuerza un snapshot completo cada tanto.
+    """
+    reader = get_reader(cwd)
+    if incremental and reader is not None:
+        heartbeat = unchanged_heartbeat(reader, max_age)
+        if heartbeat is not None:
+            save_to_sqlite(heartbeat)
+            print("💤 Sin cambios desde el último snapshot; heartbeat guardado.")
+            return heartbeat
+
     print(" Ejecutando diagnóstico informativo de Git...")
-    data = generate_diagnostic()
+    data = generate_diagnostic(cwd)
+    data["kind"] = "full"
+    data["repo"] = reader.worktree if reader is not None else os.path.abspath(cwd or os.getcwd())
+    if reader is not None:
+        # La firma se toma después del snapshot: `git status` puede refrescar el index
+        try:
+            data.update(reader.state_key())
+        except (GitBackendError, OSError):
+            pass
     save_to_sqlite(data)
     save_to_tinymemory(data)
     print("✅ Diagnóstico guardado en SQLite y TinyMemory.")
     return data
 
 if __name__ == "__main__":
-    print(json.dumps(run_diagnostic(), indent=2))
+    parser = argparse.ArgumentParser(description="Diagnóstico informativo de Git")
+    parser.add_argument("--repo", help="ruta del repositorio (por defecto, el directorio actual)")
+    parser.add_argument("--incremental", action="store_true", help="reutilizar el último snapshot si nada cambió")
+    parser.add_argument("--max-age", type=float, default=MAX_AGE, help="segundos antes de forzar un snapshot completo")
+    parser.add_argument("--watch", action="store_true", help="vigilar el repo y diagnosticar sólo ante cambios")
+    parser.add_argument("--interval", type=float, default=5.0, help="segundos entre chequeos en --watch")
+    args = parser.parse_args()
+
+    if args.watch:
+        from iopeer.tool.agents.git_agent.git_watch import watch_repo
+        watch_repo(args.repo, interval=args.interval, max_age=args.max_age)
+    else:
+        print(json.dumps(run_diagnostic(args.repo, incremental=args.incremental, max_age=args.max_age), indent=2))
@@ -1,6 +1,7 @@
 import subprocess
 from datetime import datetime
 from iopeer.data.memory.tiny_memory import TinyMemory
+from iopeer.tool.agents.git_agent import git_backend
 
 
 def run_command(cmd):
@@ -13,18 +14,15 @@ def run_command(cmd):
 
 
 def get_branch_info():
-    local = run_command(["git", "rev-parse", "--abbrev-ref", "HEAD"])
-    remote = run_command(["git", "rev-parse", "--symbolic-full-name", "--abbrev-ref", "@{u}"])
-    return local, remote
+    """Rama local y upstream, leídos en proceso (con respaldo por subprocess)."""
+    local, remote = git_backend.branch_info()
+    return local, remote or ""
 
 
 def get_ahead_behind(local, remote):
-    try:
-        result = run_command(["git", "rev-list", "--left-right", "--count", f"{remote}...{local}"])
-        behind, ahead = map(int, result.split())
-        return ahead, behind
-    except Exception:
+    if not remote:
         return 0, 0
+    return git_backend.ahead_behind(local, remote) or (0, 0)
 
 
 def parse_git_status():
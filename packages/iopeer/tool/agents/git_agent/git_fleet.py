@@ -0,0 +1,173 @@
+"""
+git_fleet.py — Git Autopilot sobre una flota de repositorios.
+
+Cada repositorio pasa por diagnóstico, health check y (opcionalmente)
+reparación dentro de un pool acotado de hilos: el trabajo es casi todo espera
+de procesos git, así que los hilos alcanzan y comparten el backend de memoria.
+Los comandos reciben ``cwd`` explícito (nunca se usa ``os.chdir``, que es
+global al proceso). Los resultados se registran desde el hilo principal en un
+único ``SQLiteMemory`` con write-behind, que agrupa las escrituras en lotes.
+
+Uso (desde packages/):
+    python -m iopeer.tool.agents.git_agent.git_fleet ../services/* --workers 8
+    python -m iopeer.tool.agents.git_agent.git_fleet --from-file repos.txt --no-repair
+"""
+
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from iopeer.data.memory.sqlite_memory import SQLiteMemory
+from iopeer.tool.agents.git_agent.git_diagnostic import generate_diagnostic
+from iopeer.tool.agents.git_agent.git_health import check_git_health
+from iopeer.tool.agents.git_agent.git_repair import auto_repair_git
+
+AGENT = "git"
+DEFAULT_WORKERS = int(os.getenv("GIT_FLEET_WORKERS", "8"))
+REPORTS_DIR = Path("reports/status")
+
+
+def run_repo(repo_path: str, repair: bool = True) -> dict:
+    """Diagnóstico, health y reparación de un repositorio, con el tiempo de cada paso."""
+    repo = os.path.abspath(repo_path)
+    result = {"repo": repo, "ok": True, "error": None, "timings": {}}
+    start = time.perf_counter()
+
+    steps = [
+        ("diagnostic", lambda: generate_diagnostic(repo)),
+        ("health", lambda: check_git_health(cwd=repo)),
+    ]
+    if repair:
+        steps.append(("repair", lambda: auto_repair_git(cwd=repo)))
+
+    for name, step in steps:
+        step_start = time.perf_counter()
+        try:
+            result[name] = step()
+        except Exception as e:
+            result.update(ok=False, error=f"{name}: {e}")
+            break
+        finally:
+            result["timings"][name] = round(time.perf_counter() - step_start, 4)
+
+    if "health" in result and not result["health"]["sync"]["ok"]:
+        result["ok"] = False
+        result["error"] = result["health"]["sync"]["output"]
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def record_result(memory, result: dict):
+    """Registra el resultado de un repo en la memoria compartida."""
+    diagnostic = result.get("diagnostic") or {}
+    summary = {
+        "repo": result["repo"],
+        "ok": result["ok"],
+        "error": result["error"],
+        "seconds": result["seconds"],
+        "timings": result["timings"],
+        "diagnostic": diagnostic,
+        "repair_success_rate": result.get("repair"),
+    }
+    memory.save_log(AGENT, "fleet_repo", "success" if result["ok"] else "error", json.dumps(summary))
+    memory.save_metric(AGENT, "fleet_repo_seconds", result["seconds"])
+
+
+def build_report(results, wall_seconds: float, max_workers: int) -> dict:
+    """Reporte consolidado de la flota con resumen de tiempos."""
+    results = sorted(results, key=lambda r: r["repo"])
+    total_seconds = sum(r["seconds"] for r in results)
+    diagnostics = [r["diagnostic"] for r in results if r.get("diagnostic")]
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "summary": {
+            "repos": len(results),
+            "ok": sum(r["ok"] for r in results),
+            "failed": sum(not r["ok"] for r in results),
+            "dirty": sum(1 for d in diagnostics if d["staged_count"] or d["unstaged_count"] or d["untracked_count"]),
+            "out_of_sync": sum(1 for d in diagnostics if not d["is_synced"]),
+            "untracked_branches": sum(1 for d in diagnostics if not d["is_tracking"]),
+            "max_workers": max_workers,
+            "wall_seconds": round(wall_seconds, 3),
+            "sum_repo_seconds": round(total_seconds, 3),
+            "slowest_repo_seconds": max((r["seconds"] for r in results), default=0),
+            "speedup": round(total_seconds / wall_seconds, 2) if wall_seconds else None,
+        },
+        "repos": results,
+    }
+
+
+def run_fleet(repo_paths, max_workers: int = DEFAULT_WORKERS, memory=None, repair: bool = True,
+              report_path=None) -> dict:
+    """Ejecuta el autopilot sobre ``repo_paths`` en paralelo y devuelve el reporte consolidado.
+
+    Si no se pasa ``memory`` se abre un ``SQLiteMemory`` con write-behind y se
+    cierra al terminar. ``report_path=None`` escribe el JSON en ``reports/status``.
+    """
+    repo_paths = list(dict.fromkeys(repo_paths))
+    own_memory = memory is None
+    if own_memory:
+        memory = SQLiteMemory(AGENT, write_behind=True)
+    max_workers = max(1, min(max_workers, len(repo_paths) or 1))
+
+    print(f"🚀 Git fleet: {len(repo_paths)} repositorios con {max_workers} workers...")
+    results = []
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="git-fleet") as pool:
+            futures = {pool.submit(run_repo, path, repair): path for path in repo_paths}
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                record_result(memory, result)
+                icon = "✅" if result["ok"] else "❌"
+                print(f"   {icon} {result['repo']} ({result['seconds']:.2f}s)"
+                      + (f" — {result['error']}" if result["error"] else ""))
+        wall = time.perf_counter() - start
+
+        report = build_report(results, wall, max_workers)
+        summary = report["summary"]
+        memory.save_metric(AGENT, "fleet_wall_seconds", summary["wall_seconds"])
+        memory.save_log(AGENT, "fleet_run", "success" if not summary["failed"] else "error",
+                        json.dumps(summary))
+        memory.flush()
+    finally:
+        if own_memory:
+            memory.close()
+
+    if report_path is None:
+        REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+        report_path = REPORTS_DIR / f"git_fleet_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    Path(report_path).write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+
+    print(f"📊 {summary['ok']}/{summary['repos']} OK | sucios: {summary['dirty']} | "
+          f"desincronizados: {summary['out_of_sync']}")
+    print(f"⏱️ Wall-clock {summary['wall_seconds']:.2f}s vs {summary['sum_repo_seconds']:.2f}s secuencial "
+          f"(x{summary['speedup']}) — reporte en {report_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Git Autopilot en modo flota")
+    parser.add_argument("repos", nargs="*", help="rutas de los repositorios")
+    parser.add_argument("--from-file", help="archivo con una ruta de repositorio por línea")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--no-repair", action="store_true", help="no ejecutar `git fetch --all`")
+    parser.add_argument("--report", help="ruta del reporte JSON")
+    args = parser.parse_args()
+
+    repos = list(args.repos)
+    if args.from_file:
+        with open(args.from_file, "r", encoding="utf-8") as f:
+            repos += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not repos:
+        parser.error("indicá al menos un repositorio")
+    run_fleet(repos, max_workers=args.workers, repair=not args.no_repair, report_path=args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 from iopeer.tool.agents.git_agent.utils_git import run_cmd
+from iopeer.tool.agents.git_agent.git_backend import branch_info, ahead_behind
 
-def check_git_health(memory=None):
+def check_git_health(memory=None, cwd=None):
     """Analiza el estado del repositorio y guarda el resultado en memoria."""
     print("[INFO] Analizando estado del repositorio...")
 
-    branch = run_cmd("git rev-parse --abbrev-ref HEAD")
-    status = run_cmd("git status --short")
-    sync = run_cmd(f"git rev-list --left-right --count origin/{branch['output'].strip()}...{branch['output'].strip()}")
+    # Rama y sincronización se leen en proceso (git_backend); sólo `status` lanza git
+    local, remote = branch_info(cwd)
+    upstream = remote or f"origin/{local}"
+    counts = ahead_behind(local, upstream, cwd)
+
+    branch = {"output": local, "ok": True, "code": 0}
+    status = run_cmd("git status --short", cwd=cwd)
+    if counts is None:
+        sync = {"output": f"No se pudo comparar {local} con {upstream}", "ok": False, "code": 1}
+    else:
+        ahead, behind = counts
+        sync = {"output": f"{behind}\t{ahead}", "ok": True, "code": 0}
 
     result = {
         "branch": branch,
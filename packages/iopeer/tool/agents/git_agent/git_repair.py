@@ -1,6 +1,6 @@
 from iopeer.tool.agents.git_agent.utils_git import git_exec
 
-def auto_repair_git(memory=None):
+def auto_repair_git(memory=None, cwd=None):
     """Ejecuta comandos para reparar errores comunes y guarda métricas."""
     print("[INFO] Iniciando reparación automática de Git...")
     repairs = [
@@ -9,7 +9,7 @@ def auto_repair_git(memory=None):
     success = 0
 
     for cmd in repairs:
-        result = git_exec(cmd, memory)
+        result = git_exec(cmd, memory, cwd)
         if result["ok"]:
             success += 1
 
@@ -0,0 +1,112 @@
+"""
+git_snapshot.py — Snapshot del repositorio con una sola invocación de git.
+
+``git status --porcelain=v2 --branch -z --untracked-files=all`` devuelve en
+una pasada la rama, el upstream, ahead/behind y el estado de cada archivo. La
+salida se parsea en streaming (registro por registro, separados por NUL) y se
+vuelca al mismo esquema que ``git_diagnostics``.
+"""
+
+import subprocess
+from datetime import datetime
+
+STATUS_CMD = ["git", "status", "--porcelain=v2", "--branch", "-z", "--untracked-files=all"]
+READ_SIZE = 64 * 1024
+
+
+def iter_records(stream, read_size: int = READ_SIZE):
+    """Itera los registros separados por NUL de un stream binario, sin leerlo entero."""
+    pending = b""
+    while True:
+        chunk = stream.read(read_size)
+        if not chunk:
+            break
+        pending += chunk
+        *records, pending = pending.split(b"\0")
+        for record in records:
+            yield record.decode("utf-8", "surrogateescape")
+    if pending:
+        yield pending.decode("utf-8", "surrogateescape")
+
+
+def parse_porcelain_v2(records) -> dict:
+    """Acumula rama, upstream, ahead/behind y conteos a partir de los registros."""
+    state = {
+        "branch": None,
+        "oid": None,
+        "upstream": None,
+        "ahead": 0,
+        "behind": 0,
+        "staged_count": 0,
+        "unstaged_count": 0,
+        "untracked_count": 0,
+        "unmerged_count": 0,
+    }
+    skip_next = False
+    for record in records:
+        if skip_next:
+            # En entradas renombradas/copiadas ("2 ...") sigue la ruta original
+            skip_next = False
+            continue
+        if not record:
+            continue
+        kind = record[0]
+        if kind == "#":
+            parts = record.split(" ")
+            header = parts[1]
+            if header == "branch.head":
+                state["branch"] = parts[2]
+            elif header == "branch.oid":
+                state["oid"] = parts[2]
+            elif header == "branch.upstream":
+                state["upstream"] = parts[2]
+            elif header == "branch.ab":
+                state["ahead"] = int(parts[2].lstrip("+"))
+                state["behind"] = abs(int(parts[3]))
+        elif kind in "12":
+            xy = record[2:4]
+            if xy[0] != ".":
+                state["staged_count"] += 1
+            if xy[1] != ".":
+                state["unstaged_count"] += 1
+            skip_next = kind == "2"
+        elif kind == "u":
+            state["unmerged_count"] += 1
+            state["unstaged_count"] += 1
+        elif kind == "?":
+            state["untracked_count"] += 1
+    return state
+
+
+def to_diagnostic(state: dict) -> dict:
+    """Convierte el estado parseado al esquema de ``git_diagnostics``."""
+    tracking = state["upstream"] is not None
+    branch = state["branch"] or "HEAD"
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "local_branch": "HEAD" if branch == "(detached)" else branch,
+        "remote_branch": state["upstream"],
+        "ahead": state["ahead"],
+        "behind": state["behind"],
+        "staged_count": state["staged_count"],
+        "unstaged_count": state["unstaged_count"],
+        "untracked_count": state["untracked_count"],
+        "is_tracking": int(tracking),
+        "is_synced": int(state["ahead"] == 0 and state["behind"] == 0),
+    }
+
+
+def take_snapshot(cwd=None) -> dict:
+    """Snapshot en el esquema de ``git_diagnostics`` con un único proceso git.
+
+    Lanza ``RuntimeError`` si git falla (por ejemplo, fuera de un repositorio
+    o con un git sin soporte para ``--porcelain=v2``).
+    """
+    proc = subprocess.Popen(STATUS_CMD, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    state = parse_porcelain_v2(iter_records(proc.stdout))
+    stderr = proc.stderr.read().decode("utf-8", "replace").strip()
+    proc.stdout.close()
+    proc.stderr.close()
+    if proc.wait() != 0:
+        raise RuntimeError(stderr or f"git status terminó con código {proc.returncode}")
+    return to_diagnostic(state)
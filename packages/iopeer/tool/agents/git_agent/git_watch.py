@@ -0,0 +1,78 @@
+"""
+git_watch.py — Diagnóstico de Git disparado por cambios en el repositorio.
+
+Con ``inotify_simple`` instalado (Linux) se vigilan ``.git`` (index, HEAD,
+ORIG_HEAD), ``packed-refs`` y los directorios de refs, y sólo se diagnostica
+cuando llega un evento o vence ``max_age``. Sin inotify se hace polling cada
+``interval`` segundos con el modo incremental, que sólo lee archivos de
+``.git`` mientras nada cambie.
+"""
+
+import os
+import time
+
+from iopeer.tool.agents.git_agent.git_backend import get_reader
+from iopeer.tool.agents.git_agent.git_diagnostic import run_diagnostic, MAX_AGE
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+WATCHED_FILES = {"index", "HEAD", "ORIG_HEAD", "FETCH_HEAD", "packed-refs"}
+WATCH_MASK = None if INotify is None else flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE
+
+
+def _add_watches(inotify, reader):
+    """Vigila ``.git`` y cada directorio bajo ``refs/``; devuelve los descriptores de refs."""
+    for path in {reader.git_dir, reader.common_dir}:
+        inotify.add_watch(path, WATCH_MASK)
+    refs_wds = set()
+    for root, _, _ in os.walk(os.path.join(reader.common_dir, "refs")):
+        refs_wds.add(inotify.add_watch(root, WATCH_MASK))
+    return refs_wds
+
+
+def _is_relevant(event, refs_wds):
+    if event.name.endswith(".lock"):
+        return False
+    return event.wd in refs_wds or event.name in WATCHED_FILES
+
+
+def watch_repo(cwd=None, interval: float = 5.0, max_age: float = MAX_AGE, debounce: float = 0.5,
+               iterations: int = None, on_snapshot=None):
+    """Bucle de vigilancia; ``iterations`` limita las vueltas (``None`` = sin fin)."""
+    reader = get_reader(cwd)
+    if reader is None:
+        raise RuntimeError(f"No es un repositorio git legible: {cwd or os.getcwd()}")
+
+    inotify = None
+    refs_wds = set()
+    if INotify is not None:
+        inotify = INotify()
+        refs_wds = _add_watches(inotify, reader)
+        print(f"👀 Vigilando {reader.worktree} con inotify...")
+    else:
+        print(f"👀 Vigilando {reader.worktree} por polling cada {interval:.1f}s (inotify_simple no disponible)...")
+
+    last_full = None
+    count = 0
+    while iterations is None or count < iterations:
+        count += 1
+        if inotify is not None:
+            events = inotify.read(timeout=int(interval * 1000), read_delay=int(debounce * 1000))
+            changed = any(_is_relevant(e, refs_wds) for e in events)
+            if any(e.mask & flags.ISDIR for e in events):
+                # Ramas con "/" crean subdirectorios nuevos en refs/
+                refs_wds = _add_watches(inotify, reader)
+            stale = last_full is None or time.monotonic() - last_full >= max_age
+            if not changed and not stale:
+                continue
+        elif count > 1:
+            time.sleep(interval)
+
+        data = run_diagnostic(cwd, incremental=True, max_age=max_age)
+        if data["kind"] == "full":
+            last_full = time.monotonic()
+        if on_snapshot is not None:
+            on_snapshot(data)
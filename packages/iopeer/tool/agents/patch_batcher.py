@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+patch_batcher.py — Un pedido de patch por grupo de errores, no por error.
+
+Un build roto suele traer decenas de errores TS independientes repartidos en
+varios archivos. En vez de una llamada al LLM por log/error:
+
+- los errores se extraen con ``log_fingerprint`` y se agrupan por archivo
+  (``by="file"``) o por carpeta/módulo (``by="module"``); un import que no
+  resuelve desde una carpeta (``in '<dir>'`` de webpack) se agrupa por esa
+  carpeta y los demás sin archivo (dependencias, env) por tipo. Un archivo
+  nunca se parte entre llamadas, así cada diff por archivo sale de una sola
+  respuesta
+- cada grupo pide UN diff unificado multi-archivo con todas sus firmas, el
+  fragmento del log que las menciona y el código fuente alrededor de cada línea
+- la respuesta se parte en un diff por archivo y cada uno se valida por
+  separado: que sea un archivo (o esté en una carpeta) del grupo y que aplique
+  en memoria con
+  ``diff_engine.dry_run`` (sin tocar disco)
+
+Las llamadas por grupo corren en paralelo; pasan de O(errores) a O(grupos).
+"""
+
+import os
+import re
+import posixpath
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from iopeer.data.llm_cache import cached_response_text, invalidate_response
+from iopeer.utils.diff_engine import BufferCache, dry_run, resolve_path
+from iopeer.utils.log_fingerprint import clean_text, normalize_paths, extract_signatures, format_signature
+from iopeer.utils.prompt_builder import build_prompt, model_budget, truncate_to_tokens, DEFAULT_CONTEXT
+
+MODEL = os.getenv("PATCH_BATCH_MODEL", "gpt-4o")
+MAX_ERRORS = int(os.getenv("PATCH_BATCH_MAX_ERRORS", "15"))
+BATCH_WORKERS = int(os.getenv("PATCH_BATCH_WORKERS", "4"))
+TEMPERATURE = 0.1
+SNIPPET_CONTEXT = 6
+NO_PATCH = "NO_PATCH"
+DEFAULT_ROLE = "You are a NestJS or TypeScript auto-repair assistant."
+
+FENCE_RE = re.compile(r"^```[\w-]*\s*$", re.MULTILINE)
+GIT_HEADER_RE = re.compile(r"^diff --git a/(?P<a>\S+) b/(?P<b>\S+)")
+NEW_FILE_RE = re.compile(r"^\+\+\+ (?:b/)?(?P<path>\S+)")
+OLD_FILE_RE = re.compile(r"^--- (?:a/)?(?P<path>\S+)")
+DIFF_LINE_PREFIXES = (" ", "+", "-", "@@", "\\", "diff ", "index ", "new file", "deleted file")
+
+
+def _clean_path(path: str) -> str:
+    path = path.replace("\\", "/")
+    return path[2:] if path.startswith("./") else path
+
+
+def group_key(sig: dict, by: str = "file") -> str:
+    if sig.get("file"):
+        path = _clean_path(sig["file"])
+        return path if by == "file" else posixpath.dirname(path) or "."
+    if sig.get("dir"):
+        return _clean_path(sig["dir"])
+    if sig["kind"] == "module_not_found":
+        return "dependencias"
+    return sig["kind"]
+
+
+def group_signatures(signatures, by: str = "file", max_errors: int = MAX_ERRORS):
+    """Grupos ``{"key", "files", "dirs", "signatures"}``.
+
+    Un archivo nunca se reparte entre grupos: su diff tiene que salir de una
+    sola llamada. Con ``by="module"`` los archivos de una carpeta se juntan
+    hasta ``max_errors`` firmas; un archivo con más errores va solo, completo.
+    """
+    grouped = {}
+    for sig in signatures:
+        path = _clean_path(sig["file"]) if sig.get("file") else None
+        grouped.setdefault(group_key(sig, by), {}).setdefault(path, []).append(sig)
+    groups = []
+    for key, by_file in grouped.items():
+        chunks = [[]]
+        for sigs in by_file.values():
+            if chunks[-1] and len(chunks[-1]) + len(sigs) > max_errors:
+                chunks.append([])
+            chunks[-1].extend(sigs)
+        for chunk in chunks:
+            files = list(dict.fromkeys(_clean_path(s["file"]) for s in chunk if s.get("file")))
+            dirs = list(dict.fromkeys(_clean_path(s["dir"]) for s in chunk if s.get("dir")))
+            groups.append({"key": key, "files": files, "dirs": dirs, "signatures": chunk})
+    return groups
+
+
+def _same_file(a: str, b: str) -> bool:
+    """Misma ruta o una es sufijo de la otra (``src/main.ts`` vs ``apps/api/src/main.ts``)."""
+    a, b = _clean_path(a), _clean_path(b)
+    return a == b or a.endswith("/" + b) or b.endswith("/" + a)
+
+
+def _in_dir(path: str, directory: str) -> bool:
+    """``path`` está dentro de ``directory`` (también si ``directory`` es un sufijo de la ruta real)."""
+    path, directory = _clean_path(path), _clean_path(directory).rstrip("/")
+    return f"/{directory}/" in f"/{path}"
+
+
+def group_log(log_text: str, group: dict, context: int = DEFAULT_CONTEXT) -> str:
+    """Sólo las líneas del log que mencionan los archivos o mensajes del grupo, con contexto."""
+    # Con archivos, basta con sus rutas (el mismo mensaje puede repetirse en otros archivos)
+    needles = set(group["files"]) | set(group.get("dirs", ()))
+    if not needles:
+        needles.update(s["message"] for s in group["signatures"] if s.get("message"))
+        needles.update(s["module"] for s in group["signatures"] if s.get("module"))
+    lines = clean_text(log_text).splitlines()
+    keep = set()
+    for i, line in enumerate(lines):
+        line = normalize_paths(line)
+        if any(needle in line for needle in needles):
+            keep.update(range(max(0, i - context), min(len(lines), i + context + 1)))
+    return "\n".join(lines[i] for i in sorted(keep))
+
+
+def source_snippets(group: dict, cwd=".", context: int = SNIPPET_CONTEXT) -> str:
+    """Código actual alrededor de cada línea con error, numerado, para que el diff tenga contexto real."""
+    parts = []
+    for path in group["files"]:
+        source = resolve_path(cwd, path)
+        if source is None:
+            continue
+        rows = [int(line) for s in group["signatures"] if s.get("file") and _same_file(s["file"], path)
+                for line, _ in (s.get("locations") or ([(s["line"], s["col"])] if s.get("line") else []))]
+        if not rows:
+            continue
+        lines = source.read_text(encoding="utf-8", errors="replace").splitlines()
+        ranges = []
+        for row in sorted(rows):
+            start, end = max(1, row - context), min(len(lines), row + context)
+            if ranges and start <= ranges[-1][1] + 1:
+                ranges[-1][1] = max(ranges[-1][1], end)
+            else:
+                ranges.append([start, end])
+        for start, end in ranges:
+            body = "\n".join(f"{n:>5} | {lines[n - 1]}" for n in range(start, end + 1))
+            parts.append(f"### {path} (líneas {start}-{end})\n{body}")
+    return "\n".join(parts)
+
+
+def group_prompt(group: dict, log_text: str, cwd=".", model: str = MODEL, role: str = DEFAULT_ROLE) -> str:
+    errors = "\n".join(f"- {format_signature(s)}" for s in group["signatures"])
+    files = ", ".join(group["files"] + [f"files under {d}/" for d in group.get("dirs", ())]) \
+        or "the files that need it"
+    instructions = f"""{role}
+Fix ALL of the following {len(group["signatures"])} errors with a single unified diff (git format).
+Use one "diff --git a/<path> b/<path>" section per file and only modify: {files}.
+If no code change is needed, return "{NO_PATCH}". Do not add explanations.
+
+Errors:
+{errors}
+"""
+    snippets = source_snippets(group, cwd)
+    if snippets:
+        # El código ocupa a lo sumo un tercio del presupuesto; el resto, instrucciones y log
+        instructions += f"\nCurrent source (line numbers are not part of the code):\n" \
+                        f"{truncate_to_tokens(snippets, model_budget(model) // 3, model, keep='head')}\n"
+    return build_prompt(instructions, group_log(log_text, group), model=model)
+
+
+def _section_path(lines):
+    for line in lines:
+        for regex in (NEW_FILE_RE, GIT_HEADER_RE, OLD_FILE_RE):
+            m = regex.match(line)
+            if m:
+                path = m.groupdict().get("path") or m["b"]
+                if path != "/dev/null":
+                    return _clean_path(path)
+    return None
+
+
+def split_diff(text: str) -> dict:
+    """``{archivo: diff}`` a partir de una respuesta con uno o varios archivos (con o sin ``diff --git``)."""
+    lines = FENCE_RE.sub("", text or "").splitlines()
+    starts = [i for i, line in enumerate(lines) if line.startswith("diff --git ")]
+    if not starts:
+        starts = [i for i in range(len(lines) - 1)
+                  if lines[i].startswith("--- ") and lines[i + 1].startswith("+++ ")]
+    sections = {}
+    for start, end in zip(starts, starts[1:] + [len(lines)]):
+        chunk = lines[start:end]
+        path = _section_path(chunk)
+        if path is None:
+            continue
+        # Texto suelto del modelo después del último hunk
+        while chunk and (not chunk[-1].strip() or not chunk[-1].startswith(DIFF_LINE_PREFIXES)):
+            chunk.pop()
+        if not chunk[0].startswith("diff --git "):
+            chunk.insert(0, f"diff --git a/{path} b/{path}")
+        sections[path] = sections.get(path, "") + "\n".join(chunk) + "\n"
+    return sections
+
+
+def validate_file_diff(path: str, diff: str, allowed=(), cwd=".", buffers: BufferCache = None,
+                       dirs=()) -> tuple:
+    """``(ok, motivo)``: el diff toca un archivo (o algo dentro de una carpeta) del grupo y aplica
+    en memoria sobre el árbol. Sin ``allowed`` ni ``dirs`` vale cualquier archivo."""
+    if (allowed or dirs) and not (any(_same_file(path, f) for f in allowed) or any(_in_dir(path, d) for d in dirs)):
+        return False, "archivo fuera del grupo"
+    result = dry_run(diff, cwd, buffers=buffers)
+    return (True, "ok") if result["ok"] else (False, result["error"])
+
+
+def request_group_patch(group: dict, log_text: str, client, model: str = MODEL, role: str = DEFAULT_ROLE,
+                        cwd=".", buffers: BufferCache = None) -> dict:
+    """Una llamada al LLM para el grupo; diffs por archivo separados en válidos y rechazados."""
+    prompt = group_prompt(group, log_text, cwd, model, role)
+    text = cached_response_text(client, model, prompt, temperature=TEMPERATURE)
+    result = {"key": group["key"], "errors": len(group["signatures"]), "files": {}, "rejected": {},
+              "no_patch": False}
+    sections = split_diff(text)
+    if not sections:
+        result["no_patch"] = NO_PATCH in text
+        if not result["no_patch"]:
+            result["rejected"][group["key"]] = "respuesta sin diff"
+    for path, diff in sections.items():
+        ok, reason = validate_file_diff(path, diff, group["files"], cwd, buffers, group.get("dirs", ()))
+        if ok:
+            result["files"][path] = diff
+        else:
+            result["rejected"][path] = reason
+    if not result["files"]:
+        # Sin ningún diff válido (o NO_PATCH): no reutilizar la respuesta la próxima vez que se repita el grupo
+        invalidate_response(model, TEMPERATURE, prompt)
+    return result
+
+
+def batch_patch(log_text: str, client, model: str = MODEL, role: str = DEFAULT_ROLE, cwd=".", by: str = "file",
+                max_errors: int = MAX_ERRORS, max_workers: int = BATCH_WORKERS, out_path=None, log=print) -> dict:
+    """Pide un diff por grupo de errores en paralelo y junta los diffs por archivo que validan.
+
+    Devuelve ``{errors, groups, calls, files, rejected, no_patch, failed, patch, patch_path}``;
+    ``patch`` es el diff combinado (se guarda en ``out_path`` si se indica y hay algo válido).
+    """
+    signatures = extract_signatures(log_text)
+    groups = group_signatures(signatures, by, max_errors)
+    summary = {"errors": len(signatures), "groups": len(groups), "calls": 0, "files": {}, "rejected": {},
+               "no_patch": [], "failed": {}, "patch": "", "patch_path": None}
+    if not groups:
+        return summary
+
+    log(f"📦 {len(signatures)} errores en {len(groups)} grupos (por {by})")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(groups)))) as pool:
+        # Los dry-runs de todos los grupos comparten los archivos ya leídos
+        buffers = BufferCache()
+        futures = {pool.submit(request_group_patch, group, log_text, client, model, role, cwd, buffers): group
+                   for group in groups}
+        for future in as_completed(futures):
+            key = futures[future]["key"]
+            summary["calls"] += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                summary["failed"][key] = str(e)
+                log(f"💥 Grupo {key}: {e}")
+                continue
+            for path, diff in result["files"].items():
+                # Un grupo sin archivos (carpetas, dependencias, env) puede tocar un archivo de otro grupo
+                if path in summary["files"]:
+                    result["rejected"][path] = "archivo ya parcheado por otro grupo"
+                else:
+                    summary["files"][path] = diff
+            summary["rejected"].update(result["rejected"])
+            if result["no_patch"]:
+                summary["no_patch"].append(key)
+            for path, reason in result["rejected"].items():
+                log(f"⚠️ Diff de {path} descartado: {reason}")
+
+    # Orden estable: el mismo log produce el mismo patch combinado
+    summary["patch"] = "".join(summary["files"][path] for path in sorted(summary["files"]))
+    if out_path and summary["patch"]:
+        out_path = Path(out_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(summary["patch"], encoding="utf-8")
+        summary["patch_path"] = str(out_path)
+    log(f"✅ {len(summary['files'])} archivos con diff válido, {len(summary['rejected'])} descartados, "
+        f"{summary['calls']} llamadas")
+    return summary
+
@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 """
-apply_patch.py — Aplica un diff quirúrgico a un archivo específico
-sin depender de git apply.
+apply_patch.py — Aplica un diff a un archivo específico (o a los archivos
+que nombra el diff) sin depender de git apply.
+
+Los hunks se aplican con ``diff_engine``: respetando los encabezados ``@@``,
+con búsqueda por offset y fuzz, y escribiendo de forma atómica.
+
+Uso:
+    python apply_patch.py [patch] [--target archivo] [--check]
 """
 
+import argparse
 from pathlib import Path
-import re
+from iopeer.utils.diff_engine import PatchError, parse_patch, apply_patch_set
 
 # === CONFIG ===
 PATCH_PATH = Path("reports/logs/dependency_fix_20251013_020439.patch")
@@ -13,47 +20,42 @@ PROJECT_ROOT = Path(__file__).resolve().parents[3]
 TARGET_FILE = PROJECT_ROOT / "apps" / "api" / "src" / "agents" / "agents.module.ts"
 
 # === Lógica ===
-def apply_patch(patch_path: Path, target_file: Path):
-    patch_text = patch_path.read_text(encoding="utf-8")
-    new_lines = []
-
-    # Extraer solo líneas con contenido
-    for line in patch_text.splitlines():
-        if line.startswith("+++ ") or line.startswith("--- "):
-            continue
-        elif line.startswith("+"):
-            new_lines.append(line[1:])
-        elif not line.startswith("-") and not line.startswith("diff"):
-            new_lines.append(line)
-
-    # Cargar el archivo original
-    original_lines = target_file.read_text(encoding="utf-8").splitlines()
-
-    # Aplicar reemplazo simple por patrón contextual
-    result = []
-    inserted_import = False
-    inserted_provider = False
-
-    for line in original_lines:
-        # Insertar import justo después de los imports
-        if not inserted_import and re.match(r"import .*AgentRunnerService.*;", line):
-            result.append(line)
-            result.append("import { AgentUploadService } from './agent-upload.service';")
-            inserted_import = True
+def apply_patch(patch_path: Path, target_file: Path = None, root: Path = PROJECT_ROOT, check: bool = False):
+    """Aplica ``patch_path``; con ``target_file`` todos los hunks van a ese archivo."""
+    patch_text = Path(patch_path).read_text(encoding="utf-8")
+    try:
+        file_patches = parse_patch(patch_text)
+    except PatchError as e:
+        print(f"❌ Patch inválido: {e}")
+        return False
+
+    if target_file is not None:
+        # Modo archivo único: se ignoran las rutas del diff
+        target_file = Path(target_file).resolve()
+        root = target_file.parent
+        for file_patch in file_patches:
+            file_patch.old_path = file_patch.new_path = target_file.name
+
+    result = apply_patch_set(file_patches, root, dry=check)
+    for path, entry in result["files"].items():
+        if not entry["ok"]:
+            print(f"❌ {path}: {entry['error']}")
             continue
-
-        # Insertar provider dentro del bloque providers:
-        if not inserted_provider and re.match(r"\s*AgentRunnerService,", line):
-            result.append(line)
-            result.append("    AgentUploadService,")
-            inserted_provider = True
-            continue
-
-        result.append(line)
-
-    # Guardar el archivo modificado
-    target_file.write_text("\n".join(result) + "\n", encoding="utf-8")
-    print(f"✅ Patch aplicado correctamente en {target_file}")
+        moved = [f"hunk {h['hunk']} offset {h['offset']:+d}" + (f" fuzz {h['fuzz']}" if h["fuzz"] else "")
+                 for h in entry["hunks"] if h["offset"] or h["fuzz"]]
+        print(f"{'🔎' if check else '✅'} {path}" + (f" ({', '.join(moved)})" if moved else ""))
+    if result["ok"]:
+        print("✅ El patch aplica correctamente" if check else "✅ Patch aplicado correctamente")
+    elif not result["files"]:
+        print(f"❌ {result['error']}")
+    return result["ok"]
 
 if __name__ == "__main__":
-    apply_patch(PATCH_PATH, TARGET_FILE)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("patch", nargs="?", type=Path, default=PATCH_PATH)
+    parser.add_argument("--target", type=Path, default=None, help="aplica todos los hunks a este archivo")
+    parser.add_argument("--root", type=Path, default=PROJECT_ROOT)
+    parser.add_argument("--check", action="store_true", help="sólo valida, sin escribir")
+    args = parser.parse_args()
+    target = args.target if args.target or args.patch != PATCH_PATH else TARGET_FILE
+    raise SystemExit(0 if apply_patch(args.patch, target, args.root, args.check) else 1)
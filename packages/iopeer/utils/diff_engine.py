@@ -0,0 +1,420 @@
+"""
+diff_engine.py — Parser y aplicador de diffs unificados en proceso.
+
+Reemplaza a ``git apply`` (un proceso por patch) y a las heurísticas de
+``apply_patch.py``:
+
+- ``parse_patch`` lee diffs de git o ``diff -u`` (con o sin ``diff --git``,
+  bloques ```diff, archivos nuevos/borrados, ``\\ No newline``); las cuentas
+  de los encabezados ``@@`` se toleran mal hechas, como las que escribe un LLM
+- cada hunk se busca primero en su línea (corrida por los hunks anteriores) y
+  después en offsets crecientes hacia ambos lados; si no aparece, se prueba con
+  ``fuzz`` líneas de contexto menos en los bordes, como ``patch``
+- todo ocurre sobre buffers en memoria: ``dry_run`` valida un patch sin tocar
+  disco y ``dry_run_many`` valida muchos candidatos en paralelo leyendo cada
+  archivo una sola vez
+- ``apply_patch_set`` escribe todos los archivos o ninguno: primero temporales
+  en la misma carpeta y después ``os.replace``; si un rename falla se restauran
+  los que ya se habían reemplazado
+"""
+
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_FUZZ = 2
+DIFF_WORKERS = int(os.getenv("DIFF_ENGINE_WORKERS", "4"))
+DEV_NULL = "/dev/null"
+
+FENCE_RE = re.compile(r"^```[\w-]*\s*$")
+GIT_HEADER_RE = re.compile(r"^diff --git a/(?P<a>\S+) b/(?P<b>\S+)")
+OLD_FILE_RE = re.compile(r"^--- (?P<path>\S+)")
+NEW_FILE_RE = re.compile(r"^\+\+\+ (?P<path>\S+)")
+HUNK_RE = re.compile(r"^@@ -(?P<old>\d+)(?:,(?P<old_len>\d+))? \+(?P<new>\d+)(?:,(?P<new_len>\d+))? @@")
+
+
+class PatchError(Exception):
+    """El patch no se puede parsear o no aplica sobre el árbol."""
+
+
+class Hunk:
+    """Un bloque ``@@``: líneas ``(tag, texto)`` con tag ``' '``, ``'-'`` o ``'+'``."""
+
+    def __init__(self, old_start: int, new_start: int, lines, header: str = ""):
+        self.old_start = old_start
+        self.new_start = new_start
+        self.lines = lines
+        self.header = header
+
+    @property
+    def old(self):
+        return [text for tag, text in self.lines if tag != "+"]
+
+    @property
+    def new(self):
+        return [text for tag, text in self.lines if tag != "-"]
+
+    def trimmed(self, fuzz: int):
+        """Copia sin hasta ``fuzz`` líneas de contexto en cada borde."""
+        lines = list(self.lines)
+        head = 0
+        while head < fuzz and lines and lines[0][0] == " ":
+            lines.pop(0)
+            head += 1
+        tail = 0
+        while tail < fuzz and lines and lines[-1][0] == " ":
+            lines.pop()
+            tail += 1
+        return Hunk(self.old_start + head, self.new_start + head, lines, self.header)
+
+
+class FilePatch:
+    """Cambios de un archivo: rutas vieja/nueva y sus hunks."""
+
+    def __init__(self, old_path, new_path, hunks=None, new_eof_newline: bool = True):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.hunks = hunks or []
+        self.new_eof_newline = new_eof_newline
+
+    @property
+    def is_new(self) -> bool:
+        return self.old_path is None
+
+    @property
+    def is_deleted(self) -> bool:
+        return self.new_path is None
+
+    @property
+    def path(self) -> str:
+        return self.old_path if self.is_deleted else self.new_path
+
+
+def _strip_prefix(path: str):
+    if path == DEV_NULL:
+        return None
+    path = path.split("\t")[0]
+    if path[:2] in ("a/", "b/"):
+        path = path[2:]
+    return path[2:] if path.startswith("./") else path
+
+
+def _is_header(lines, i) -> bool:
+    return (lines[i].startswith("diff --git ")
+            or (lines[i].startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")))
+
+
+def _parse_hunk(lines, i, match):
+    """Cuerpo del hunk desde ``i``; las cuentas del encabezado no se usan para cortar."""
+    body = []
+    eof_newline = True
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith("@@") or _is_header(lines, i):
+            break
+        if line.startswith("\\"):
+            # "\ No newline at end of file" se refiere a la línea anterior
+            if body and body[-1][0] != "-":
+                eof_newline = False
+            i += 1
+            continue
+        if line and line[0] in " +-":
+            body.append((line[0], line[1:]))
+        elif not line:
+            body.append((" ", ""))
+        else:
+            break
+        i += 1
+    # Líneas en blanco sueltas al final son separación, no contexto
+    while body and body[-1] == (" ", ""):
+        body.pop()
+    hunk = Hunk(int(match["old"]), int(match["new"]), body, match.group(0))
+    return hunk, i, eof_newline
+
+
+def parse_patch(text: str):
+    """Lista de ``FilePatch``; ``PatchError`` si no hay ningún archivo con hunks."""
+    lines = [line.rstrip("\r") for line in (text or "").splitlines() if not FENCE_RE.match(line)]
+    patches = []
+    current = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        git = GIT_HEADER_RE.match(line)
+        if git:
+            current = FilePatch(_strip_prefix("a/" + git["a"]), _strip_prefix("b/" + git["b"]))
+            patches.append(current)
+            i += 1
+            continue
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old = _strip_prefix(OLD_FILE_RE.match(line)["path"])
+            new = _strip_prefix(NEW_FILE_RE.match(lines[i + 1])["path"])
+            if current is None or current.hunks:
+                current = FilePatch(old, new)
+                patches.append(current)
+            else:
+                current.old_path, current.new_path = old, new
+            i += 2
+            continue
+        if current is not None and line.startswith("new file mode"):
+            current.old_path = None
+        elif current is not None and line.startswith("deleted file mode"):
+            current.new_path = None
+        match = HUNK_RE.match(line)
+        if match and current is not None:
+            hunk, i, eof_newline = _parse_hunk(lines, i + 1, match)
+            current.hunks.append(hunk)
+            current.new_eof_newline = current.new_eof_newline and eof_newline
+            continue
+        i += 1
+    patches = [p for p in patches if p.hunks or p.is_deleted]
+    if not patches:
+        raise PatchError("el texto no contiene ningún hunk")
+    return patches
+
+
+def _normalize(line: str) -> str:
+    return line.rstrip()
+
+
+def _matches(source, start: int, block) -> bool:
+    if start < 0 or start + len(block) > len(source):
+        return False
+    return all(_normalize(source[start + k]) == block[k] for k in range(len(block)))
+
+
+def find_block(source, block, expected: int, lower: int = 0, max_offset: int = None):
+    """Posición de ``block`` más cercana a ``expected`` (sin bajar de ``lower``); ``None`` si no está."""
+    block = [_normalize(line) for line in block]
+    limit = len(source) - len(block)
+    if limit < lower:
+        return None
+    expected = min(max(expected, lower), limit)
+    max_offset = max(expected - lower, limit - expected) if max_offset is None else max_offset
+    for offset in range(max_offset + 1):
+        for start in (expected - offset, expected + offset) if offset else (expected,):
+            if lower <= start <= limit and _matches(source, start, block):
+                return start
+    return None
+
+
+def apply_hunks(source, hunks, fuzz: int = DEFAULT_FUZZ, max_offset: int = None):
+    """``(líneas_nuevas, reporte)`` aplicando los hunks en orden; ``PatchError`` si alguno no aplica."""
+    result = list(source)
+    report = []
+    delta = 0  # líneas agregadas menos quitadas por los hunks anteriores
+    shift = 0  # delta más el offset en que se encontró el hunk anterior (como ``patch``)
+    lower = 0
+    for n, hunk in enumerate(hunks, 1):
+        for level in range(fuzz + 1):
+            candidate = hunk.trimmed(level) if level else hunk
+            old = candidate.old
+            if level and not old:
+                # Sin contexto el hunk quedaría insertado a ciegas por número de línea
+                start = None
+                break
+            if level == 1 and hunk.new and find_block(result, hunk.new, hunk.old_start - 1 + shift, lower,
+                                                       max_offset) is not None:
+                # No aplica tal cual pero su resultado ya está: reaplicarlo con fuzz duplicaría cambios
+                raise PatchError(f"hunk {n} ({hunk.header}) ya estaba aplicado")
+            if not old:
+                # Inserción pura: "-N,0" inserta después de la línea N
+                start = min(max(candidate.old_start + shift, lower), len(result))
+            else:
+                start = find_block(result, old, candidate.old_start - 1 + shift, lower, max_offset)
+            if start is not None:
+                break
+        if start is None:
+            raise PatchError(f"hunk {n} ({hunk.header}) no aplica: contexto no encontrado")
+        new = candidate.new
+        result[start:start + len(old)] = new
+        header_line = candidate.old_start - (1 if old else 0) + delta
+        report.append({"hunk": n, "line": start + 1, "offset": start - header_line, "fuzz": level})
+        delta += len(new) - len(old)
+        shift = start + len(new) - (candidate.old_start - (1 if old else 0) + len(old))
+        lower = start + len(new)
+    return result, report
+
+
+def _split(text: str):
+    """``(líneas, fin_de_línea, termina_con_newline)``."""
+    eol = "\r\n" if "\r\n" in text else "\n"
+    text = text.replace("\r\n", "\n")
+    final_newline = text.endswith("\n")
+    lines = text.split("\n")
+    if final_newline:
+        lines.pop()
+    return lines, eol, final_newline
+
+
+def _apply_split(split, file_patch: FilePatch, fuzz: int, max_offset: int):
+    """Como ``apply_file_patch`` sobre un archivo ya partido por ``_split`` (``None`` si no existe)."""
+    if file_patch.is_deleted:
+        return None, []
+    if split is None and not file_patch.is_new:
+        raise PatchError(f"{file_patch.path}: el archivo no existe")
+    lines, eol, had_newline = split or ([], "\n", True)
+    new_lines, report = apply_hunks(lines, file_patch.hunks, fuzz, max_offset)
+    final_newline = file_patch.new_eof_newline if file_patch.hunks else had_newline
+    if not new_lines:
+        return "", report
+    return eol.join(new_lines) + (eol if final_newline else ""), report
+
+
+def apply_file_patch(text, file_patch: FilePatch, fuzz: int = DEFAULT_FUZZ, max_offset: int = None):
+    """``(texto_nuevo, reporte)`` para un archivo; ``texto_nuevo`` es ``None`` si se borra."""
+    return _apply_split(_split(text) if text else (None if text is None else ([], "\n", True)),
+                        file_patch, fuzz, max_offset)
+
+
+def resolve_path(root, path: str):
+    """Archivo del árbol para una ruta del patch o del log (relativa al repo o a una app de ``apps/``)."""
+    root = Path(root)
+    path = _strip_prefix(path.replace("\\", "/")) or ""
+    candidate = root / path
+    if candidate.is_file():
+        return candidate
+    return next((p for p in root.glob(f"apps/*/{path}") if p.is_file()), None)
+
+
+def _target(root: Path, file_patch: FilePatch, buffers) -> Path:
+    """Ruta en disco del archivo del patch; rechaza rutas fuera de ``root``."""
+    path = file_patch.path
+    if Path(path).is_absolute() or ".." in Path(path).parts:
+        raise PatchError(f"{path}: ruta fuera del repositorio")
+    found = None if file_patch.is_new else buffers.resolve(root, path)
+    return found or root / path
+
+
+class BufferCache:
+    """Archivos leídos (y partidos en líneas) una vez y compartidos entre dry-runs."""
+
+    def __init__(self):
+        self._splits = {}
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, root: Path, path: str):
+        key = (str(root), path)
+        with self._lock:
+            if key in self._paths:
+                return self._paths[key]
+        found = resolve_path(root, path)
+        with self._lock:
+            return self._paths.setdefault(key, found)
+
+    def split(self, path: Path):
+        """``(líneas, fin_de_línea, termina_con_newline)`` del archivo; ``None`` si no existe."""
+        key = str(path)
+        with self._lock:
+            if key in self._splits:
+                return self._splits[key]
+        try:
+            # newline="" conserva los \r\n originales
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+            split = _split(text) if text else ([], "\n", True)
+        except FileNotFoundError:
+            split = None
+        with self._lock:
+            return self._splits.setdefault(key, split)
+
+
+def dry_run(patch, root=".", fuzz: int = DEFAULT_FUZZ, max_offset: int = None, buffers: BufferCache = None) -> dict:
+    """Aplica ``patch`` (texto o lista de ``FilePatch``) en memoria.
+
+    Devuelve ``{ok, error, files: {ruta: {ok, error, hunks}}, results: {Path: texto|None}}``
+    sin escribir nada; ``results`` es lo que ``commit`` escribiría.
+    """
+    root = Path(root)
+    buffers = buffers or BufferCache()
+    summary = {"ok": True, "error": None, "files": {}, "results": {}}
+    try:
+        file_patches = parse_patch(patch) if isinstance(patch, str) else list(patch)
+    except PatchError as e:
+        return {**summary, "ok": False, "error": str(e)}
+
+    # Varios FilePatch del mismo archivo se aplican en cadena sobre el mismo buffer
+    for file_patch in file_patches:
+        entry = {"ok": True, "error": None, "hunks": []}
+        summary["files"][file_patch.path] = entry
+        try:
+            target = _target(root, file_patch, buffers)
+            if target in summary["results"]:
+                previous = summary["results"][target]
+                current = None if previous is None else _split(previous) if previous else ([], "\n", True)
+            else:
+                current = buffers.split(target)
+            if file_patch.is_new and current is not None:
+                raise PatchError(f"{file_patch.path}: el archivo nuevo ya existe")
+            if file_patch.is_deleted and current is None:
+                raise PatchError(f"{file_patch.path}: el archivo a borrar no existe")
+            new_text, entry["hunks"] = _apply_split(current, file_patch, fuzz, max_offset)
+            summary["results"][target] = new_text
+        except PatchError as e:
+            entry.update(ok=False, error=str(e))
+            summary.update(ok=False, error=summary["error"] or str(e))
+    return summary
+
+
+def dry_run_many(patches, root=".", fuzz: int = DEFAULT_FUZZ, max_workers: int = DIFF_WORKERS) -> list:
+    """``dry_run`` de varios patches candidatos en paralelo, compartiendo los buffers leídos."""
+    buffers = BufferCache()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(lambda patch: dry_run(patch, root, fuzz, buffers=buffers), patches))
+
+
+def commit(results: dict):
+    """Escribe ``{Path: texto|None}`` de forma atómica: todo o nada (``None`` borra el archivo)."""
+    staged, replaced = [], []
+    try:
+        for path, text in results.items():
+            if text is None:
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            if path.exists():
+                os.chmod(tmp, path.stat().st_mode & 0o7777)
+            staged.append((path, tmp))
+
+        for path, tmp in staged:
+            backup = path.read_bytes() if path.exists() else None
+            os.replace(tmp, path)
+            replaced.append((path, backup))
+        for path, text in results.items():
+            if text is None and path.exists():
+                backup = path.read_bytes()
+                path.unlink()
+                replaced.append((path, backup))
+    except OSError:
+        for path, backup in reversed(replaced):
+            if backup is None:
+                path.unlink(missing_ok=True)
+            else:
+                path.write_bytes(backup)
+        raise
+    finally:
+        for _, tmp in staged:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return [str(path) for path in results]
+
+
+def apply_patch_set(patch, root=".", fuzz: int = DEFAULT_FUZZ, dry: bool = False) -> dict:
+    """Valida el patch completo en memoria y, si todos los archivos aplican, lo escribe de una vez.
+
+    Devuelve el resumen de ``dry_run`` más ``written`` (rutas escritas; vacío si ``dry`` o si falló).
+    """
+    summary = dry_run(patch, root, fuzz)
+    summary["written"] = []
+    if summary["ok"] and not dry:
+        try:
+            summary["written"] = commit(summary["results"])
+        except OSError as e:
+            summary.update(ok=False, error=f"no se pudo escribir el patch: {e}")
+    return summary
@@ -0,0 +1,194 @@
+"""
+error_classifier.py — Clasificador local de errores de build/runtime.
+
+Asigna uno de los tipos que despacha el router (BuildError, DependencyError,
+RuntimeError, EnvError) con reglas y patrones ponderados, y opcionalmente con
+un modelo TF-IDF + centroides (lineal) entrenado con logs históricos ya
+etiquetados. Corre en menos de un milisegundo y devuelve una confianza: el
+LLM queda sólo como respaldo cuando la confianza no supera el umbral.
+
+La confianza no es sólo la proporción de la etiqueta ganadora: se multiplica
+por la evidencia absoluta (``1 - exp(-puntaje / EVIDENCE_SCALE)``), así un único
+indicio débil (un frame de stack, una mención a ``.env``) queda bajo el umbral
+aunque ninguna otra etiqueta sume puntos.
+"""
+
+import re
+import math
+from collections import Counter, defaultdict
+from iopeer.utils.log_fingerprint import clean_text
+
+LABELS = ["BuildError", "DependencyError", "RuntimeError", "EnvError"]
+
+# Sólo se analiza el final del log: ahí están los errores que cortan el build
+MAX_CHARS = 20000
+# El modelo ve la misma ventana con la que se guardan los ejemplos (DataLayer corta en 5000)
+MODEL_CHARS = 5000
+# Puntaje de reglas con el que la evidencia llega a ~63%; una regla de peso 3 que aparece una vez da ~0.65
+EVIDENCE_SCALE = 2.0
+
+RULES = [
+    # --- Dependencias (paquetes, lockfile, inyección de NestJS) ---
+    ("DependencyError", 3.0, re.compile(r"Cannot find module '(?![./]|@/)[^']+'")),
+    ("DependencyError", 3.0, re.compile(r"Can't resolve '(?![./]|@/)[^']+'")),
+    ("DependencyError", 3.0, re.compile(r"ERR_PNPM_(?!RECURSIVE_RUN_FIRST_FAIL)\w+")),
+    ("DependencyError", 3.0, re.compile(r"ERESOLVE|peer dep|unmet peer|No matching version|not in (?:the )?npm registry", re.I)),
+    ("DependencyError", 1.0, re.compile(r"lockfile", re.I)),
+    ("DependencyError", 3.0, re.compile(r"Nest can't resolve dependencies")),
+    ("DependencyError", 2.0, re.compile(r"ERR_MODULE_NOT_FOUND|Cannot find package")),
+    ("DependencyError", 1.5, re.compile(r"is not a known (?:element|module)|must be part of a module|import the module", re.I)),
+    # --- Build (TypeScript, sintaxis, compilación) ---
+    ("BuildError", 2.0, re.compile(r"\berror TS\d+|\bTS\d{4}:")),
+    ("BuildError", 2.5, re.compile(r"Type error:")),
+    ("BuildError", 2.5, re.compile(r"SyntaxError|Unexpected token|Expected ['\"]?[;,)}]")),
+    ("BuildError", 2.0, re.compile(r"Failed to compile|Build failed|Compilation failed|webpack errors", re.I)),
+    ("BuildError", 2.0, re.compile(r"Cannot find module '(?:\.{1,2}/|@/)[^']+'|Can't resolve '(?:\.{1,2}/|@/)[^']+'")),
+    ("BuildError", 1.0, re.compile(r"does not exist on type|is not assignable to type|has no exported member")),
+    # --- Runtime ---
+    ("RuntimeError", 2.5, re.compile(r"\b(?:TypeError|ReferenceError|RangeError): ")),
+    ("RuntimeError", 2.5, re.compile(r"Unhandled(?:Promise)?Rejection|unhandledRejection|Uncaught", re.I)),
+    ("RuntimeError", 2.0, re.compile(r"Error occurred prerendering page|Hydration failed|Internal Server Error")),
+    ("RuntimeError", 1.5, re.compile(r"is not a function|Cannot read propert(?:y|ies) of (?:undefined|null)")),
+    ("RuntimeError", 1.0, re.compile(r"^\s+at .+\(.+:\d+:\d+\)$", re.M)),
+    ("RuntimeError", 1.5, re.compile(r"ExceptionHandler|ExceptionsHandler|EADDRINUSE|heap out of memory")),
+    # --- Entorno (variables, credenciales, servicios externos) ---
+    ("EnvError", 3.0, re.compile(r"Environment variable not found|env(?:ironment)? var(?:iable)?s? (?:is |are )?(?:missing|not set)", re.I)),
+    ("EnvError", 3.0, re.compile(r"\b[A-Z][A-Z0-9]*_[A-Z0-9_]+ (?:is not defined|is missing|must be set|is required|not set)")),
+    ("EnvError", 2.5, re.compile(r"process\.env\.\w+|\.env\b|dotenv")),
+    ("EnvError", 2.5, re.compile(r"api[_ ]?key|Incorrect API key|Unauthorized|invalid_api_key|permission denied", re.I)),
+    ("EnvError", 2.5, re.compile(r"ECONNREFUSED|Can't reach database server|P1001|getaddrinfo ENOTFOUND|DATABASE_URL")),
+]
+
+TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}|TS\d{4}")
+
+
+def _distribution(scores: dict) -> dict:
+    total = sum(scores.values())
+    if total <= 0:
+        return {label: 0.0 for label in LABELS}
+    return {label: scores.get(label, 0.0) / total for label in LABELS}
+
+
+def evidence(score: float) -> float:
+    """Puntaje absoluto → [0, 1): cuánto respalda el log a la etiqueta, independientemente de las otras."""
+    return 1 - math.exp(-max(score, 0.0) / EVIDENCE_SCALE)
+
+
+def rule_scores(text: str) -> dict:
+    """Puntaje por etiqueta: peso de la regla por log(1 + ocurrencias)."""
+    text = clean_text(text[-MAX_CHARS:])
+    scores = defaultdict(float)
+    for label, weight, pattern in RULES:
+        hits = len(pattern.findall(text))
+        if hits:
+            scores[label] += weight * math.log1p(hits)
+    return dict(scores)
+
+
+def tokenize(text: str):
+    return [t.lower() for t in TOKEN_RE.findall(clean_text(text[-MODEL_CHARS:]))]
+
+
+class TfidfCentroidModel:
+    """Modelo lineal liviano: TF-IDF + centroide normalizado por etiqueta (similitud coseno)."""
+
+    def __init__(self):
+        self.idf = {}
+        self.centroids = {}
+
+    def _vector(self, tokens):
+        tf = Counter(tokens)
+        vec = {t: (1 + math.log(c)) * self.idf[t] for t, c in tf.items() if t in self.idf}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    def fit(self, examples):
+        """``examples``: iterable de ``(texto, etiqueta)``."""
+        docs = []
+        for text, label in examples:
+            if label in LABELS:
+                tokens = tokenize(text)
+                docs.append((set(tokens), tokens, label))
+        if not docs:
+            return self
+        df = Counter(t for tokens, _, _ in docs for t in tokens)
+        n = len(docs)
+        self.idf = {t: math.log((1 + n) / (1 + c)) + 1 for t, c in df.items()}
+
+        sums = defaultdict(lambda: defaultdict(float))
+        for _, tokens, label in docs:
+            for t, v in self._vector(tokens).items():
+                sums[label][t] += v
+        self.centroids = {}
+        for label, vec in sums.items():
+            norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+            self.centroids[label] = {t: v / norm for t, v in vec.items()}
+        return self
+
+    def similarities(self, text: str) -> dict:
+        """Coseno contra el centroide de cada etiqueta (0 si el modelo no está entrenado)."""
+        if not self.centroids:
+            return {label: 0.0 for label in LABELS}
+        vec = self._vector(tokenize(text))
+        return {label: max(0.0, sum(v * self.centroids.get(label, {}).get(t, 0.0) for t, v in vec.items()))
+                for label in LABELS}
+
+    def predict_proba(self, text: str) -> dict:
+        return _distribution(self.similarities(text))
+
+
+def examples_from_events(events):
+    """Ejemplos etiquetados desde eventos del DataLayer registrados por el clasificador
+    (``agent="classifier"``, ``action`` = etiqueta, ``output`` = log)."""
+    for event in events:
+        if event.get("agent") == "classifier" and event.get("action") in LABELS:
+            yield event.get("output", ""), event["action"]
+
+
+class ErrorClassifier:
+    """Clasificador por reglas, opcionalmente combinado con ``TfidfCentroidModel``."""
+
+    def __init__(self, model: TfidfCentroidModel = None, threshold: float = 0.6):
+        self.model = model
+        self.threshold = threshold
+
+    def classify(self, text: str) -> dict:
+        """Devuelve ``{"label", "confidence", "confident", "source", "scores"}``.
+
+        ``label`` es ``None`` si ninguna regla ni el modelo reconocen el log;
+        ``confident`` indica si la confianza supera ``threshold``. Con reglas que
+        matchean, el modelo sólo desempata etiquetas con el mismo puntaje y, si
+        coincide con la etiqueta elegida, puede subir la confianza hasta la
+        suya (su proporción para esa etiqueta por su similitud); nunca la baja
+        ni da vuelta la etiqueta de las reglas.
+        """
+        scores = rule_scores(text)
+        probs = _distribution(scores)
+        strength = evidence(max(scores.values(), default=0.0))
+        label = max(probs, key=probs.get)
+        confidence = probs[label] * strength
+        source = "rules"
+        if self.model is not None and self.model.centroids:
+            sims = self.model.similarities(text)
+            model_probs, model_strength = _distribution(sims), max(sims.values())
+            if any(probs.values()):
+                tied = [name for name in LABELS if probs[name] == probs[label]]
+                label = max(tied, key=model_probs.get)
+                if max(model_probs, key=model_probs.get) == label:
+                    model_confidence = model_probs[label] * model_strength
+                    if model_confidence > confidence:
+                        confidence, source = model_confidence, "rules+model"
+            else:
+                probs = model_probs
+                label = max(probs, key=probs.get)
+                confidence, source = probs[label] * model_strength, "model"
+
+        if probs[label] <= 0:
+            label = None
+        return {
+            "label": label,
+            "confidence": round(confidence, 3),
+            "confident": label is not None and confidence >= self.threshold,
+            "source": source,
+            "scores": {k: round(v, 3) for k, v in probs.items()},
+        }
@@ -0,0 +1,188 @@
+"""
+log_fingerprint.py — Normalización y fingerprinting de logs de build.
+
+Quita el ruido que cambia entre ejecuciones (timestamps, rutas absolutas,
+hashes, duraciones, direcciones) y extrae firmas de error de TypeScript,
+NestJS, Next.js y pnpm. Cada error distinto recibe un fingerprint estable que
+no depende de la línea/columna ni de la máquina, de modo que el mismo fallo se
+puede deduplicar, cachear y agrupar entre ejecuciones.
+"""
+
+import re
+import hashlib
+
+ANSI_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+SURROGATE_RE = re.compile(r'[\ud800-\udfff]')
+
+NOISE_PATTERNS = [
+    # 2025-10-14T22:13:00.123Z, 2025-10-14 22:13:00
+    (re.compile(r'\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?\b'), '<ts>'),
+    # 10/14/2025, [22:13:00], 10:13:00 PM
+    (re.compile(r'\b\d{1,2}/\d{1,2}/\d{4},?'), '<date>'),
+    (re.compile(r'\[?\b\d{1,2}:\d{2}:\d{2}(?:\s?[AP]M)?\b\]?'), '<ts>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '<addr>'),
+    # hashes de commits, chunks de webpack, integrity (con letras y dígitos: no números largos ni palabras)
+    (re.compile(r'\b(?=[0-9a-f]*[a-f])(?=[0-9a-f]*\d)[0-9a-f]{7,64}\b'), '<hash>'),
+    (re.compile(r'\b\d+(?:\.\d+)?\s?(?:ms|s|sec|seconds|kB|KB|MB|B)\b'), '<n>'),
+]
+
+# Rutas absolutas: se conservan a partir de la primera carpeta del monorepo
+ABS_PATH_RE = re.compile(r'(?<![\w.@+-])(?:[A-Za-z]:)?(?:[\\/][\w.@+-]+)+?[\\/](?=(?:apps|packages|node_modules)[\\/])')
+LINE_COL_RE = re.compile(r'(\.(?:tsx?|jsx?|mjs|cjs))(?::\d+(?::\d+)?|\(\d+,\d+\))')
+
+FILE = r'(?P<file>[\w@./\\-]+\.(?:tsx?|jsx?|mjs|cjs))'
+SIGNATURE_PATTERNS = [
+    # src/app.ts(12,5): error TS2304: Cannot find name 'x'.
+    # src/app.ts:12:5 - error TS2304: Cannot find name 'x'.
+    ("typescript", re.compile(FILE + r'(?:\((?P<line>\d+),(?P<col>\d+)\)|:(?P<line2>\d+):(?P<col2>\d+))'
+                              r'\s*[:-]\s*error\s+(?P<code>TS\d+):\s*(?P<message>.+)')),
+    ("typescript", re.compile(r'error\s+(?P<code>TS\d+):\s*(?P<message>.+)')),
+    ("module_not_found", re.compile(r"Module not found: (?:Error: )?Can't resolve '(?P<module>[^']+)'(?: in '(?P<dir>[^']+)')?")),
+    ("module_not_found", re.compile(r"(?:Error: )?Cannot find module '(?P<module>[^']+)'")),
+    ("nest_di", re.compile(r"Nest can't resolve dependencies of the (?P<module>\w+)(?P<message>.*)")),
+    ("next_type_error", re.compile(r'Type error: (?P<message>.+)')),
+    ("next_prerender", re.compile(r'Error occurred prerendering page "(?P<module>[^"]+)"')),
+    ("syntax_error", re.compile(r'SyntaxError: (?P<message>.+)')),
+    ("pnpm", re.compile(r'(?P<code>ERR_PNPM_\w+)\s*(?P<message>.*)')),
+    ("env", re.compile(r'Environment variable not found: (?P<module>\w+)')),
+    ("env", re.compile(r'(?P<module>[A-Z][A-Z0-9_]{2,}) (?:is not defined|is missing|must be set)')),
+]
+
+# Next.js imprime la ubicación en la línea anterior a "Type error:"
+NEXT_LOCATION_RE = re.compile(r'^\./' + FILE + r':(?P<line>\d+):(?P<col>\d+)')
+
+
+def clean_text(text: str) -> str:
+    """Quita ANSI y surrogates (equivalente a ``safe_text`` de los agentes)."""
+    if not text:
+        return ""
+    text = SURROGATE_RE.sub('', text)
+    text = ANSI_RE.sub('', text)
+    return text.encode("utf-8", "replace").decode("utf-8", "replace")
+
+
+def normalize_paths(text: str) -> str:
+    text = ABS_PATH_RE.sub('', text)
+    return text.replace('\\', '/')
+
+
+def normalize_line(line: str) -> str:
+    """Normaliza una línea de log para que sea comparable entre ejecuciones."""
+    line = normalize_paths(clean_text(line))
+    for pattern, repl in NOISE_PATTERNS:
+        line = pattern.sub(repl, line)
+    line = LINE_COL_RE.sub(r'\1', line)
+    return re.sub(r'\s+', ' ', line).strip()
+
+
+def normalize_log(text: str) -> str:
+    """Normaliza un log completo, descartando líneas vacías y duplicadas consecutivas."""
+    lines = []
+    for raw in clean_text(text).splitlines():
+        line = normalize_line(raw)
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha1("\x00".join(p or "" for p in parts).encode("utf-8")).hexdigest()[:12]
+
+
+def extract_signatures(text: str):
+    """Extrae firmas de error, deduplicadas por fingerprint y en orden de aparición.
+
+    Cada firma es un dict con ``kind``, ``code``, ``file``, ``dir`` (la carpeta
+    desde la que webpack no pudo resolver un módulo), ``line``, ``col``,
+    ``module``, ``message``, ``fingerprint``, ``count`` y ``locations`` (las
+    ``(línea, columna)`` de cada aparición, sin repetir).
+    """
+    signatures = {}
+    location = None
+    for raw in clean_text(text).splitlines():
+        line = normalize_paths(raw).strip()
+        if not line:
+            continue
+        next_loc = NEXT_LOCATION_RE.match(line)
+        if next_loc:
+            location = next_loc.groupdict()
+            continue
+
+        for kind, pattern in SIGNATURE_PATTERNS:
+            m = pattern.search(line)
+            if not m:
+                continue
+            g = m.groupdict()
+            sig = {
+                "kind": kind,
+                "code": g.get("code"),
+                "file": g.get("file"),
+                "dir": g.get("dir"),
+                "line": g.get("line") or g.get("line2"),
+                "col": g.get("col") or g.get("col2"),
+                "module": g.get("module"),
+                "message": (g.get("message") or "").strip() or line,
+            }
+            if kind == "next_type_error" and location:
+                sig.update(file=location["file"], line=location["line"], col=location["col"])
+            sig["fingerprint"] = _fingerprint(kind, sig["code"], sig["file"] or sig["dir"], sig["module"],
+                                              normalize_line(sig["message"]))
+            where = (sig["line"], sig["col"])
+            if sig["fingerprint"] in signatures:
+                seen = signatures[sig["fingerprint"]]
+                seen["count"] += 1
+                if sig["line"] and where not in seen["locations"]:
+                    seen["locations"].append(where)
+            else:
+                sig["count"] = 1
+                sig["locations"] = [where] if sig["line"] else []
+                signatures[sig["fingerprint"]] = sig
+            break
+        location = None
+    return list(signatures.values())
+
+
+def fingerprint_log(text: str) -> dict:
+    """Fingerprint estable del log completo más sus firmas individuales.
+
+    Si no se reconoce ninguna firma, el fingerprint sale del final normalizado del log.
+    """
+    signatures = extract_signatures(text)
+    if signatures:
+        fingerprint = _fingerprint(*sorted(s["fingerprint"] for s in signatures))
+    else:
+        fingerprint = _fingerprint("raw", normalize_log(text)[-2000:])
+    return {"fingerprint": fingerprint, "signatures": signatures}
+
+
+MAX_LOCATIONS = 10
+
+
+def _line_col(line, col) -> str:
+    return f"{line}" + (f":{col}" if col else "")
+
+
+def format_signature(sig: dict) -> str:
+    location = sig["file"] or sig["module"] or ""
+    if sig.get("dir"):
+        location += f" in {sig['dir']}"
+    if sig["file"] and sig["line"]:
+        # Todas las ubicaciones del mismo error en el archivo: file.ts:12:5, 40:3, 88:1
+        where = sig.get("locations") or [(sig["line"], sig["col"])]
+        location += ":" + ", ".join(_line_col(line, col) for line, col in where[:MAX_LOCATIONS])
+        if len(where) > MAX_LOCATIONS:
+            location += f", … (+{len(where) - MAX_LOCATIONS})"
+    head = " ".join(part for part in (f"[{sig['code']}]" if sig["code"] else "", location) if part)
+    repeat = f" (x{sig['count']})" if sig["count"] > 1 else ""
+    return " — ".join(part for part in (head, sig["message"]) if part) + repeat
+
+
+def compact_log(text: str, max_chars: int = 6000) -> str:
+    """Versión compacta del log para prompts: una línea por error distinto
+    (con archivo y línea originales) o, si no hay firmas, el final normalizado."""
+    signatures = extract_signatures(text)
+    if not signatures:
+        return normalize_log(text)[-max_chars:]
+    lines = [f"{len(signatures)} errores distintos:"]
+    lines += [f"- {format_signature(s)}" for s in signatures]
+    return "\n".join(lines)[:max_chars]
@@ -1,7 +1,9 @@
 
-from tinydb import TinyDB
 from datetime import datetime
+from pathlib import Path
+import json
 import os
+from iopeer.data.memory.log_store import AppendOnlyLogStore
 
 class TinyLogger:
     """Memoria persistente común para todos los agentes."""
@@ -11,14 +13,31 @@ class TinyLogger:
         if db_path is None:
             db_path = f"{base_dir}/{agent_name}_agent/memory/{agent_name}_memory.json"
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        self.db = TinyDB(db_path)
+        # Cada tabla es un log append-only en <db_path sin extensión>/<tabla>-NNNNNN.jsonl
+        log_dir = Path(db_path).with_suffix("")
         self.agent_name = agent_name
-        self.logs = self.db.table("logs")
-        self.metrics = self.db.table("metrics")
-        self.reflections = self.db.table("reflections")
+        self.logs = AppendOnlyLogStore(log_dir, prefix="logs")
+        self.metrics = AppendOnlyLogStore(log_dir, prefix="metrics")
+        self.reflections = AppendOnlyLogStore(log_dir, prefix="reflections")
+        self._migrate_legacy(Path(db_path))
+
+    def _migrate_legacy(self, db_path):
+        """Importa una única vez el archivo TinyDB previo a los logs append-only."""
+        if not db_path.exists():
+            return
+        try:
+            with open(db_path, "r", encoding="utf-8") as f:
+                tables = json.load(f) or {}
+            for name, store in [("logs", self.logs), ("metrics", self.metrics), ("reflections", self.reflections)]:
+                for _, record in sorted(tables.get(name, {}).items(), key=lambda item: int(item[0])):
+                    store.append(record)
+            db_path.rename(db_path.with_suffix(".json.migrated"))
+            print(f"📦 {db_path.name} migrado a {db_path.with_suffix('').name}/")
+        except Exception as e:
+            print(f"⚠️ Error migrando {db_path.name}: {e}")
 
     def log(self, action, status, output):
-        self.logs.insert({
+        self.logs.append({
             "timestamp": datetime.utcnow().isoformat(),
             "action": action,
             "status": status,
@@ -26,17 +45,21 @@ class TinyLogger:
         })
 
     def add_metric(self, metric_name, value):
-        self.metrics.insert({
+        self.metrics.append({
             "timestamp": datetime.utcnow().isoformat(),
             "metric": metric_name,
             "value": value
         })
 
     def add_reflection(self, insight):
-        self.reflections.insert({
+        self.reflections.append({
             "timestamp": datetime.utcnow().isoformat(),
             "insight": insight
         })
 
+    def tail(self, agent=None, limit=5, since=None):
+        """Últimos logs leyendo desde el final; todos pertenecen a ``agent_name``."""
+        return self.logs.tail(limit, since=since)
+
     def get_recent_logs(self, n=5):
-        return self.logs.all()[-n:]
+        return self.tail(self.agent_name, n)
@@ -0,0 +1,235 @@
+"""
+prompt_builder.py — Armado de prompts con presupuesto de tokens.
+
+Todos los agentes de reparación (goals, RepairAgent, ReflectionLayer) arman
+sus prompts acá en vez de cortar el log por caracteres:
+
+- los tokens se cuentan con ``tiktoken`` si está instalado y, si no, con un
+  estimador local (palabras en trozos de ~4 caracteres, dígitos de a 3,
+  cada signo un token, no-ASCII por bytes) que sobreestima levemente
+- del log se eligen las secciones relevantes: cada línea de error (firmas de
+  ``log_fingerprint``, ``error``/``failed``/``ERR!``...) con ``context`` líneas
+  alrededor; las ventanas se ordenan por relevancia y se agregan mientras
+  entren en el presupuesto, y se muestran en el orden original del log
+- las ventanas que repiten el mismo error se cuentan en vez de repetirse y
+  los frames de stack trace repetidos se colapsan
+- cada modelo tiene un presupuesto duro (``MODEL_BUDGETS``); el prompt final
+  nunca lo supera
+"""
+
+import os
+import re
+import math
+import textwrap
+from functools import lru_cache
+from iopeer.utils.log_fingerprint import clean_text, normalize_line, extract_signatures
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Tokens de prompt por modelo (muy por debajo del contexto: más tokens = más latencia y costo)
+MODEL_BUDGETS = {
+    "gpt-4o": 6000,
+    "gpt-4o-mini": 4000,
+    "gpt-4-turbo": 6000,
+}
+DEFAULT_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4000"))
+DEFAULT_CONTEXT = 3
+GAP = "…"
+
+TOKEN_RE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+ERROR_LINE_RE = re.compile(
+    r"\b(?:error|failed|failure|fatal|exception|cannot|can't|unable|not found|undefined|ELIFECYCLE)\b|ERR!|ERR_|"
+    r"\bTS\d{4}\b|✖|❌|Traceback", re.IGNORECASE)
+WARNING_LINE_RE = re.compile(r"\b(?:warn(?:ing)?|deprecated)\b", re.IGNORECASE)
+# Node/webpack ("    at fn (file:1:2)") y Python ('  File "x.py", line 3, in f')
+FRAME_RE = re.compile(r'^\s*(?:at\s+\S.*|File\s+".+",\s+line\s+\d+.*)$')
+
+
+def model_budget(model: str = None) -> int:
+    """Presupuesto de tokens del prompt completo para ``model``."""
+    env = os.getenv(f"PROMPT_TOKEN_BUDGET_{(model or '').upper().replace('-', '_').replace('.', '_')}")
+    if env:
+        return int(env)
+    return MODEL_BUDGETS.get(model, DEFAULT_BUDGET)
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except (KeyError, ValueError):
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación local: sin tokenizer, del orden (y algo por encima) de los BPE de OpenAI."""
+    if not text:
+        return 0
+    count = 0
+    for piece in TOKEN_RE.findall(text):
+        if piece.isascii():
+            count += math.ceil(len(piece) / 4) if piece.isalpha() else 1
+        else:
+            count += len(piece.encode("utf-8"))
+    return count + text.count("\n") // 2
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    if not text:
+        return 0
+    if tiktoken is not None:
+        try:
+            return len(_encoding(model or "gpt-4o").encode(text, disallowed_special=()))
+        except Exception:
+            pass
+    return estimate_tokens(text)
+
+
+def clip_to_tokens(text: str, budget: int, model: str = None, marker: str = " … ") -> str:
+    """Recorta el medio de ``text`` (se queda con cabeza y cola) hasta entrar en ``budget`` tokens."""
+    total = count_tokens(text, model)
+    if total <= budget:
+        return text
+    keep = len(text) * budget // max(total, 1)
+    while keep > 0:
+        head = keep // 2
+        clipped = text[:head] + marker + text[len(text) - (keep - head):]
+        if count_tokens(clipped, model) <= budget:
+            return clipped
+        keep = keep * 4 // 5
+    return ""
+
+
+def truncate_to_tokens(text: str, budget: int, model: str = None, keep: str = "tail") -> str:
+    """Recorta por líneas enteras (del principio si ``keep='tail'``) hasta entrar en ``budget``.
+
+    Si ni siquiera la primera línea que se conserva entra, se recorta esa línea
+    por el medio en vez de devolver un texto vacío.
+    """
+    if budget <= 0:
+        return ""
+    if count_tokens(text, model) <= budget:
+        return text
+    lines = text.splitlines()
+    if keep == "tail":
+        lines.reverse()
+    kept, used = [], 0
+    for line in lines:
+        cost = count_tokens(line, model) + 1
+        if used + cost > budget:
+            if not kept:
+                kept.append(clip_to_tokens(line, budget - 1, model))
+            break
+        kept.append(line)
+        used += cost
+    if keep == "tail":
+        kept.reverse()
+    return "\n".join(kept)
+
+
+def dedupe_frames(lines):
+    """Colapsa frames de stack trace ya vistos (con o sin número de línea distinto)."""
+    seen, result, skipped = set(), [], 0
+    for line in lines:
+        if FRAME_RE.match(line):
+            key = normalize_line(line)
+            if key in seen:
+                skipped += 1
+                continue
+            seen.add(key)
+        elif skipped:
+            result.append(f"    … ({skipped} frames repetidos)")
+            skipped = 0
+        result.append(line)
+    if skipped:
+        result.append(f"    … ({skipped} frames repetidos)")
+    return result
+
+
+def _line_score(line: str, position: float) -> float:
+    if extract_signatures(line):
+        score = 10.0
+    elif ERROR_LINE_RE.search(line):
+        score = 5.0
+    elif WARNING_LINE_RE.search(line):
+        score = 1.0
+    else:
+        return 0.0
+    # Ante la duda, el final del log suele tener el fallo que cortó el build
+    return score + position
+
+
+def rank_sections(text: str, context: int = DEFAULT_CONTEXT):
+    """Ventanas ``{"start", "end", "score", "key", "count"}`` del log, de la más relevante a la menos."""
+    lines = dedupe_frames(clean_text(text).splitlines())
+    total = max(len(lines), 1)
+    scored = [(i, s) for i, line in enumerate(lines) if (s := _line_score(line, i / total)) > 0]
+    # Los warnings sólo cuentan si el log no tiene ningún error
+    hits = [(i, s) for i, s in scored if s >= 5] or scored
+    windows = []
+    for i, score in hits:
+        start, end = max(0, i - context), min(len(lines), i + context + 1)
+        if windows and start <= windows[-1]["end"]:
+            windows[-1]["end"] = max(windows[-1]["end"], end)
+            windows[-1]["score"] = max(windows[-1]["score"], score)
+            windows[-1]["hits"].append(i)
+        else:
+            windows.append({"start": start, "end": end, "score": score, "hits": [i]})
+
+    # El mismo error repetido (mismas líneas de error normalizadas) se muestra una vez
+    unique = {}
+    for window in windows:
+        key = "\n".join(normalize_line(lines[i]) for i in window["hits"])
+        if key in unique:
+            unique[key]["count"] += 1
+            unique[key]["score"] += 0.5
+            continue
+        unique[key] = {**window, "key": key, "count": 1}
+    ranked = sorted(unique.values(), key=lambda w: w["score"], reverse=True)
+    return lines, ranked
+
+
+def select_log(text: str, budget: int, model: str = None, context: int = DEFAULT_CONTEXT) -> str:
+    """Secciones más relevantes del log que entran en ``budget`` tokens, en orden original."""
+    if not text or budget <= 0:
+        return ""
+    lines, ranked = rank_sections(text, context)
+    if not ranked:
+        # Sin líneas de error: el final del log (normalizado) es lo más útil
+        return truncate_to_tokens("\n".join(lines), budget, model)
+
+    chosen, used = [], 0
+    for window in ranked:
+        body = "\n".join(lines[window["start"]:window["end"]])
+        if window["count"] > 1:
+            body += f"\n    (se repite {window['count']} veces)"
+        cost = count_tokens(body, model) + 2
+        if used + cost > budget:
+            # La ventana no entra completa: al menos las líneas de error
+            body = "\n".join(lines[i] for i in window["hits"])
+            cost = count_tokens(body, model) + 2
+            if used + cost > budget:
+                if chosen:
+                    continue
+                # Ni las líneas de error entran y no hay otra sección: cabeza y cola de esas líneas
+                body = clip_to_tokens(body, budget - 2, model)
+                cost = count_tokens(body, model) + 2
+        chosen.append((window["start"], body))
+        used += cost
+
+    chosen.sort()
+    return truncate_to_tokens(f"\n{GAP}\n".join(body for _, body in chosen), budget, model, keep="head")
+
+
+def build_prompt(instructions: str, log_text: str = "", model: str = None, budget: int = None,
+                 label: str = "Log", context: int = DEFAULT_CONTEXT) -> str:
+    """``instructions`` + las secciones del log que entran en el presupuesto del modelo."""
+    budget = budget or model_budget(model)
+    instructions = textwrap.dedent(instructions).strip()
+    header = f"{instructions}\n{label}:\n"
+    log_budget = budget - count_tokens(header, model)
+    prompt = header + select_log(log_text, log_budget, model, context)
+    return truncate_to_tokens(prompt, budget, model, keep="head")
@@ -1,16 +1,185 @@
+"""
+shell_tools.py — Ejecución de comandos shell.
+
+El motor es asíncrono (asyncio): cada línea de stdout/stderr se entrega en
+vivo a los *subscribers* (logger, memoria, clasificador...), la salida
+retenida se acota con un ring buffer, cada comando tiene timeout y, al
+vencer, se mata el árbol de procesos completo (el comando corre en su propia
+sesión/grupo). ``run_cmd`` mantiene la interfaz síncrona de siempre.
+"""
 
-import subprocess
 import os
+import signal
+import asyncio
+import inspect
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-def run_cmd(cmd: str):
-    """Ejecuta comandos shell y devuelve salida + estado."""
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+DEFAULT_TIMEOUT = float(os.getenv("IOPEER_CMD_TIMEOUT", "900"))
+MAX_OUTPUT_LINES = int(os.getenv("IOPEER_CMD_MAX_LINES", "5000"))
+KILL_GRACE = 3.0
+LINE_LIMIT = 1024 * 1024
+
+
+def _kill_tree(proc, sig):
+    """Envía ``sig`` a todo el grupo de procesos del comando."""
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, sig)
+        elif sig == getattr(signal, "SIGKILL", None):
+            proc.kill()
+        else:
+            proc.terminate()
+    except ProcessLookupError:
+        pass
+
+
+async def _notify(subscribers, stream, line):
+    for subscriber in subscribers:
+        try:
+            result = subscriber(stream, line)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"⚠️ Subscriber {getattr(subscriber, '__name__', subscriber)} falló: {e}")
+
+
+async def _pump(reader, stream, buffer, subscribers, counter):
+    while True:
+        try:
+            raw = await reader.readline()
+        except ValueError:
+            # Línea más larga que LINE_LIMIT: se entrega cortada
+            raw = await reader.read(LINE_LIMIT)
+        if not raw:
+            break
+        line = raw.decode("utf-8", "replace").rstrip("\r\n")
+        counter[stream] += 1
+        buffer.append((stream, line))
+        await _notify(subscribers, stream, line)
+
+
+async def run_cmd_async(cmd: str, cwd=None, timeout: float = DEFAULT_TIMEOUT, subscribers=(),
+                        max_lines: int = MAX_OUTPUT_LINES, env=None, stop: asyncio.Event = None) -> dict:
+    """Ejecuta ``cmd`` en shell sin bloquear el event loop.
+
+    Cada subscriber recibe ``(stream, line)`` con ``stream`` en ``"stdout"``/``"stderr"``
+    y puede ser una función o una corrutina. Sólo se retienen las últimas
+    ``max_lines`` líneas; ``lines`` cuenta todas las que se produjeron. Si se
+    pasa ``stop`` y se activa antes de terminar, el comando se aborta
+    (``aborted=True``).
+    """
+    start = time.perf_counter()
+    proc = await asyncio.create_subprocess_shell(
+        cmd, cwd=cwd, env=env, limit=LINE_LIMIT,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        start_new_session=(os.name == "posix"),
+    )
+    buffer = deque(maxlen=max_lines)
+    counter = {"stdout": 0, "stderr": 0}
+    pumps = asyncio.gather(
+        _pump(proc.stdout, "stdout", buffer, subscribers, counter),
+        _pump(proc.stderr, "stderr", buffer, subscribers, counter),
+    )
+
+    async def finish():
+        await asyncio.shield(pumps)
+        return await proc.wait()
+
+    finished = asyncio.ensure_future(finish())
+    waiters = {finished}
+    if stop is not None:
+        waiters.add(asyncio.ensure_future(stop.wait()))
+
+    timed_out = aborted = False
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not finished.done():
+            aborted = stop is not None and stop.is_set()
+            timed_out = not aborted
+            _kill_tree(proc, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(proc.wait(), KILL_GRACE)
+            except asyncio.TimeoutError:
+                _kill_tree(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+                await proc.wait()
+    except asyncio.CancelledError:
+        _kill_tree(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+        raise
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+        try:
+            await asyncio.wait_for(pumps, KILL_GRACE)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pumps.cancel()
+
+    stdout = "".join(line + "\n" for stream, line in buffer if stream == "stdout")
+    stderr = "".join(line + "\n" for stream, line in buffer if stream == "stderr")
+    total = counter["stdout"] + counter["stderr"]
     return {
-        "output": result.stdout + result.stderr,
-        "ok": result.returncode == 0,
-        "code": result.returncode
+        "cmd": cmd,
+        "output": stdout + stderr,
+        "stdout": stdout,
+        "stderr": stderr,
+        "ok": proc.returncode == 0 and not timed_out and not aborted,
+        "code": proc.returncode,
+        "timed_out": timed_out,
+        "aborted": aborted,
+        "duration": round(time.perf_counter() - start, 3),
+        "lines": total,
+        "truncated": total > len(buffer),
     }
 
+
+async def run_many_async(cmds, concurrency: int = 4, **kwargs):
+    """Ejecuta varios comandos con a lo sumo ``concurrency`` en simultáneo (resultados en orden)."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def guarded(cmd):
+        async with semaphore:
+            return await run_cmd_async(cmd, **kwargs)
+
+    return await asyncio.gather(*(guarded(cmd) for cmd in cmds))
+
+
+def _run_sync(coro):
+    """``asyncio.run`` que también funciona si ya hay un event loop corriendo en este hilo."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+def run_cmd(cmd: str, cwd=None, timeout: float = DEFAULT_TIMEOUT, subscribers=()):
+    """Ejecuta comandos shell y devuelve salida + estado."""
+    return _run_sync(run_cmd_async(cmd, cwd=cwd, timeout=timeout, subscribers=subscribers))
+
+
+def run_many(cmds, concurrency: int = 4, **kwargs):
+    """Versión síncrona de ``run_many_async``."""
+    return _run_sync(run_many_async(cmds, concurrency=concurrency, **kwargs))
+
+
+# --- Subscribers listos para usar ---
+def print_subscriber(prefix: str = ""):
+    """Imprime cada línea en vivo."""
+    def subscriber(stream, line):
+        print(f"{prefix}{line}", flush=True)
+    return subscriber
+
+
+def file_subscriber(path):
+    """Agrega cada línea a ``path`` (por ejemplo, el log de build)."""
+    def subscriber(stream, line):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    return subscriber
+
+
 def get_project_root():
     """Devuelve la raíz del proyecto."""
     return os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))